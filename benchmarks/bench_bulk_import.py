@@ -0,0 +1,85 @@
+# benchmarks/bench_bulk_import.py
+"""
+Time importing members with BulkImport against repeated add_member calls.
+
+add_member reloads, rescans and rewrites members.json for every member, so
+it is only timed on a small sample; the bulk import is timed on the full set.
+
+    python -m benchmarks.bench_bulk_import --members 100000 --sample 2000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+from core.bulk_import import BulkImport
+from core.member_management import MemberManagement
+from database.data_loader import DataLoader
+from database.storage import JsonStorage
+
+TYPES = ["Monthly", "Quarterly", "Annual"]
+
+
+def build_rows(count, gyms=20):
+    return [
+        {"name": f"Member {i}", "user_type": "Gym User", "gym_id": f"G{i % gyms}",
+         "payment_type": TYPES[i % 3], "membership_type": "Standard", "join_date": "2024-06-01"}
+        for i in range(count)
+    ]
+
+
+def fresh_sources(temp_dir, gyms=20):
+    """Empty members and a few gyms, saved without fsync like a scratch copy of the database."""
+    sources = {}
+    for name, key in (("members", "member_id"), ("gyms", "gym_id")):
+        sources[name] = {"file": os.path.join(temp_dir, f"{name}.json"), "type": "json", "key": key}
+    with open(sources["gyms"]["file"], "w") as f:
+        json.dump([{"gym_id": f"G{i}", "gym_name": f"Gym {i}", "city": "London"} for i in range(gyms)], f)
+    with open(sources["members"]["file"], "w") as f:
+        json.dump([], f)
+    return sources
+
+
+def timed_import(function):
+    temp_dir = tempfile.mkdtemp()
+    try:
+        with patch.object(DataLoader, "data_sources", fresh_sources(temp_dir)), \
+                patch.dict(DataLoader.storage_backends, {"json": JsonStorage(fsync=False)}):
+            DataLoader.clear_cache()
+            start = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - start
+            saved = len(DataLoader.get_data("members"))
+    finally:
+        DataLoader.clear_cache()
+        shutil.rmtree(temp_dir)
+    return elapsed, saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    sample = build_rows(args.sample)
+
+    def one_by_one():
+        for row in sample:
+            MemberManagement.add_member(**row)
+
+    with patch("builtins.print"):
+        loop_time, loop_saved = timed_import(one_by_one)
+    bulk_sample_time, _ = timed_import(lambda: BulkImport.import_members(sample))
+    bulk_time, bulk_saved = timed_import(lambda: BulkImport.import_members(build_rows(args.members)))
+    assert loop_saved == args.sample and bulk_saved == args.members
+
+    print(f"add_member x {args.sample}:        {loop_time:8.2f} s")
+    print(f"BulkImport x {args.sample}:        {bulk_sample_time:8.2f} s  ({loop_time / bulk_sample_time:.0f} x faster)")
+    print(f"BulkImport x {args.members}:      {bulk_time:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_codecs.py
+"""
+Compare save/load throughput and file size of the storage codecs.
+
+Generates members shaped like members.json (nested schedule dicts) and
+round-trips them through JsonStorage once per available codec.
+
+    python -m benchmarks.bench_codecs --members 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from database.serialization import available_codecs
+from database.storage import JsonStorage
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+SLOTS = ["06:00-07:00", "07:00-08:00", "12:00-13:00", "17:00-18:00", "18:00-19:00"]
+
+
+def build_members(member_count, seed=7):
+    """Generate member records with the same fields as members.json."""
+    rng = random.Random(seed)
+    members = []
+    for i in range(member_count):
+        members.append({
+            "member_id": f"m{i:07d}",
+            "name": f"Member {i}",
+            "address": f"{i} High Street",
+            "phone": f"07{rng.randrange(10 ** 9):09d}",
+            "email": f"member{i}@example.com",
+            "user_type": "Gym User",
+            "gym_id": f"g{i % 50:04d}",
+            "membership_type": rng.choice(["Monthly", "Quarterly", "Annual"]),
+            "cost": rng.choice([30.0, 80.0, 300.0]),
+            "schedule": {day: rng.sample(SLOTS, 2) for day in rng.sample(DAYS, 3)},
+        })
+    return members
+
+
+def time_codec(storage, source, members, repeats):
+    """Return (best save seconds, best load seconds, file size in bytes)."""
+    save_times, load_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        storage.write("members", source, members)
+        save_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loaded = storage.read("members", source)
+        load_times.append(time.perf_counter() - start)
+        assert len(loaded) == len(members)
+    return min(save_times), min(load_times), os.path.getsize(source["file"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    members = build_members(args.members)
+    storage = JsonStorage()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'codec':<10}{'save s':>10}{'load s':>10}{'save MB/s':>12}{'load MB/s':>12}{'size MB':>10}")
+        for name in available_codecs():
+            source = {"file": os.path.join(temp_dir, f"members.{name}"), "codec": name}
+            save, load, size = time_codec(storage, source, members, args.repeats)
+            megabytes = size / 1e6
+            print(f"{name:<10}{save:>10.3f}{load:>10.3f}{megabytes / save:>12.1f}{megabytes / load:>12.1f}{megabytes:>10.1f}")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_columnar.py
+"""
+Time revenue by gym and status over payments, as dicts and as a columnar snapshot.
+
+The dict path is the aggregate() pass view_all_gyms used to run on every
+call; the snapshot is built once per data version and then queried.
+
+    python -m benchmarks.bench_columnar --payments 1000000
+"""
+import argparse
+import json
+import random
+import time
+from database import columnar
+from database.aggregation import aggregate
+from database.columnar import ColumnarSnapshot
+
+STATUSES = ["Paid", "Paid", "Pending"]
+TYPES = ["Monthly", "Quarterly", "Annual"]
+METHODS = ["Credit Card", "Direct Debit"]
+
+
+def build_payload(payment_count, seed=7):
+    """Return the JSON text of payment_count synthetic payments."""
+    rng = random.Random(seed)
+    payments = [
+        {
+            "payment_id": f"P{i + 1}",
+            "member_id": f"m{rng.randrange(payment_count // 10 + 1):07d}",
+            "member_name": f"Member {i % 5000}",
+            "gym_name": f"Gym {i % 50}",
+            "amount": f"{rng.uniform(10, 500):.2f}",
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "status": rng.choice(STATUSES),
+            "payment_type": rng.choice(TYPES),
+            "payment_method": rng.choice(METHODS),
+            "discount_applied": "No",
+            "note": "",
+        }
+        for i in range(payment_count)
+    ]
+    return json.dumps(payments)
+
+
+COLUMNS = {
+    "numeric": ["amount"],
+    "categorical": ["member_id", "gym_name", "status", "payment_type", "payment_method"],
+    "dates": ["date"],
+}
+
+
+def timed(function, repeats):
+    """Return (best seconds, result) over repeats runs of function()."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payments", type=int, default=1000000)
+    parser.add_argument("--gyms", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    payments = json.loads(build_payload(args.payments))
+    member_gyms = {p["member_id"]: f"G{hash(p['member_id']) % args.gyms}" for p in payments}
+
+    def by_dicts():
+        return aggregate(
+            payments,
+            group_by=lambda p: (member_gyms.get(p.get("member_id")), p.get("status")),
+            sums=["amount"],
+            where=lambda p: p.get("status") in ("Paid", "Pending"),
+        )
+
+    build_time, snapshot = timed(lambda: ColumnarSnapshot(payments, **COLUMNS), 1)
+
+    def by_snapshot():
+        return snapshot.group_sum(
+            by=(snapshot.translate("member_id", member_gyms), "status"),
+            value="amount",
+            where={"status": ("Paid", "Pending")},
+        )
+
+    dict_time, expected = timed(by_dicts, args.repeats)
+    column_time, result = timed(by_snapshot, args.repeats)
+    assert expected.keys() == result.keys()
+    assert all(abs(expected[k]["amount"] - result[k]["amount"]) < 1e-6 * max(1.0, expected[k]["amount"])
+               for k in expected)
+
+    print(f"payments:            {args.payments}  (NumPy: {'yes' if columnar.numpy is not None else 'no'})")
+    print(f"dict aggregate:      {dict_time * 1000:10.1f} ms per query")
+    print(f"snapshot build:      {build_time * 1000:10.1f} ms once per data version")
+    print(f"snapshot group_sum:  {column_time * 1000:10.1f} ms per query")
+    print(f"speed-up:            {dict_time / column_time:10.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_export.py
+"""
+Measure time and peak memory of exporting attendance history, streamed vs loaded whole.
+
+The streamed export goes through BulkExport (one monthly partition in memory
+at a time); the baseline loads the source with get_data and writes it with
+FileHandler.write_csv. Peak memory is measured with tracemalloc.
+
+    python -m benchmarks.bench_export --per-day 300 --years 1 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+from benchmarks.bench_partitions import build_attendance
+from core.bulk_export import BulkExport
+from database.data_loader import DataLoader
+from database.file_handler import FileHandler
+from database.partitioned_storage import PartitionedStorage
+
+FIELDS = ["attendance_id", "class_id", "user_id", "date", "timestamp"]
+
+
+def measured(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-day", type=int, default=300)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    print(f"{'years':>5} {'records':>10} {'loaded s':>9} {'loaded MB':>10} {'streamed s':>11} {'streamed MB':>12}")
+    for years in args.years:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            source = {"file": os.path.join(temp_dir, "attendance.json"), "type": "partitioned",
+                      "partition_by": "date", "key": "attendance_id", "codec": "compact"}
+            storage = PartitionedStorage(fsync=False, cached_partitions=0)
+            records = build_attendance(years, args.per_day)
+            storage.write("attendance", source, records)
+            count = len(records)
+            del records
+
+            with patch.object(DataLoader, "data_sources", {"attendance": source}), \
+                    patch.dict(DataLoader.storage_backends, {"partitioned": storage}):
+                DataLoader.clear_cache()
+                DataLoader.disable_cache()
+                try:
+                    loaded = measured(lambda: FileHandler.write_csv(
+                        os.path.join(temp_dir, "loaded.csv"), DataLoader.get_data("attendance"), FIELDS))
+                    streamed = measured(lambda: BulkExport.export(
+                        "attendance", os.path.join(temp_dir, "streamed.csv"), fields=FIELDS))
+                finally:
+                    DataLoader.enable_cache()
+                    DataLoader.clear_cache()
+            assert os.path.getsize(os.path.join(temp_dir, "loaded.csv")) == \
+                os.path.getsize(os.path.join(temp_dir, "streamed.csv"))
+        finally:
+            shutil.rmtree(temp_dir)
+        print(f"{years:>5} {count:>10} {loaded[0]:>9.2f} {loaded[1]:>10.1f} {streamed[0]:>11.2f} {streamed[1]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
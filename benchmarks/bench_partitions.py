@@ -0,0 +1,83 @@
+# benchmarks/bench_partitions.py
+"""
+Time date-bounded attendance queries as the history grows, single file vs monthly partitions.
+
+Each history length is written once in both layouts; the queries then read
+from disk (the partition cache is disabled) as a freshly started desk would.
+
+    python -m benchmarks.bench_partitions --per-day 300 --years 1 2 4 8
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from benchmarks.bench_columnar import timed
+from database.partitioned_storage import PartitionedStorage
+from database.storage import JsonStorage
+
+HEADINGS = ("day, one file", "day, partitions", "month, one file", "month, partitions")
+
+
+def build_attendance(years, per_day, seed=7):
+    """Return per_day synthetic attendance records for every day of the given number of years."""
+    rng = random.Random(seed)
+    first = date(2025, 1, 1) - timedelta(days=365 * years)
+    records = []
+    for day in range(365 * years):
+        iso = (first + timedelta(days=day)).isoformat()
+        for _ in range(per_day):
+            records.append({
+                "attendance_id": f"A{len(records) + 1}",
+                "class_id": f"C{rng.randrange(40)}",
+                "user_id": f"U{rng.randrange(5000)}",
+                "date": iso,
+                "timestamp": f"{rng.randrange(6, 23):02d}:{rng.randrange(60):02d}:00",
+            })
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-day", type=int, default=300)
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    json_storage = JsonStorage(fsync=False)
+    partitioned = PartitionedStorage(fsync=False, cached_partitions=0)
+    day, month = ("2024-12-18", "2024-12-18"), ("2024-12-01", "2024-12-31")
+
+    print("milliseconds per query")
+    print(f"{'years':>5} {'records':>10} " + " ".join(HEADINGS))
+    for years in args.years:
+        records = build_attendance(years, args.per_day)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            single = {"file": os.path.join(temp_dir, "attendance.json"), "codec": "compact"}
+            parts = dict(single, file=os.path.join(temp_dir, "partitioned.json"), partition_by="date")
+            json_storage.write("attendance", single, records)
+            partitioned.write("attendance", parts, records)
+
+            def from_file(first, last):
+                return [r for r in json_storage.read("attendance", single) if first <= r["date"] <= last]
+
+            def from_partitions(first, last):
+                return partitioned.read_period("attendance", parts, first, last)
+
+            timings = []
+            for first, last in (day, month):
+                file_time, expected = timed(lambda: from_file(first, last), args.repeats)
+                part_time, result = timed(lambda: from_partitions(first, last), args.repeats)
+                assert result == expected
+                timings += [file_time, part_time]
+        finally:
+            shutil.rmtree(temp_dir)
+        print(f"{years:>5} {len(records):>10} " + " ".join(
+            f"{t * 1000:>{len(heading)}.1f}" for t, heading in zip(timings, HEADINGS)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_view_all_gyms.py
+"""
+Benchmark GymManager.view_all_gyms on synthetic data.
+
+Runs the aggregation at increasing fractions of the target size so the
+scaling is visible: time per record should stay roughly constant.
+
+    python -m benchmarks.bench_view_all_gyms --gyms 100 --members 200000 --payments 2000000
+"""
+import argparse
+import random
+import time
+from unittest.mock import patch
+from database.data_loader import DataLoader
+from core.gym_management import GymManager
+
+USER_TYPES = ["Gym User"] * 17 + ["Training Staff", "Wellbeing Staff", "Management Staff"]
+STAFF_COSTS = {"Training Staff": 4000, "Wellbeing Staff": 4500, "Management Staff": 2500}
+
+
+def build_dataset(gym_count, member_count, payment_count, seed=7):
+    """Generate gyms, locations, members and payments shaped like the JSON files."""
+    rng = random.Random(seed)
+    gyms = [
+        {
+            "gym_id": f"g{i:07d}",
+            "gym_name": f"Gym {i}",
+            "city": f"City {i % 20}",
+            "manager_name": f"Manager {i}",
+            "manager_contact": "0000000000",
+            "manager_email": f"manager{i}@example.com",
+        }
+        for i in range(gym_count)
+    ]
+    locations = [{"location_id": g["gym_id"], "city": g["city"], "zones": ["Cardio", "Yoga"]} for g in gyms]
+    members = []
+    for i in range(member_count):
+        user_type = rng.choice(USER_TYPES)
+        members.append({
+            "member_id": f"m{i:07d}",
+            "name": f"Member {i}",
+            "user_type": user_type,
+            "gym_id": gyms[i % gym_count]["gym_id"],
+            "cost": STAFF_COSTS.get(user_type, 200),
+        })
+    payments = [
+        {
+            "payment_id": f"P{i + 1}",
+            "member_id": members[rng.randrange(member_count)]["member_id"],
+            "amount": f"{rng.uniform(10, 500):.2f}",
+            "status": rng.choice(("Paid", "Paid", "Pending")),
+        }
+        for i in range(payment_count)
+    ]
+    return {"gyms": gyms, "locations": locations, "members": members, "payments": payments}
+
+
+def time_view_all_gyms(dataset, repeats=3):
+    """Return the best wall-clock time of view_all_gyms over the in-memory dataset."""
+    with patch.object(DataLoader, "get_data", side_effect=lambda name: dataset.get(name, [])):
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            GymManager.view_all_gyms()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gyms", type=int, default=100)
+    parser.add_argument("--members", type=int, default=200_000)
+    parser.add_argument("--payments", type=int, default=2_000_000)
+    parser.add_argument("--steps", type=int, default=4, help="Number of sizes between 1/steps and the full target")
+    args = parser.parse_args()
+
+    print(f"{'gyms':>6} {'members':>9} {'payments':>10} {'seconds':>9} {'us/record':>10}")
+    for step in range(1, args.steps + 1):
+        fraction = step / args.steps
+        gyms = max(1, int(args.gyms * fraction))
+        members = max(1, int(args.members * fraction))
+        payments = int(args.payments * fraction)
+        dataset = build_dataset(gyms, members, payments)
+        seconds = time_view_all_gyms(dataset)
+        per_record = seconds / (gyms + members + payments) * 1e6
+        print(f"{gyms:>6} {members:>9} {payments:>10} {seconds:>9.3f} {per_record:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
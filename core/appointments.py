@@ -41,34 +41,36 @@ class AppointmentManager:
     @staticmethod
     def view_all_appointments_enriched():
         # Local import to prevent circular dependency
-        from core.gym_management import GymManager
+        from core.enrichment import EnrichmentContext
 
         # Enrich with: wellbeing_staff_name, specialty (activity), gym_user_name, gym_name, cost, status
         appointments = AppointmentManager.view_all_appointments()
-        members = MemberManagement.view_all_members()
-        gyms = GymManager.view_all_gyms()
-
-        members_by_id = {m["member_id"]: m for m in members}
-        gyms_by_id = {g["gym_id"]: g for g in gyms}
-
-        enriched = []
-        for appt in appointments:
-            member = members_by_id.get(appt["member_id"], {})
-            trainer = members_by_id.get(appt["trainer_id"], {})
-            gym_data = gyms_by_id.get(trainer.get("gym_id", ""), {})
-
-            enriched.append({
-                "appointment_id": appt["appointment_id"],
-                "wellbeing_staff_name": trainer.get("name", "Unknown"),
-                "specialty": trainer.get("activity", "Unknown"),
-                "gym_user_name": member.get("name", "Unknown"),
-                "gym_name": gym_data.get("gym_name", "Unknown"),
-                "date": appt["date"],
-                "time": appt["time"],
-                "cost": float(appt["cost"]),
-                "status": appt["status"]
-            })
-        return enriched
+        context = EnrichmentContext(members=MemberManagement.view_all_members())
+
+        return [AppointmentManager.enrich_appointment(appt, context) for appt in appointments]
+
+    @staticmethod
+    def enrich_appointment(appt, context):
+        """
+        Return one appointment with staff, member and gym names filled in.
+
+        :param appt: Appointment record.
+        :param context: EnrichmentContext used for the lookups.
+        """
+        # Same defaults as view_all_appointments, for records taken straight from storage
+        trainer_id = appt.get("trainer_id", "Unknown")
+        trainer = context.trainer(trainer_id)
+        return {
+            "appointment_id": appt.get("appointment_id", "Unknown"),
+            "wellbeing_staff_name": trainer.get("name", "Unknown"),
+            "specialty": trainer.get("activity", "Unknown"),
+            "gym_user_name": context.member_name(appt.get("member_id", "Unknown")),
+            "gym_name": context.member_gym_name(trainer_id),
+            "date": appt.get("date", "Unknown"),
+            "time": appt.get("time", "Unknown"),
+            "cost": float(appt.get("cost", 0.0)),
+            "status": appt.get("status", "Pending")
+        }
 
     @staticmethod
     def delete_appointment(appointment_id):
@@ -96,11 +98,7 @@ class AppointmentManager:
 
     @staticmethod
     def get_appointment_by_id(appointment_id):
-        appointments = DataLoader.get_data("appointments")
-        for a in appointments:
-            if str(a["appointment_id"]) == str(appointment_id):
-                return a
-        return None
+        return DataLoader.get_record("appointments", str(appointment_id))
 
     @staticmethod
     def is_double_booked(trainer_id, date, time, exclude_id=None):
@@ -0,0 +1,186 @@
+# core/attendance_rollups.py
+import argparse
+import logging
+from datetime import date, timedelta
+from database.aggregation import aggregate
+from database.data_loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("day", "hour")
+RETENTION_ACTIONS = ("archive", "delete")
+
+
+class AttendanceRollups:
+    """
+    Check-in counts per gym, class and day/hour, kept up to date as attendance is recorded.
+
+    Each rollup row counts the check-ins of one class (and its gym) on one day,
+    or in one hour of a day, and is keyed by rollup_id. Rows are stored in the
+    attendance_rollups source, partitioned by date like the raw attendance, so
+    a report over any period reads a few small rollup rows per class per day
+    instead of every raw check-in.
+
+    Rollups are kept forever. Raw attendance older than ``retention_days`` can
+    be moved to the attendance_archive source or deleted with apply_retention;
+    the counts stay available from the rollups either way.
+    """
+
+    # Days of raw attendance kept in the attendance source by apply_retention.
+    retention_days = 365
+    # What apply_retention does with older rows: "archive" or "delete".
+    retention_action = "archive"
+
+    @staticmethod
+    def rollup_id(granularity, day, hour, gym_id, class_id):
+        return f"{granularity}|{day}|{hour or ''}|{gym_id}|{class_id}"
+
+    @staticmethod
+    def rollup_keys(record):
+        """Return (granularity, day, hour) for every rollup row a raw attendance record counts towards."""
+        day = str(record.get("date") or "")[:10]
+        if not day:
+            return []
+        keys = [("day", day, None)]
+        clock = str(record.get("timestamp") or record.get("time") or "")
+        if clock[:2].isdigit():
+            keys.append(("hour", day, clock[:2]))
+        return keys
+
+    @staticmethod
+    def gym_of(record, classes=None):
+        """Return the gym a check-in belongs to, through its class."""
+        if classes is None:
+            classes = DataLoader.get_collection("classes")
+        cls = classes.get(record.get("class_id")) or {}
+        return cls.get("gym_id") or record.get("location_id") or "Unknown"
+
+    @staticmethod
+    def record(record):
+        """
+        Count one new attendance record in its daily and hourly rollups.
+
+        The first call on a store without rollups builds them from the whole
+        attendance history instead (see rebuild), which already includes record.
+        """
+        rollups = DataLoader.get_collection("attendance_rollups")
+        if not len(rollups):
+            AttendanceRollups.rebuild()
+            return
+        AttendanceRollups._add(rollups, record, AttendanceRollups.gym_of(record))
+        DataLoader.save_collection(rollups)
+
+    @staticmethod
+    def rebuild():
+        """
+        Recompute every rollup from the raw attendance and the attendance archive.
+
+        Rows deleted by a "delete" retention policy are no longer available, so
+        their counts are lost if the rollups are rebuilt afterwards.
+
+        :return: Number of rollup rows written.
+        """
+        rollups = DataLoader.get_collection("attendance_rollups")
+        for rollup in list(rollups):
+            rollups.delete(rollup["rollup_id"])
+        classes = DataLoader.get_collection("classes")
+        for source_name in ("attendance", "attendance_archive"):
+            for record in DataLoader.iter_data(source_name):
+                AttendanceRollups._add(rollups, record, AttendanceRollups.gym_of(record, classes))
+        DataLoader.save_collection(rollups)
+        logger.info(f"Rebuilt {len(rollups)} attendance rollup rows.")
+        return len(rollups)
+
+    @staticmethod
+    def check_ins(start_date, end_date=None, granularity="day", by="gym_id", **filters):
+        """
+        Count check-ins between two dates from the rollups.
+
+        :param start_date: First date in 'YYYY-MM-DD' format.
+        :param end_date: Last date in 'YYYY-MM-DD' format. If None, only start_date.
+        :param granularity: "day" or "hour"; "hour" is needed to group by "hour".
+        :param by: Rollup field, or tuple of fields ("gym_id", "class_id", "date", "hour"), to group by.
+        :param filters: Rollup fields that must match, e.g. gym_id="G1".
+        :return: Dictionary of group (a tuple when by is a tuple) -> number of check-ins.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity '{granularity}'. Choose from {GRANULARITIES}.")
+        if not len(DataLoader.get_collection("attendance_rollups")):
+            AttendanceRollups.rebuild()
+
+        rows = DataLoader.get_period("attendance_rollups", start_date, end_date, granularity=granularity, **filters)
+        if isinstance(by, tuple):
+            group_by = lambda row: tuple(row.get(field) for field in by)
+        else:
+            group_by = by
+        groups = aggregate(rows, group_by=group_by, sums=["check_ins"])
+        return {group: int(totals["check_ins"]) for group, totals in groups.items()}
+
+    @staticmethod
+    def apply_retention(today=None, retention_days=None, action=None):
+        """
+        Remove raw attendance older than the retention window from the attendance source.
+
+        Their check-ins remain counted in the rollups, which are built first if
+        they do not exist yet.
+
+        :param today: Reference date (defaults to today).
+        :param retention_days: Days of raw rows to keep (defaults to AttendanceRollups.retention_days).
+        :param action: "archive" to move old rows to attendance_archive, or "delete"
+                       (defaults to AttendanceRollups.retention_action).
+        :return: Number of raw rows removed from the attendance source.
+        """
+        retention_days = AttendanceRollups.retention_days if retention_days is None else retention_days
+        action = action or AttendanceRollups.retention_action
+        if action not in RETENTION_ACTIONS:
+            raise ValueError(f"Invalid retention action '{action}'. Choose from {RETENTION_ACTIONS}.")
+        cutoff = ((today or date.today()) - timedelta(days=retention_days)).isoformat()
+
+        with DataLoader.transaction():
+            if not len(DataLoader.get_collection("attendance_rollups")):
+                AttendanceRollups.rebuild()
+            expired, kept = [], []
+            for record in DataLoader.get_data("attendance"):
+                expiring = record.get("date") and str(record["date"])[:10] < cutoff
+                (expired if expiring else kept).append(record)
+            if not expired:
+                return 0
+            if action == "archive":
+                archive = DataLoader.get_data("attendance_archive")
+                archive.extend(expired)
+                DataLoader.save_data("attendance_archive", archive)
+            DataLoader.save_data("attendance", kept)
+        logger.info(f"Retention: {action}d {len(expired)} attendance records dated before {cutoff}.")
+        return len(expired)
+
+    @staticmethod
+    def _add(rollups, record, gym_id):
+        class_id = record.get("class_id")
+        for granularity, day, hour in AttendanceRollups.rollup_keys(record):
+            rollup_id = AttendanceRollups.rollup_id(granularity, day, hour, gym_id, class_id)
+            row = rollups.get(rollup_id)
+            if row is None:
+                rollups.insert({
+                    "rollup_id": rollup_id,
+                    "granularity": granularity,
+                    "date": day,
+                    "hour": hour,
+                    "gym_id": gym_id,
+                    "class_id": class_id,
+                    "check_ins": 1,
+                })
+            else:
+                rollups.update(rollup_id, {"check_ins": row["check_ins"] + 1})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain attendance rollups and apply the raw-data retention policy.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from raw attendance")
+    parser.add_argument("--apply-retention", action="store_true", help="Archive or delete raw rows past the window")
+    parser.add_argument("--days", type=int, help=f"Retention window in days (default {AttendanceRollups.retention_days})")
+    parser.add_argument("--action", choices=RETENTION_ACTIONS, help="What to do with expired rows")
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"Rollup rows: {AttendanceRollups.rebuild()}")
+    if args.apply_retention:
+        print(f"Raw rows removed: {AttendanceRollups.apply_retention(retention_days=args.days, action=args.action)}")
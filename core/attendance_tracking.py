@@ -1,6 +1,7 @@
 # core/attendance_manager.py
 
 from utils.helpers import generate_unique_id
+from core.attendance_rollups import AttendanceRollups
 from database.data_loader import DataLoader
 from datetime import datetime
 
@@ -16,29 +17,32 @@ class AttendanceManager:
         :param user_id: ID of the gym user.
         :param date: Date of the class session in 'YYYY-MM-DD' format. Defaults to today.
         """
-        attendance_records = DataLoader.get_data("attendance")
-
-        # Generate unique attendance_id
-        new_attendance_num = generate_unique_id(attendance_records, "attendance_id", prefix='A')
-        new_attendance_id = f"A{new_attendance_num}"
-
-        # If date not provided, use today's date
-        if not date:
-            date = datetime.now().strftime("%Y-%m-%d")
-
-        # Current timestamp
-        timestamp = datetime.now().strftime("%H:%M:%S")
-
-        new_record = {
-            "attendance_id": new_attendance_id,
-            "class_id": class_id,
-            "user_id": user_id,
-            "date": date,
-            "timestamp": timestamp
-        }
-
-        attendance_records.append(new_record)
-        DataLoader.save_data("attendance", attendance_records)
+        with DataLoader.transaction():
+            attendance_records = DataLoader.get_data("attendance")
+
+            # Generate unique attendance_id
+            new_attendance_num = generate_unique_id(attendance_records, "attendance_id")
+            new_attendance_id = f"A{new_attendance_num}"
+
+            # If date not provided, use today's date
+            if not date:
+                date = datetime.now().strftime("%Y-%m-%d")
+
+            # Current timestamp
+            timestamp = datetime.now().strftime("%H:%M:%S")
+
+            new_record = {
+                "attendance_id": new_attendance_id,
+                "class_id": class_id,
+                "user_id": user_id,
+                "date": date,
+                "timestamp": timestamp
+            }
+
+            attendance_records.append(new_record)
+            DataLoader.save_data("attendance", attendance_records)
+            # Count the check-in in the daily and hourly rollups, saved with the record
+            AttendanceRollups.record(new_record)
         print(f"Attendance recorded: {new_record}")
 
     @staticmethod
@@ -50,13 +54,10 @@ class AttendanceManager:
         :param date: Date in 'YYYY-MM-DD' format. If None, retrieves all dates.
         :return: List of attendance records.
         """
-        attendance_records = DataLoader.get_data("attendance")
+        where = {"class_id": class_id}
         if date:
-            filtered = [record for record in attendance_records if
-                        record["class_id"] == class_id and record["date"] == date]
-        else:
-            filtered = [record for record in attendance_records if record["class_id"] == class_id]
-        return filtered
+            where["date"] = date
+        return DataLoader.query("attendance", where)
 
     @staticmethod
     def get_attendance_by_user(user_id, date=None):
@@ -67,13 +68,20 @@ class AttendanceManager:
         :param date: Date in 'YYYY-MM-DD' format. If None, retrieves all dates.
         :return: List of attendance records.
         """
-        attendance_records = DataLoader.get_data("attendance")
         if date:
-            filtered = [record for record in attendance_records if
-                        record["user_id"] == user_id and record["date"] == date]
-        else:
-            filtered = [record for record in attendance_records if record["user_id"] == user_id]
-        return filtered
+            return DataLoader.find("attendance", user_id=user_id, date=date)
+        return DataLoader.find("attendance", user_id=user_id)
+
+    @staticmethod
+    def get_attendance_by_period(start_date, end_date=None):
+        """
+        Retrieve attendance records between two dates, reading only the months involved.
+
+        :param start_date: First date in 'YYYY-MM-DD' format.
+        :param end_date: Last date in 'YYYY-MM-DD' format. If None, only start_date.
+        :return: List of attendance records.
+        """
+        return DataLoader.get_period("attendance", start_date, end_date)
 
     @staticmethod
     def view_all_attendance():
@@ -83,3 +91,12 @@ class AttendanceManager:
         :return: List of all attendance records.
         """
         return DataLoader.get_data("attendance")
+
+    @staticmethod
+    def iter_all_attendance():
+        """
+        Iterate over all attendance records without loading the full history.
+
+        :return: Iterator of attendance records.
+        """
+        return DataLoader.iter_data("attendance")
@@ -0,0 +1,196 @@
+# core/bulk_export.py
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+from database.data_loader import DataLoader
+from database.serialization import get_codec
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "jsonl")
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Open bounds used when only one end of a date range is given
+EARLIEST, LATEST = "0000-01-01", "9999-12-31"
+
+
+class BulkExport:
+    """
+    Export any DataLoader source to CSV or JSON-Lines, streaming record by record.
+
+    Records flow from storage through the filter stages (a date range, a gym,
+    field criteria, an optional predicate) and an optional projection onto a
+    list of fields, and are written as they arrive, optionally gzip-compressed.
+    Date ranges on partitioned sources (payments, attendance) only open the
+    months they overlap, and nothing holds more than one partition at a time,
+    so multi-million-row histories export in bounded memory.
+
+    Example: payments of gym G1 in Q3 2024, three columns, compressed:
+        BulkExport.export("payments", "q3.csv.gz", fields=["payment_id", "amount", "status"],
+                          start_date="2024-07-01", end_date="2024-09-30", gym_id="G1")
+    """
+
+    @staticmethod
+    def records(source_name, start_date=None, end_date=None, gym_id=None, where=None, **criteria):
+        """
+        Yield the records of a source that pass every filter.
+
+        :param source_name: Name of the data source.
+        :param start_date: First date (inclusive) of the source's "partition_by" field, or None.
+        :param end_date: Last date (inclusive), or None for no upper bound.
+        :param gym_id: Keep only records belonging to this gym (see gym_filter).
+        :param where: Optional predicate; records for which it returns False are skipped.
+        :param criteria: Field/value pairs that must all match.
+        """
+        if start_date is None and end_date is None:
+            records = DataLoader.iter_data(source_name)
+        else:
+            records = DataLoader.iter_period(source_name, start_date or EARLIEST, end_date or LATEST)
+        belongs = BulkExport.gym_filter(gym_id) if gym_id is not None else None
+        for record in records:
+            if criteria and not all(record.get(field) == value for field, value in criteria.items()):
+                continue
+            if belongs is not None and not belongs(record):
+                continue
+            if where is not None and not where(record):
+                continue
+            yield record
+
+    @staticmethod
+    def gym_filter(gym_id):
+        """
+        Return a predicate telling whether a record belongs to a gym.
+
+        Records with a gym_id field are compared directly; otherwise a record
+        belongs to the gym of its class (attendance) or of its member (payments,
+        appointments). The gym's member and class IDs are looked up once.
+        """
+        member_ids = {member["member_id"] for member in DataLoader.find("members", gym_id=gym_id)}
+        class_ids = {cls["class_id"] for cls in DataLoader.find("classes", gym_id=gym_id)}
+
+        def belongs(record):
+            if "gym_id" in record:
+                return record["gym_id"] == gym_id
+            if "class_id" in record:
+                return record["class_id"] in class_ids
+            return record.get("member_id") in member_ids
+        return belongs
+
+    @staticmethod
+    def project(records, fields):
+        """Yield each record reduced to the given fields, in that order (missing fields become None)."""
+        for record in records:
+            yield {field: record.get(field) for field in fields}
+
+    @staticmethod
+    def export(source_name, filepath, fields=None, file_format=None, compress=None,
+               start_date=None, end_date=None, gym_id=None, where=None, **criteria):
+        """
+        Stream the filtered records of a source into a CSV or JSON-Lines file.
+
+        :param source_name: Name of the data source.
+        :param filepath: Output file.
+        :param fields: Fields to export, in column order. CSV exports without
+                       fields read the filtered records twice: once to collect
+                       the column names, once to write the rows.
+        :param file_format: "csv" or "jsonl"; by default taken from the file
+                            extension (a trailing .gz is ignored).
+        :param compress: Gzip the output; by default when filepath ends with .gz.
+        :param start_date, end_date, gym_id, where, criteria: Filters, see records().
+        :return: Number of records written.
+        """
+        if compress is None:
+            compress = filepath.lower().endswith(".gz")
+        file_format = file_format or BulkExport.format_of(filepath)
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported export format '{file_format}'. Choose from {FORMATS}.")
+
+        def select():
+            records = BulkExport.records(source_name, start_date, end_date, gym_id, where, **criteria)
+            return BulkExport.project(records, fields) if fields else records
+
+        if file_format == "jsonl":
+            count = BulkExport.write_json_lines(filepath, select(), compress)
+        else:
+            count = BulkExport.write_csv(filepath, select(), fields or BulkExport.field_names(select()), compress)
+        logger.info(f"Exported {count} {source_name} records to {filepath} ({file_format}{', gzip' if compress else ''}).")
+        return count
+
+    @staticmethod
+    def format_of(filepath):
+        """Return the export format implied by a file name such as payments.csv.gz."""
+        name = filepath.lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        file_format = EXTENSIONS.get(os.path.splitext(name)[1])
+        if file_format is None:
+            raise ValueError(f"Cannot tell the export format of '{filepath}'; use .csv or .jsonl.")
+        return file_format
+
+    @staticmethod
+    def field_names(records):
+        """Return every field name used by the records, in order of first appearance."""
+        fields = {}
+        for record in records:
+            for field in record:
+                fields.setdefault(field)
+        return list(fields)
+
+    @staticmethod
+    def write_json_lines(filepath, records, compress=False):
+        """Write records as compact JSON-Lines, one at a time; returns the number written."""
+        codec = get_codec("fast")
+        count = 0
+        with BulkExport._open(filepath, compress, binary=True) as file:
+            for record in records:
+                file.write(codec.dumps(record))
+                file.write(b"\n")
+                count += 1
+        return count
+
+    @staticmethod
+    def write_csv(filepath, records, fields, compress=False):
+        """
+        Write records as CSV rows, one at a time; returns the number written.
+
+        Lists and dictionaries (e.g. class schedules) are written as JSON text,
+        None as an empty cell; fields not in the header are left out.
+        """
+        count = 0
+        with BulkExport._open(filepath, compress, binary=False) as file:
+            writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for record in records:
+                writer.writerow({
+                    field: json.dumps(value) if isinstance(value, (list, dict)) else value
+                    for field, value in record.items()
+                })
+                count += 1
+        return count
+
+    @staticmethod
+    def _open(filepath, compress, binary):
+        if compress:
+            return gzip.open(filepath, "wb" if binary else "wt", newline=None if binary else "")
+        return open(filepath, "wb" if binary else "w", newline=None if binary else "")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a collection to CSV or JSON-Lines (add .gz to compress).")
+    parser.add_argument("source", choices=sorted(DataLoader.data_sources))
+    parser.add_argument("file", help="Output file, e.g. payments.csv or attendance.jsonl.gz")
+    parser.add_argument("--fields", help="Comma-separated fields to export (default: all)")
+    parser.add_argument("--from", dest="start_date", help="First date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", help="Last date, YYYY-MM-DD")
+    parser.add_argument("--gym", dest="gym_id", help="Only records belonging to this gym ID")
+    parser.add_argument("--where", action="append", default=[], metavar="FIELD=VALUE",
+                        help="Only records whose field equals the value (repeatable)")
+    args = parser.parse_args()
+    criteria = dict(condition.split("=", 1) for condition in args.where)
+    fields = args.fields.split(",") if args.fields else None
+    total = BulkExport.export(args.source, args.file, fields=fields, start_date=args.start_date,
+                              end_date=args.end_date, gym_id=args.gym_id, **criteria)
+    print(f"Exported {total} {args.source} records to {args.file}.")
@@ -0,0 +1,268 @@
+# core/bulk_import.py
+import argparse
+import csv
+import json
+import logging
+from collections import defaultdict
+from core.class_activity_manager import ClassActivityManager
+from core.member_management import MemberManagement
+from core.payments import PaymentManager
+from database.data_loader import DataLoader
+from database.file_handler import FileHandler
+from utils.helpers import (
+    generate_payment_ids, generate_unique_ids, validate_date, validate_payment_type
+)
+
+logger = logging.getLogger(__name__)
+
+USER_TYPES = ["Gym User", "Training Staff", "Wellbeing Staff", "Management Staff"]
+PAYMENT_STATUSES = ["Paid", "Pending"]
+PAYMENT_METHODS = ["Credit Card", "Direct Debit"]
+
+# Member fields given as JSON text in CSV files
+JSON_FIELDS = ("schedule",)
+
+
+class BulkImport:
+    """
+    Import many members, payments or classes at once from CSV or JSON/JSON-Lines.
+
+    Rows are validated in one pass against lookup tables built once (gyms,
+    members, existing class names), IDs for the accepted rows are allocated
+    as a block, and each collection is saved once in a single transaction,
+    instead of the load-scan-save cycle add_member and friends repeat per record.
+
+    Every import returns a report:
+        {"imported": number of rows saved, "ids": their new IDs in row order,
+         "rejected": [{"row": 1-based row number, "errors": [...], "record": row}, ...]}
+    Rejected rows do not stop the import; with dry_run=True nothing is saved.
+    """
+
+    @staticmethod
+    def read_rows(source):
+        """
+        Return the rows to import.
+
+        :param source: Path of a .csv file (read with FileHandler.read_csv), of a
+                       JSON-array or JSON-Lines file, or an iterable of dictionaries.
+        """
+        if not isinstance(source, str):
+            return list(source)
+        if source.lower().endswith(".csv"):
+            return [BulkImport._from_csv(row) for row in FileHandler.read_csv(source)]
+        return list(FileHandler.iter_json(source))
+
+    @staticmethod
+    def import_members(source, dry_run=False):
+        """Import members; rows take the add_member arguments (name, user_type, gym_id, payment_type, ...)."""
+        rows = BulkImport.read_rows(source)
+        report = BulkImport._new_report()
+        gyms = DataLoader.get_collection("gyms")
+
+        accepted = []
+        for number, row in enumerate(rows, start=1):
+            errors = []
+            name, user_type, gym_id = row.get("name"), row.get("user_type"), row.get("gym_id")
+            if not name:
+                errors.append("Name is required.")
+            if user_type not in USER_TYPES:
+                errors.append(f"Invalid user type '{user_type}'.")
+            gym = gyms.get(gym_id)
+            if not gym:
+                errors.append(f"Invalid gym ID '{gym_id}'.")
+            payment_type = row.get("payment_type") or "Monthly"
+            try:
+                validate_payment_type(payment_type)
+            except ValueError as e:
+                errors.append(str(e))
+            extra = {k: v for k, v in row.items() if k not in ("name", "user_type", "gym_id", "payment_type")}
+            if not errors:
+                try:
+                    # Validates user-type specific fields such as staff schedules
+                    accepted.append(MemberManagement.build_member(None, name, user_type, gym, payment_type, **extra))
+                except ValueError as e:
+                    errors.append(str(e))
+            BulkImport._check(report, number, row, errors)
+
+        with DataLoader.transaction():
+            members = DataLoader.get_data("members")
+            for member, member_id in zip(accepted, generate_unique_ids(members, "member_id", len(accepted))):
+                member["member_id"] = member_id
+            BulkImport._save(report, "members", members, accepted, "member_id", dry_run)
+        return report
+
+    @staticmethod
+    def import_payments(source, dry_run=False):
+        """
+        Import payments; rows take the add_payment arguments (member_id, amount, date,
+        status, payment_type, payment_method, discount_applied). Loyalty points
+        earned by annual payments are added with one save of the members.
+        """
+        rows = BulkImport.read_rows(source)
+        report = BulkImport._new_report()
+
+        with DataLoader.transaction():
+            members = DataLoader.get_collection("members")
+            accepted = []
+            points = defaultdict(int)
+            for number, row in enumerate(rows, start=1):
+                errors = []
+                member = members.get(row.get("member_id"))
+                if not member:
+                    errors.append(f"Member ID {row.get('member_id')} does not exist.")
+                try:
+                    amount = float(row.get("amount"))
+                    if amount <= 0:
+                        errors.append("Payment amount must be greater than zero.")
+                except (TypeError, ValueError):
+                    errors.append(f"Invalid payment amount '{row.get('amount')}'.")
+                if not validate_date(str(row.get("date"))):
+                    errors.append(f"Invalid date '{row.get('date')}'; expected YYYY-MM-DD.")
+                if row.get("status") not in PAYMENT_STATUSES:
+                    errors.append(f"Invalid status '{row.get('status')}'.")
+                try:
+                    validate_payment_type(row.get("payment_type"))
+                except ValueError as e:
+                    errors.append(str(e))
+                if row.get("payment_method") not in PAYMENT_METHODS:
+                    errors.append(f"Invalid payment method '{row.get('payment_method')}'.")
+                discount_applied = row.get("discount_applied") or "No"
+                if discount_applied not in ("Yes", "No"):
+                    errors.append(f"discount_applied must be 'Yes' or 'No', not '{discount_applied}'.")
+                if not errors:
+                    payment, loyalty_points = PaymentManager.build_payment(
+                        None, member, amount, row["date"], row["status"], row["payment_type"],
+                        row["payment_method"], discount_applied
+                    )
+                    accepted.append(payment)
+                    points[member["member_id"]] += loyalty_points
+                BulkImport._check(report, number, row, errors)
+
+            payments = DataLoader.get_data("payments")
+            for payment, payment_id in zip(accepted, generate_payment_ids(payments, len(accepted))):
+                payment["payment_id"] = payment_id
+            BulkImport._save(report, "payments", payments, accepted, "payment_id", dry_run)
+            if any(points.values()) and not dry_run:
+                member_records = DataLoader.get_data("members")
+                for member in member_records:
+                    if points.get(member["member_id"]):
+                        member["loyalty_points"] = member.get("loyalty_points", 0) + points[member["member_id"]]
+                DataLoader.save_data("members", member_records)
+        return report
+
+    @staticmethod
+    def import_classes(source, dry_run=False):
+        """Import classes; rows take the add_class arguments (class_name, trainer_id, schedule, capacity, gym_id)."""
+        rows = BulkImport.read_rows(source)
+        report = BulkImport._new_report()
+        gyms = DataLoader.get_collection("gyms")
+        members = DataLoader.get_collection("members")
+
+        with DataLoader.transaction():
+            classes = DataLoader.get_data("classes")
+            names = {(c.get("gym_id"), str(c.get("class_name", "")).lower()) for c in classes}
+            accepted = []
+            for number, row in enumerate(rows, start=1):
+                errors = []
+                class_name, gym_id = row.get("class_name"), row.get("gym_id")
+                if not class_name:
+                    errors.append("Class name is required.")
+                elif (gym_id, class_name.lower()) in names:
+                    errors.append(f"A class named '{class_name}' already exists in gym '{gym_id}'.")
+                gym = gyms.get(gym_id)
+                if not gym:
+                    errors.append(f"Invalid gym ID '{gym_id}'.")
+                trainer = members.get(row.get("trainer_id"))
+                if not trainer or trainer.get("user_type") != "Training Staff":
+                    errors.append(f"Invalid trainer '{row.get('trainer_id')}'.")
+                try:
+                    capacity = int(row.get("capacity"))
+                    if capacity <= 0:
+                        raise ValueError
+                except (TypeError, ValueError):
+                    errors.append("Capacity must be a positive integer.")
+                try:
+                    schedule = ClassActivityManager.validate_schedule(row.get("schedule"))
+                except ValueError as e:
+                    errors.append(str(e))
+                if not errors:
+                    accepted.append(ClassActivityManager.build_class(
+                        None, class_name, row["trainer_id"], trainer, gym, schedule, capacity
+                    ))
+                    names.add((gym_id, class_name.lower()))
+                BulkImport._check(report, number, row, errors)
+
+            for cls, class_id in zip(accepted, generate_unique_ids(classes, "class_id", len(accepted))):
+                cls["class_id"] = class_id
+            BulkImport._save(report, "classes", classes, accepted, "class_id", dry_run)
+        return report
+
+    @staticmethod
+    def write_error_report(report, filepath):
+        """Write the rejected rows of an import report as CSV: row number, errors, then the row's own fields."""
+        fields = []
+        for rejected in report["rejected"]:
+            fields.extend(field for field in rejected["record"] if field not in fields)
+        with open(filepath, mode="w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["row", "errors"] + fields)
+            writer.writeheader()
+            for rejected in report["rejected"]:
+                record = {k: v if isinstance(v, str) else json.dumps(v) for k, v in rejected["record"].items()}
+                writer.writerow({**record, "row": rejected["row"], "errors": "; ".join(rejected["errors"])})
+
+    @staticmethod
+    def _from_csv(row):
+        """Drop empty cells (so defaults apply) and decode the fields CSV can only hold as text."""
+        row = {field: value for field, value in row.items() if value not in ("", None)}
+        for field in JSON_FIELDS:
+            if isinstance(row.get(field), str):
+                try:
+                    row[field] = json.loads(row[field])
+                except ValueError:
+                    pass  # reported by the schedule validation
+        if "cost" in row:
+            try:
+                row["cost"] = int(row["cost"]) if row["cost"].isdigit() else float(row["cost"])
+            except ValueError:
+                pass
+        return row
+
+    @staticmethod
+    def _new_report():
+        return {"imported": 0, "ids": [], "rejected": []}
+
+    @staticmethod
+    def _check(report, number, row, errors):
+        if errors:
+            report["rejected"].append({"row": number, "errors": errors, "record": row})
+
+    @staticmethod
+    def _save(report, source_name, records, accepted, key, dry_run):
+        report["imported"] = len(accepted)
+        report["ids"] = [record[key] for record in accepted]
+        if accepted and not dry_run:
+            records.extend(accepted)
+            DataLoader.save_data(source_name, records)
+        logger.info(
+            f"Bulk import into {source_name}: {len(accepted)} rows {'validated' if dry_run else 'imported'}, "
+            f"{len(report['rejected'])} rejected."
+        )
+
+
+if __name__ == "__main__":
+    importers = {
+        "members": BulkImport.import_members,
+        "payments": BulkImport.import_payments,
+        "classes": BulkImport.import_classes,
+    }
+    parser = argparse.ArgumentParser(description="Bulk import members, payments or classes from CSV or JSON-Lines.")
+    parser.add_argument("collection", choices=sorted(importers))
+    parser.add_argument("file", help="CSV, JSON or JSON-Lines file")
+    parser.add_argument("--errors", help="Write rejected rows to this CSV file")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only; save nothing")
+    args = parser.parse_args()
+    result = importers[args.collection](args.file, dry_run=args.dry_run)
+    print(f"Imported {result['imported']} {args.collection}; rejected {len(result['rejected'])} rows.")
+    if args.errors and result["rejected"]:
+        BulkImport.write_error_report(result, args.errors)
+        print(f"Rejected rows written to {args.errors}.")
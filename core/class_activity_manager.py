@@ -6,6 +6,7 @@ from utils.helpers import generate_unique_id
 from database.data_loader import DataLoader
 from core.member_management import MemberManagement
 from core.gym_management import GymManager
+from core.class_registrations import ClassRegistrations
 import re
 
 
@@ -38,10 +39,9 @@ class ClassActivityManager:
         """
         try:
             classes = DataLoader.get_data("classes")
-            gyms = DataLoader.get_data("gyms")
 
             # Verify gym_id exists
-            gym = next((g for g in gyms if g["gym_id"] == gym_id), None)
+            gym = DataLoader.get_collection("gyms").get(gym_id)
             if not gym:
                 logger.error("Invalid gym ID provided.")
                 raise ValueError("Invalid gym ID provided.")
@@ -69,17 +69,9 @@ class ClassActivityManager:
                 logger.error("Invalid trainer selected.")
                 raise ValueError("Invalid trainer selected.")
 
-            new_class = {
-                "class_id": str(new_class_id),
-                "class_name": class_name,
-                "trainer_id": trainer_id,
-                "trainer_name": trainer["name"],
-                "gym_id": gym_id,
-                "gym_name": gym["gym_name"],
-                "schedule": validated_schedule,
-                "capacity": capacity,
-                "registered_users": []  # List to hold member_ids
-            }
+            new_class = ClassActivityManager.build_class(
+                new_class_id, class_name, trainer_id, trainer, gym, validated_schedule, capacity
+            )
 
             classes.append(new_class)
             DataLoader.save_data("classes", classes)
@@ -89,6 +81,27 @@ class ClassActivityManager:
             logger.error(f"Failed to add class '{class_name}': {e}")
             raise
 
+    @staticmethod
+    def build_class(class_id, class_name, trainer_id, trainer, gym, schedule, capacity):
+        """
+        Build a new class record from validated fields (shared by add_class and bulk imports).
+
+        :param trainer: The training staff member record.
+        :param gym: The gym record.
+        :return: Class dictionary.
+        """
+        return {
+            "class_id": str(class_id),
+            "class_name": class_name,
+            "trainer_id": trainer_id,
+            "trainer_name": trainer["name"],
+            "gym_id": gym["gym_id"],
+            "gym_name": gym["gym_name"],
+            "schedule": schedule,
+            "capacity": capacity,
+            "registered_users": []  # Registrations live in the registrations collection
+        }
+
     @staticmethod
     def view_all_classes():
         """
@@ -97,7 +110,7 @@ class ClassActivityManager:
         :return: List of class dictionaries.
         """
         try:
-            classes = DataLoader.get_data("classes")
+            classes = ClassRegistrations.classes_with_registrations()
             logger.info(f"Retrieved {len(classes)} classes from the system.")
             return classes
         except Exception as e:
@@ -149,7 +162,7 @@ class ClassActivityManager:
                     if not isinstance(value, int) or value <= 0:
                         logger.error("Capacity must be a positive integer.")
                         raise ValueError("Capacity must be a positive integer.")
-                    if value < len(class_to_update["registered_users"]):
+                    if value < ClassRegistrations.class_count(class_id):
                         logger.error("New capacity is less than the number of registered users.")
                         raise ValueError("New capacity cannot be less than the number of registered users.")
                     class_to_update["capacity"] = value
@@ -173,14 +186,16 @@ class ClassActivityManager:
         :param class_id: ID of the class to delete.
         """
         try:
-            classes = DataLoader.get_data("classes")
-            updated_classes = [c for c in classes if c["class_id"] != class_id]
+            with DataLoader.transaction():
+                classes = DataLoader.get_data("classes")
+                updated_classes = [c for c in classes if c["class_id"] != class_id]
 
-            if len(updated_classes) == len(classes):
-                logger.error(f"Class ID '{class_id}' not found.")
-                raise ValueError(f"Class ID '{class_id}' not found.")
+                if len(updated_classes) == len(classes):
+                    logger.error(f"Class ID '{class_id}' not found.")
+                    raise ValueError(f"Class ID '{class_id}' not found.")
 
-            DataLoader.save_data("classes", updated_classes)
+                DataLoader.save_data("classes", updated_classes)
+                ClassRegistrations.delete_class_registrations(class_id)
             logger.info(f"Class ID '{class_id}' deleted successfully.")
             return True
         except Exception as e:
@@ -196,8 +211,7 @@ class ClassActivityManager:
         :return: List of schedules.
         """
         try:
-            classes = DataLoader.get_data("classes")
-            trainer_classes = [c["schedule"] for c in classes if c["trainer_id"] == trainer_id]
+            trainer_classes = [c["schedule"] for c in DataLoader.find("classes", trainer_id=trainer_id)]
             logger.info(f"Retrieved schedule for trainer '{trainer_id}'.")
             return trainer_classes
         except Exception as e:
@@ -213,10 +227,8 @@ class ClassActivityManager:
         :return: Integer count of registered users.
         """
         try:
-            classes = DataLoader.get_data("classes")
-            cls = next((c for c in classes if c["class_id"] == class_id), None)
-            if cls:
-                count = len(cls.get("registered_users", []))
+            if class_id in DataLoader.get_collection("classes"):
+                count = ClassRegistrations.class_count(class_id)
                 logger.info(f"Class '{class_id}' has {count} registered users.")
                 return count
             logger.warning(f"Class ID '{class_id}' not found.")
@@ -234,17 +246,19 @@ class ClassActivityManager:
         :param member_id: ID of the gym user.
         """
         try:
-            classes = DataLoader.get_data("classes")
-            cls = next((c for c in classes if c["class_id"] == class_id), None)
+            registrations = ClassRegistrations.get_collection()
+            cls = DataLoader.get_collection("classes").get(class_id)
             if not cls:
                 logger.error(f"Class ID '{class_id}' not found.")
                 raise ValueError(f"Class ID '{class_id}' not found.")
 
-            if len(cls["registered_users"]) >= cls["capacity"]:
+            if ClassRegistrations.class_count(class_id, registrations) >= cls["capacity"]:
                 logger.warning(f"Class '{class_id}' capacity reached.")
                 raise ValueError("Class capacity reached.")
 
-            if member_id in cls["registered_users"]:
+            # Registrations made here have no day or time slot
+            registration = ClassRegistrations.new_registration(class_id, member_id, None, None)
+            if registration["registration_id"] in registrations:
                 logger.warning(f"User '{member_id}' already registered for class '{class_id}'.")
                 raise ValueError("User already registered for this class.")
 
@@ -254,8 +268,9 @@ class ClassActivityManager:
                 logger.error(f"Member ID '{member_id}' does not exist.")
                 raise ValueError("Member does not exist.")
 
-            cls["registered_users"].append(member_id)
-            DataLoader.save_data("classes", classes)
+            registrations = ClassRegistrations.for_update()
+            registrations.insert(registration)
+            DataLoader.save_collection(registrations)
             logger.info(f"Member ID '{member_id}' registered to Class ID '{class_id}' successfully.")
             return True
         except Exception as e:
@@ -333,16 +348,10 @@ class ClassActivityManager:
         Returns:
             list: A list of activities matching the search criteria. Each activity is a dictionary with full details.
         """
-        # Fetch all activities
-        activities = cls.view_all_classes()
-
-        # Filter activities based on gym_id and trainer_id
-        filtered_activities = []
-        for activity in activities:
-            matches_gym = gym_id is None or str(activity['gym_id']) == str(gym_id)
-            matches_trainer = trainer_id is None or str(activity['trainer_id']) == str(trainer_id)
-
-            if matches_gym and matches_trainer:
-                filtered_activities.append(activity)
-
-        return filtered_activities
+        # Filter on the gym and trainer indexes instead of scanning every class
+        where = {}
+        if gym_id is not None:
+            where["gym_id"] = str(gym_id)
+        if trainer_id is not None:
+            where["trainer_id"] = str(trainer_id)
+        return ClassRegistrations.attach(DataLoader.query("classes", where))
@@ -0,0 +1,189 @@
+# core/class_registrations.py
+import logging
+from database.data_loader import DataLoader
+from database.keyed_collection import KeyedCollection
+
+logger = logging.getLogger(__name__)
+
+# Composite index of the registrations source: one bucket per class time slot,
+# whose size is the slot's occupancy.
+SLOT = ("class_id", "day", "time")
+
+
+class ClassRegistrations:
+    """
+    Class registrations kept in their own collection rather than nested in classes.json.
+
+    Each record is one (class_id, day, time, member_id) booking, keyed by
+    registration_id. The SLOT index is maintained incrementally by the
+    collection, so capacity checks and duplicate detection are dictionary
+    lookups, and registering a member appends to the registrations journal
+    instead of rewriting every class.
+
+    Classes saved in the old layout, with a "registered_users" list per
+    class, are still read: reads and validation see those lists merged in
+    memory, and they are moved into the collection for good by the first
+    change actually made to registrations (``for_update``, called once a
+    change has been validated) or by running this module.
+    """
+
+    @staticmethod
+    def registration_id(class_id, day, time, member_id):
+        return f"{class_id}|{day}|{time}|{member_id}"
+
+    @staticmethod
+    def new_registration(class_id, member_id, day, time):
+        return {
+            "registration_id": ClassRegistrations.registration_id(class_id, day, time, member_id),
+            "class_id": class_id,
+            "member_id": member_id,
+            "day": day,
+            "time": time,
+        }
+
+    @staticmethod
+    def get_collection(data_loader=DataLoader):
+        """
+        Return the registrations for reading; writes nothing.
+
+        Registrations still nested in classes are merged into a separate,
+        read-only collection; otherwise the loader's own collection is returned.
+        :param data_loader: DataLoader or a read snapshot to read from.
+        """
+        registrations = data_loader.get_collection("registrations")
+        pending = [
+            record for record in ClassRegistrations.nested(data_loader.get_collection("classes"))
+            if record["registration_id"] not in registrations
+        ]
+        if not pending:
+            return registrations
+        source = DataLoader.data_sources["registrations"]
+        return KeyedCollection(
+            "registrations", source["key"], list(registrations) + pending, source.get("indexes", ())
+        )
+
+    @staticmethod
+    def for_update():
+        """Return the registrations collection to change and save, importing nested registrations first."""
+        ClassRegistrations.import_nested()
+        return DataLoader.get_collection("registrations")
+
+    @staticmethod
+    def nested(classes):
+        """
+        Yield a registration record for each entry of the classes' "registered_users" lists.
+
+        Entries are either {"member_id", "day", "time"} dictionaries or, from
+        the older ClassActivityManager.register_user_to_class, bare member IDs
+        (stored without a day or time).
+        """
+        for cls in classes:
+            for entry in cls.get("registered_users") or []:
+                if isinstance(entry, dict):
+                    member_id, day, time = entry.get("member_id"), entry.get("day"), entry.get("time")
+                else:
+                    member_id, day, time = entry, None, None
+                yield ClassRegistrations.new_registration(cls["class_id"], member_id, day, time)
+
+    @staticmethod
+    def import_nested():
+        """
+        Move "registered_users" lists left in classes into the registrations collection.
+
+        Rewrites classes, so it runs only before a change to registrations or
+        as a one-off migration (python -m core.class_registrations).
+
+        :return: Number of registrations imported.
+        """
+        if not any(cls.get("registered_users") for cls in DataLoader.get_collection("classes")):
+            return 0
+
+        imported = 0
+        with DataLoader.transaction():
+            classes = DataLoader.get_data("classes")
+            registrations = DataLoader.get_collection("registrations")
+            for record in ClassRegistrations.nested(classes):
+                if record["registration_id"] not in registrations:
+                    registrations.insert(record)
+                    imported += 1
+            for cls in classes:
+                if "registered_users" in cls:
+                    cls["registered_users"] = []
+            DataLoader.save_collection(registrations)
+            DataLoader.save_data("classes", classes)
+        logger.info(f"Moved {imported} nested class registrations into the registrations collection.")
+        return imported
+
+    @staticmethod
+    def slot_count(class_id, day, time, registrations=None):
+        """Return the number of members registered for one time slot of a class."""
+        if registrations is None:
+            registrations = ClassRegistrations.get_collection()
+        return registrations.count_indexed(SLOT, (class_id, day, time))
+
+    @staticmethod
+    def class_count(class_id, registrations=None):
+        """Return the number of registrations across all time slots of a class."""
+        if registrations is None:
+            registrations = ClassRegistrations.get_collection()
+        return registrations.count_indexed("class_id", class_id)
+
+    @staticmethod
+    def registered_users(class_id, registrations=None):
+        """Return a class's registrations in the old nested format ({"member_id", "day", "time"})."""
+        if registrations is None:
+            registrations = ClassRegistrations.get_collection()
+        return [
+            {"member_id": r["member_id"], "day": r["day"], "time": r["time"]}
+            for r in registrations.find(class_id=class_id)
+        ]
+
+    @staticmethod
+    def attach(classes, registrations=None):
+        """
+        Fill in "registered_users" on each class from the registrations collection.
+
+        Keeps screens and reports written against the nested layout working.
+        :param registrations: Registrations to use (e.g. from a read snapshot); defaults to the live collection.
+        :return: The same list of classes.
+        """
+        if registrations is None:
+            registrations = ClassRegistrations.get_collection()
+        by_class = {}
+        for r in registrations:
+            by_class.setdefault(r["class_id"], []).append(
+                {"member_id": r["member_id"], "day": r["day"], "time": r["time"]}
+            )
+        for cls in classes:
+            cls["registered_users"] = by_class.get(cls.get("class_id"), [])
+        return classes
+
+    @staticmethod
+    def classes_with_registrations(data_loader=DataLoader):
+        """
+        Return the classes with their registrations attached (see attach).
+
+        Both are read through data_loader, so a report run on a read snapshot
+        sees one moment of both.
+        :param data_loader: DataLoader or a read snapshot to read from.
+        """
+        registrations = ClassRegistrations.get_collection(data_loader)
+        return ClassRegistrations.attach(data_loader.get_data("classes"), registrations)
+
+    @staticmethod
+    def delete_class_registrations(class_id):
+        """Remove every registration of a class; returns how many were removed."""
+        removed = [r["registration_id"] for r in ClassRegistrations.get_collection().find(class_id=class_id)]
+        if not removed:
+            return 0
+        registrations = ClassRegistrations.for_update()
+        for registration_id in removed:
+            registrations.delete(registration_id)
+        DataLoader.save_collection(registrations)
+        return len(removed)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    count = ClassRegistrations.import_nested()
+    print(f"Moved {count} nested class registrations into {DataLoader.data_sources['registrations']['file']}.")
@@ -0,0 +1,67 @@
+# core/enrichment.py
+from database.data_loader import DataLoader
+from database.aggregation import index_by
+
+
+class EnrichmentContext:
+    """
+    Hash-join helper for decorating records with member, trainer and gym details.
+
+    The id -> record maps are built once when the context is created, so each
+    lookup afterwards is a dictionary access. Build one context per listing
+    (e.g. per refresh of the registrations tab) and reuse it for every row.
+    """
+
+    def __init__(self, members=None, gyms=None):
+        """
+        :param members: Member records to join against (defaults to the members source).
+        :param gyms: Gym records to join against (defaults to the raw gyms source, without
+                     the revenue figures computed by GymManager.view_all_gyms).
+        """
+        if members is None:
+            members = DataLoader.get_data("members")
+        if gyms is None:
+            gyms = DataLoader.get_data("gyms")
+        self.members_by_id = index_by(members, "member_id")
+        self.gyms_by_id = index_by(gyms, "gym_id")
+
+    @classmethod
+    def from_collections(cls):
+        """
+        Return a context that looks records up in the cached members and gyms
+        KeyedCollections instead of building its own maps.
+
+        Suited to enriching a few records, e.g. the rows touched by a change event.
+        """
+        context = cls.__new__(cls)
+        context.members_by_id = DataLoader.get_collection("members")
+        context.gyms_by_id = DataLoader.get_collection("gyms")
+        return context
+
+    def member(self, member_id):
+        """Return the member record for member_id, or an empty dict."""
+        return self.members_by_id.get(member_id) or {}
+
+    def member_name(self, member_id, default="Unknown"):
+        """Return the member's name, or default if the member is unknown."""
+        return self.member(member_id).get("name", default)
+
+    def trainer(self, trainer_id):
+        """Return the staff record for trainer_id, or an empty dict."""
+        return self.member(trainer_id)
+
+    def trainer_name(self, trainer_id, default="Unknown"):
+        """Return the trainer's name, or default if the trainer is unknown."""
+        return self.trainer(trainer_id).get("name", default)
+
+    def gym(self, gym_id):
+        """Return the gym record for gym_id, or an empty dict."""
+        return self.gyms_by_id.get(gym_id) or {}
+
+    def gym_name(self, gym_id, default="Unknown"):
+        """Return the gym's name, or default if the gym is unknown."""
+        return self.gym(gym_id).get("gym_name", default)
+
+    def member_gym_name(self, member_id, default="Unknown"):
+        """Return the name of the gym a member (or staff member) belongs to."""
+        return self.gym_name(self.member(member_id).get("gym_id", ""), default)
@@ -4,6 +4,8 @@ import os
 import logging
 from utils.helpers import generate_unique_id
 from database.data_loader import DataLoader
+from database.aggregation import aggregate, index_by
+from core.class_registrations import ClassRegistrations
 from datetime import datetime
 
 # Configure logging for this module
@@ -19,6 +21,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+STAFF_TYPES = ("Wellbeing Staff", "Training Staff", "Management Staff")
+
 class GymManager:
     @staticmethod
     def add_gym(name, city, manager_name, manager_contact, manager_email):
@@ -125,66 +129,72 @@ class GymManager:
         try:
             gym_id = str(gym_id).strip()  # Ensure gym_id is a clean string
             logger.debug(f"Starting deletion process for Gym ID: '{gym_id}'")
-            gyms = DataLoader.get_data("gyms")
-            logger.debug(f"Loaded gyms: {gyms}")
-
-            if not gyms:
-                logger.warning("No gyms found to delete.")
-                print("No gyms found to delete.")
-                return
-
-            # Log all existing gym IDs
-            existing_gym_ids = [gym["gym_id"] for gym in gyms]
-            logger.debug(f"Existing Gym IDs: {existing_gym_ids}")
-            print(f"Existing Gym IDs: {existing_gym_ids}")
-
-            # Check if gym exists
-            gym_exists = any(gym["gym_id"] == gym_id for gym in gyms)
-            if not gym_exists:
-                logger.error(f"Gym with ID {gym_id} not found.")
-                print(f"Gym with ID {gym_id} not found.")
-                return
-
-            # Remove the gym from gyms.json
-            updated_gyms = [gym for gym in gyms if gym["gym_id"] != gym_id]
-            DataLoader.save_data("gyms", updated_gyms)
-            logger.info(f"Gym with ID {gym_id} deleted successfully from gyms.json.")
-            print(f"Gym with ID {gym_id} deleted successfully.")
-
-            # Remove associated zones from locations.json
-            locations = DataLoader.get_data("locations")
-            logger.debug(f"Current locations before deletion: {locations}")
-
-            updated_locations = [loc for loc in locations if loc["location_id"] != gym_id]
-            DataLoader.save_data("locations", updated_locations)
-            logger.info(f"Location with ID {gym_id} deleted successfully from locations.json.")
-
-            # Remove associated attendance records
-            attendance = DataLoader.get_data("attendance")
-            updated_attendance = [
-                a for a in attendance if a.get("location_id") != gym_id  # Use .get() to handle missing keys
-            ]
-            DataLoader.save_data("attendance", updated_attendance)
-            logger.info(f"Attendance records associated with Gym ID {gym_id} deleted successfully.")
-
-            # Remove associated classes from classes.json
-            classes = DataLoader.get_data("classes")
-            updated_classes = [cls for cls in classes if cls.get("gym_id") != gym_id]
-            DataLoader.save_data("classes", updated_classes)
-            logger.info(f"Classes associated with Gym ID {gym_id} deleted successfully from classes.json.")
-
-            # Update members associated with this gym
-            members = DataLoader.get_data("members")
-            updated_members = []
-            for member in members:
-                if member.get("gym_id") == gym_id:
-                    member["gym_id"] = "Unknown"
-                    member["gym_name"] = "Unknown"
-                updated_members.append(member)
-            DataLoader.save_data("members", updated_members)
-            logger.info(f"Members associated with Gym ID {gym_id} updated to 'Unknown' gym.")
-
-            print("Gym deletion process completed successfully.")
+            # One transaction: each collection is loaded and saved once, and nothing is
+            # written unless every step succeeds.
+            with DataLoader.transaction():
+                gyms = DataLoader.get_data("gyms")
+                logger.debug(f"Loaded gyms: {gyms}")
+
+                if not gyms:
+                    logger.warning("No gyms found to delete.")
+                    print("No gyms found to delete.")
+                    return
+
+                # Log all existing gym IDs
+                existing_gym_ids = [gym["gym_id"] for gym in gyms]
+                logger.debug(f"Existing Gym IDs: {existing_gym_ids}")
+                print(f"Existing Gym IDs: {existing_gym_ids}")
+
+                # Check if gym exists
+                gym_exists = any(gym["gym_id"] == gym_id for gym in gyms)
+                if not gym_exists:
+                    logger.error(f"Gym with ID {gym_id} not found.")
+                    print(f"Gym with ID {gym_id} not found.")
+                    return
+
+                # Remove the gym from gyms.json
+                updated_gyms = [gym for gym in gyms if gym["gym_id"] != gym_id]
+                DataLoader.save_data("gyms", updated_gyms)
+                logger.info(f"Gym with ID {gym_id} deleted successfully from gyms.json.")
+                print(f"Gym with ID {gym_id} deleted successfully.")
+
+                # Remove associated zones from locations.json
+                locations = DataLoader.get_data("locations")
+                logger.debug(f"Current locations before deletion: {locations}")
+
+                updated_locations = [loc for loc in locations if loc["location_id"] != gym_id]
+                DataLoader.save_data("locations", updated_locations)
+                logger.info(f"Location with ID {gym_id} deleted successfully from locations.json.")
+
+                # Remove associated attendance records
+                attendance = DataLoader.get_data("attendance")
+                updated_attendance = [
+                    a for a in attendance if a.get("location_id") != gym_id  # Use .get() to handle missing keys
+                ]
+                DataLoader.save_data("attendance", updated_attendance)
+                logger.info(f"Attendance records associated with Gym ID {gym_id} deleted successfully.")
+
+                # Remove associated classes from classes.json
+                classes = DataLoader.get_data("classes")
+                updated_classes = [cls for cls in classes if cls.get("gym_id") != gym_id]
+                DataLoader.save_data("classes", updated_classes)
+                for cls in classes:
+                    if cls.get("gym_id") == gym_id:
+                        ClassRegistrations.delete_class_registrations(cls["class_id"])
+                logger.info(f"Classes associated with Gym ID {gym_id} deleted successfully from classes.json.")
+
+                # Update members associated with this gym
+                members = DataLoader.get_data("members")
+                updated_members = []
+                for member in members:
+                    if member.get("gym_id") == gym_id:
+                        member["gym_id"] = "Unknown"
+                        member["gym_name"] = "Unknown"
+                    updated_members.append(member)
+                DataLoader.save_data("members", updated_members)
+                logger.info(f"Members associated with Gym ID {gym_id} updated to 'Unknown' gym.")
+
+                print("Gym deletion process completed successfully.")
         except Exception as e:
             logger.error(f"Failed to delete gym '{gym_id}': {e}")
             print(f"Failed to delete gym '{gym_id}': {e}")
@@ -326,15 +336,31 @@ class GymManager:
     def view_all_gyms():
         """
         Retrieve and return all gyms with comprehensive details.
+
+        Each collection is read once and aggregated in a single pass; revenue
+        comes from the columnar payments snapshot, joined to gyms through a
+        member_id -> gym_id map applied once per distinct member.
         :return: List of dictionaries containing gym details.
         """
         try:
             gyms = DataLoader.get_data("gyms")
-            locations = DataLoader.get_data("locations")
+            locations = index_by(DataLoader.get_data("locations"), "location_id")
             members = DataLoader.get_data("members")
-            attendance = DataLoader.get_data("attendance")
-            payments = DataLoader.get_data("payments")
-            classes = DataLoader.get_data("classes")
+            payments = DataLoader.get_snapshot("payments")
+
+            member_gyms = {m["member_id"]: m.get("gym_id") for m in members if "member_id" in m}
+            member_totals = aggregate(members, group_by="gym_id")
+            staff_totals = aggregate(
+                members,
+                group_by=lambda m: (m.get("gym_id"), m.get("user_type")),
+                sums={"cost": lambda m: m.get("cost", 0)},
+                where=lambda m: m.get("user_type") in STAFF_TYPES,
+            )
+            revenue_totals = payments.group_sum(
+                by=(payments.translate("member_id", member_gyms), "status"),
+                value="amount",
+                where={"status": ("Paid", "Pending")},
+            )
 
             result = []
 
@@ -342,30 +368,25 @@ class GymManager:
                 gym_id = gym["gym_id"]
 
                 # Get location zones and city
-                location = next((loc for loc in locations if loc["location_id"] == gym_id), None)
+                location = locations.get(gym_id)
                 zones = location.get("zones", []) if location else []
                 city = location.get("city", "Unknown") if location else "Unknown"
 
                 # Count total members
-                total_members = sum(1 for member in members if member.get("gym_id") == gym_id)
+                total_members = member_totals.get(gym_id, {}).get("count", 0)
 
                 # Calculate revenue by status
-                revenue = {"Total Paid": 0.0, "Total Pending": 0.0}
-                relevant_member_ids = [m["member_id"] for m in members if m.get("gym_id") == gym_id]
-                for payment in payments:
-                    if payment.get("member_id") in relevant_member_ids:
-                        if payment["status"] == "Paid":
-                            revenue["Total Paid"] += float(payment["amount"])
-                        elif payment["status"] == "Pending":
-                            revenue["Total Pending"] += float(payment["amount"])
-
-                # Calculate staff totals (example logic)
-                activities = {
-                    "Wellbeing Staff": {"count": 2, "cost": 3000.0},
-                    "Training Staff": {"count": 5, "cost": 7500.0},
-                    "Management Staff": {"count": 3, "cost": 4500.0},
+                revenue = {
+                    "Total Paid": revenue_totals.get((gym_id, "Paid"), {}).get("amount", 0.0),
+                    "Total Pending": revenue_totals.get((gym_id, "Pending"), {}).get("amount", 0.0),
                 }
 
+                # Staff counts and costs from the members collection
+                activities = {}
+                for staff_type in STAFF_TYPES:
+                    totals = staff_totals.get((gym_id, staff_type), {})
+                    activities[staff_type] = {"count": totals.get("count", 0), "cost": totals.get("cost", 0.0)}
+
                 # Aggregate data
                 result.append({
                     "gym_id": gym_id,
@@ -395,12 +416,10 @@ class GymManager:
         :return: Dictionary containing gym details or None if not found.
         """
         try:
-            gyms = DataLoader.get_data("gyms")
-            gym = next((g for g in gyms if g["gym_id"] == gym_id), None)
+            gym = DataLoader.get_collection("gyms").get(gym_id)
             if gym:
                 # Retrieve city and zones from locations.json
-                locations = DataLoader.get_data("locations")
-                location = next((loc for loc in locations if loc["location_id"] == gym_id), None)
+                location = DataLoader.get_collection("locations").get(gym_id)
                 if location:
                     gym["city"] = location.get("city", "Unknown")
                     gym["zones"] = location.get("zones", [])
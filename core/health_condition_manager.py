@@ -1,44 +1,126 @@
 # health_condition_manager.py
 import json
 import os
-from cryptography.fernet import Fernet
+import logging
+import hashlib
+import threading
+from cryptography.fernet import Fernet, InvalidToken
+from database.health_store import HealthStore
 
+logger = logging.getLogger(__name__)
+
+HEALTH_DIR = os.path.dirname(os.path.abspath(__file__))
+# One encrypted record per member (see HealthStore).
+HEALTH_STORE_FILE = os.path.join(HEALTH_DIR, "health_records.dat")
+# The key the records are encrypted with. It is created on first use and must
+# survive restarts: without it the records cannot be read. Keep it out of
+# version control and back it up separately, or provide it in HEALTH_KEY_ENV.
+HEALTH_KEY_FILE = os.path.join(HEALTH_DIR, "health.key")
+HEALTH_KEY_ENV = "GYM_HEALTH_KEY"
+# Former single-blob file, encrypted as a whole; imported once if the key opens it.
+HEALTH_DATA_FILE = os.path.join(HEALTH_DIR, "health_data.json")
+
+
+def load_key(key_file=HEALTH_KEY_FILE):
+    """
+    Return the Fernet key for health records, creating and saving one on first use.
+
+    The HEALTH_KEY_ENV environment variable, when set, takes precedence over the file.
+    """
+    key = os.environ.get(HEALTH_KEY_ENV)
+    if key:
+        return key.strip().encode("ascii")
+    try:
+        with open(key_file, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    key = Fernet.generate_key()
+    try:
+        # Readable by the owner only; O_EXCL keeps the key of a concurrent first run.
+        fd = os.open(key_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        with open(key_file, "rb") as f:
+            return f.read().strip()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+        f.flush()
+        os.fsync(f.fileno())
+    logger.warning(f"Created a new health data key at {key_file}; back it up, the records cannot be read without it.")
+    return key
 
-HEALTH_DATA_FILE = "health_data.json"
-# In a real environment, store this key securely and do not hard-code
-ENCRYPTION_KEY = Fernet.generate_key()
-fernet = Fernet(ENCRYPTION_KEY)
 
 class HealthConditionManager:
+    _store = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def load_data():
-        if not os.path.exists(HEALTH_DATA_FILE):
-            return {}
-        with open(HEALTH_DATA_FILE, "rb") as f:
-            encrypted_data = f.read()
-            if not encrypted_data:
-                return {}
-        try:
-            decrypted_data = fernet.decrypt(encrypted_data)
-            return json.loads(decrypted_data.decode())
-        except Exception:
-            # If decryption fails or file is empty
-            return {}
+    def store():
+        """Return the health store, opening it (and importing the former blob file) on first use."""
+        with HealthConditionManager._lock:
+            if HealthConditionManager._store is None:
+                key = load_key()
+                index_key = hashlib.blake2b(key, digest_size=32, person=b"health-index").digest()
+                store = HealthStore(HEALTH_STORE_FILE, Fernet(key), index_key)
+                HealthConditionManager.import_legacy(store, Fernet(key))
+                HealthConditionManager._store = store
+            return HealthConditionManager._store
 
     @staticmethod
-    def save_data(data):
-        encoded = json.dumps(data).encode()
-        encrypted_data = fernet.encrypt(encoded)
-        with open(HEALTH_DATA_FILE, "wb") as f:
-            f.write(encrypted_data)
+    def import_legacy(store, fernet, legacy_file=HEALTH_DATA_FILE):
+        """
+        Move the profiles of the former single-blob file into the store.
+
+        That file was encrypted with a key generated at every start and never
+        saved, so it can only be imported if it was written with the current
+        key; otherwise it is left in place and reported.
+        """
+        if not os.path.exists(legacy_file) or len(store):
+            return
+        with open(legacy_file, "rb") as f:
+            encrypted_data = f.read()
+        if not encrypted_data:
+            return
+        try:
+            data = json.loads(fernet.decrypt(encrypted_data).decode())
+        except (InvalidToken, ValueError):
+            logger.warning(f"{legacy_file} was encrypted with a key that was not kept; its profiles cannot be imported.")
+            return
+        store.put_many(data)
+        os.replace(legacy_file, legacy_file + ".imported")
+        logger.info(f"Imported {len(data)} health profiles from {legacy_file}.")
 
     @staticmethod
     def get_member_health(member_id):
-        data = HealthConditionManager.load_data()
-        return data.get(member_id, {})
+        """
+        Return a member's health profile, or {} if none was saved.
+
+        :param member_id: ID of the member.
+        """
+        return HealthConditionManager.store().get(member_id, {})
 
     @staticmethod
     def update_member_health(member_id, health_info):
-        data = HealthConditionManager.load_data()
-        data[member_id] = health_info
-        HealthConditionManager.save_data(data)
+        """
+        Save a member's health profile, replacing the previous one.
+
+        :param member_id: ID of the member.
+        :param health_info: Dictionary of health details.
+        """
+        HealthConditionManager.store().put(member_id, health_info)
+        logger.info(f"Saved health profile of member {member_id}.")
+
+    @staticmethod
+    def delete_member_health(member_id):
+        """Remove a member's health profile; returns False if there was none."""
+        return HealthConditionManager.store().delete(member_id)
+
+    @staticmethod
+    def load_data():
+        """Return every saved profile as {member_id: profile} (decrypts all of them)."""
+        return dict(HealthConditionManager.store().profiles())
+
+    @staticmethod
+    def save_data(data):
+        """Save several profiles ({member_id: profile}) at once."""
+        HealthConditionManager.store().put_many(data)
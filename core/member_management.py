@@ -64,25 +64,40 @@ class MemberManagement:
         validate_payment_type(payment_type)
 
         members = DataLoader.get_data("members")
-        gyms = DataLoader.get_data("gyms")
 
         # Verify gym_id exists
-        gym = next((g for g in gyms if g["gym_id"] == gym_id), None)
+        gym = DataLoader.get_collection("gyms").get(gym_id)
         if not gym:
             raise ValueError("Invalid gym ID provided.")
 
-        # Determine final payment type using the helper
-        final_payment_type = determine_payment_type(user_type, payment_type)
-
         # Generate a unique member ID
         new_member_id = generate_unique_id(members, key="member_id")
 
+        new_member = MemberManagement.build_member(new_member_id, name, user_type, gym, payment_type, **kwargs)
+
+        members.append(new_member)
+        DataLoader.save_data("members", members)
+        print(f"Member added successfully with ID: {new_member_id}.")
+        logger.info(f"Added new member: {new_member}")
+
+    @staticmethod
+    def build_member(member_id, name, user_type, gym, payment_type="Monthly", **kwargs):
+        """
+        Build a new member record (shared by add_member and bulk imports).
+        :param member_id: ID allocated for the member.
+        :param gym: The gym record the member joins.
+        :param kwargs: Additional fields as for add_member.
+        :return: The member dictionary; raises ValueError if a field is invalid.
+        """
+        # Determine final payment type using the helper
+        final_payment_type = determine_payment_type(user_type, payment_type)
+
         # Base structure for a new member
         new_member = {
-            "member_id": str(new_member_id),
+            "member_id": str(member_id),
             "name": name,
             "user_type": user_type,
-            "gym_id": gym_id,
+            "gym_id": gym["gym_id"],
             "gym_name": gym["gym_name"],
             "city": gym["city"],
             "membership_type": kwargs.get("membership_type", "N/A"),
@@ -100,11 +115,7 @@ class MemberManagement:
         handler = USER_TYPE_HANDLERS.get(user_type)
         if handler:
             handler.configure_member(new_member, kwargs)
-
-        members.append(new_member)
-        DataLoader.save_data("members", members)
-        print(f"Member added successfully with ID: {new_member_id}.")
-        logger.info(f"Added new member: {new_member}")
+        return new_member
 
     @staticmethod
     def validate_schedule(schedule):
@@ -194,9 +205,8 @@ class MemberManagement:
         Retrieve all members from the database.
         """
         members = DataLoader.get_data("members")
-        # Enrich members with gym_name based on gym_id
-        gyms = GymManager.view_all_gyms()
-        gym_dict = {gym["gym_id"]: gym["gym_name"] for gym in gyms}
+        # Enrich members with gym_name based on gym_id (raw gyms; no revenue figures needed)
+        gym_dict = {gym["gym_id"]: gym["gym_name"] for gym in DataLoader.get_data("gyms")}
         for member in members:
             member["gym_name"] = gym_dict.get(member.get("gym_id"), "Unknown")
             # Ensure loyalty_points exist
@@ -230,8 +240,7 @@ class MemberManagement:
         :return: Member dictionary or None.
         """
         try:
-            members = DataLoader.get_data("members")
-            member = next((m for m in members if m["member_id"] == member_id), None)
+            member = DataLoader.get_collection("members").get(member_id)
             if member:
                 logger.debug(f"Member found: {member}")
             else:
@@ -279,16 +288,15 @@ class MemberManagement:
         :param name: The name of the member to search for.
         :return: The member's details if found, otherwise None.
         """
-        members = DataLoader.get_data("members")
         if member_id:
-            member = next((m for m in members if m["member_id"] == member_id), None)
+            member = next(iter(DataLoader.query("members", {"member_id": member_id}, limit=1)), None)
             if member:
                 logger.info(f"Found member by ID: {member_id}")
             else:
                 logger.warning(f"No member found with ID: {member_id}")
             return member
         elif name:
-            member = next((m for m in members if m["name"].lower() == name.lower()), None)
+            member = next(iter(DataLoader.query("members", {"name": ("iequals", name)}, limit=1)), None)
             if member:
                 logger.info(f"Found member by name: {name}")
             else:
@@ -350,8 +358,7 @@ class MemberManagement:
         :param gym_id: The ID of the gym.
         :return: Total number of gym users for the gym.
         """
-        members = DataLoader.get_data("members")
-        count = sum(1 for member in members if member["gym_id"] == gym_id and member["user_type"] == "Gym User")
+        count = DataLoader.get_collection("members").count(gym_id=gym_id, user_type="Gym User")
         logger.info(f"Counted {count} gym users for gym ID {gym_id}.")
         return count
 
@@ -363,18 +370,14 @@ class MemberManagement:
         :param staff_type: The type of staff ("Wellbeing", "Training", or "Management").
         :return: A dictionary with 'count' and 'cost'.
         """
-        members = DataLoader.get_data("members")
-        staff = [
-            m for m in members
-            if m["gym_id"] == gym_id and m["user_type"] == f"{staff_type} Staff"
-        ]
+        staff = DataLoader.get_collection("members").find(gym_id=gym_id, user_type=f"{staff_type} Staff")
         total_cost = sum(m.get("cost", 0) for m in staff)
         logger.info(f"Counted {len(staff)} {staff_type} Staff for gym ID {gym_id} with total cost {total_cost}.")
         return {"count": len(staff), "cost": total_cost}
 
     @staticmethod
     def calculate_staff_totals_by_gym(gym_id):
-        members = DataLoader.get_data("members")
+        members = DataLoader.get_collection("members").find(gym_id=gym_id)
         staff_totals = {
             "Wellbeing Staff": {"count": 0, "cost": 0.0},
             "Training Staff": {"count": 0, "cost": 0.0},
@@ -382,7 +385,7 @@ class MemberManagement:
         }
 
         for member in members:
-            if member["gym_id"] == gym_id and member["user_type"] in staff_totals:
+            if member["user_type"] in staff_totals:
                 user_type = member["user_type"]
                 staff_totals[user_type]["count"] += 1
                 staff_totals[user_type]["cost"] += float(member.get("cost", 0))
@@ -6,13 +6,14 @@ from core.member_management import MemberManagement  # Importing MemberManagemen
 
 class PaymentManager:
     @staticmethod
+    @DataLoader.retry_on_conflict()
+    @DataLoader.transaction()  # loyalty points and the payment are committed together
     def add_payment(member_id, amount, date, status, payment_type=None, payment_method=None, discount_applied="No"):
         """Add a new payment record to the database."""
-        members = DataLoader.get_data("members")
         payments = DataLoader.get_data("payments")  # Load payments data
         from core.member_management import MemberManagement
         # Validate member existence
-        member = next((m for m in members if m["member_id"] == member_id), None)
+        member = DataLoader.get_collection("members").get(member_id)
         if not member:
             raise ValueError(f"Member ID {member_id} does not exist.")
 
@@ -36,9 +37,31 @@ class PaymentManager:
         # Retrieve gym details from the member's information
         gym_name = member.get("gym_name", "Unknown")
 
+        # Create a unique payment ID
+        new_payment_id = generate_payment_id(payments, prefix="P")
+
+        new_payment, loyalty_points = PaymentManager.build_payment(
+            new_payment_id, member, amount, date, status, payment_type, payment_method, discount_applied
+        )
+        if loyalty_points:
+            MemberManagement.update_loyalty_points(member_id, loyalty_points)
+        payments.append(new_payment)
+
+        # Save the updated payments data
+        DataLoader.save_data("payments", payments)
+        print(f"Payment added successfully for Member ID: {member_id} at Gym: {gym_name} with Payment Type: {payment_type}.")
+
+    @staticmethod
+    def build_payment(payment_id, member, amount, date, status, payment_type, payment_method, discount_applied="No"):
+        """
+        Build a payment record with its discount applied (shared by add_payment and bulk imports).
+        :param amount: The validated amount before discount, as a float.
+        :return: (payment dictionary, loyalty points the member earns with it).
+        """
         # Initialize discount variables
         discount_note = ""
         final_amount = amount
+        loyalty_points = 0
 
         # Apply discount if selected
         if discount_applied == "Yes":
@@ -47,7 +70,7 @@ class PaymentManager:
                 final_amount *= 0.90  # Apply additional 10% discount
                 discount_note = "10% discount applied for annual payment."
                 # Earn 10 loyalty points
-                MemberManagement.update_loyalty_points(member_id, 10)
+                loyalty_points = 10
             else:
                 # Apply standard 10% discount
                 final_amount *= 0.90
@@ -56,17 +79,14 @@ class PaymentManager:
             # If no discount applied, check if payment type is annual for loyalty points
             if payment_type == "Annual":
                 # Earn 10 loyalty points even without applying discount
-                MemberManagement.update_loyalty_points(member_id, 10)
-
-        # Create a unique payment ID
-        new_payment_id = generate_payment_id(payments, prefix="P")
+                loyalty_points = 10
 
         # Create a new payment record
         new_payment = {
-            "payment_id": new_payment_id,
-            "member_id": member_id,
+            "payment_id": payment_id,
+            "member_id": member["member_id"],
             "member_name": member["name"],  # Add member's name for reference
-            "gym_name": gym_name,
+            "gym_name": member.get("gym_name", "Unknown"),
             "amount": f"{final_amount:.2f}",  # Store amount as a formatted string
             "date": date,
             "status": status,
@@ -75,11 +95,7 @@ class PaymentManager:
             "discount_applied": discount_applied,
             "note": discount_note
         }
-        payments.append(new_payment)
-
-        # Save the updated payments data
-        DataLoader.save_data("payments", payments)
-        print(f"Payment added successfully for Member ID: {member_id} at Gym: {gym_name} with Payment Type: {payment_type}.")
+        return new_payment, loyalty_points
 
     @staticmethod
     def view_all_payments(payment_type=None):
@@ -88,13 +104,14 @@ class PaymentManager:
         :param payment_type: (Optional) Filter payments by this type.
         :return: List of payment records.
         """
-        payments = DataLoader.get_data("payments")
         if payment_type:
             validate_payment_type(payment_type)
-            payments = [p for p in payments if p.get("payment_type") == payment_type]
-        return payments
+            return DataLoader.query("payments", {"payment_type": payment_type})
+        return DataLoader.get_data("payments")
 
     @staticmethod
+    @DataLoader.retry_on_conflict()
+    @DataLoader.transaction()
     def update_payment(payment_id, amount=None, date=None, status=None, payment_type=None, payment_method=None,
                        discount_applied=None):
         """
@@ -205,13 +222,23 @@ class PaymentManager:
         :return: A list of payment records for the given Member ID.
         """
         try:
-            payments = DataLoader.get_data("payments")  # Assuming payments are stored in a JSON file or database
-            # Filter payments by Member ID
-            return [payment for payment in payments if payment["member_id"] == member_id]
+            # Served from the member_id index rather than a scan of all payments
+            return DataLoader.find("payments", member_id=member_id)
         except Exception as e:
             print(f"Error fetching payments for Member ID {member_id}: {e}")
             return []
 
+    @staticmethod
+    def get_payments_by_period(start_date, end_date=None):
+        """
+        Retrieve payment records dated between two dates (e.g. today's payments).
+        Only the monthly partitions covering the range are read.
+        :param start_date: First date in 'YYYY-MM-DD' format.
+        :param end_date: (Optional) Last date in 'YYYY-MM-DD' format; defaults to start_date.
+        :return: A list of payment records.
+        """
+        return DataLoader.get_period("payments", start_date, end_date)
+
     @staticmethod
     def calculate_total_membership_value(gym_id, status):
         """
@@ -220,21 +247,17 @@ class PaymentManager:
         :param status: The payment status to filter by (e.g., "Paid", "Pending").
         :return: Total membership value as a float.
         """
-        members = DataLoader.get_data("members")
-        payments = DataLoader.get_data("payments")
+        members = DataLoader.get_collection("members")
 
         # Filter gym users belonging to the gym
-        gym_user_ids = {
+        gym_user_ids = [
             member["member_id"]
-            for member in members
-            if member["gym_id"] == gym_id and member["user_type"] == "Gym User"
-        }
+            for member in members.find(gym_id=gym_id, user_type="Gym User")
+        ]
 
-        # Calculate the total for payments with the given status
-        total = sum(
-            float(payment["amount"])
-            for payment in payments
-            if payment["status"] == status and payment["member_id"] in gym_user_ids
+        # Total the payments with the given status from the columnar snapshot
+        total = DataLoader.get_snapshot("payments").sum(
+            "amount", where={"member_id": gym_user_ids, "status": status}
         )
 
         return total
@@ -4,6 +4,8 @@ from tkcalendar import Calendar
 from core.appointments import AppointmentManager
 from core.member_management import MemberManagement
 from core.gym_management import GymManager
+from core.enrichment import EnrichmentContext
+from core.tree_sync import TreeviewSync
 import logging
 
 
@@ -177,23 +179,27 @@ class AppointmentManagerFrame(ttk.Frame):
         for col in columns:
             self.view_tree.heading(col, text=col)
         self.view_tree.pack(expand=True, fill="both")
+        # Appointment changes are patched into the three tables as they are saved
+        self.view_sync = TreeviewSync(
+            self.view_tree, "appointments", self.appointment_row, on_reload=self.view_all_appointments
+        )
 
     def view_all_appointments(self):
-        for row in self.view_tree.get_children():
-            self.view_tree.delete(row)
-        appointments = AppointmentManager.view_all_appointments_enriched()
-        for appt in appointments:
-            self.view_tree.insert("", "end", values=(
-                appt["appointment_id"],
-                appt["wellbeing_staff_name"],
-                appt["specialty"],
-                appt["gym_user_name"],
-                appt["gym_name"],
-                appt["date"],
-                appt["time"],
-                appt["cost"],
-                appt["status"]
-            ))
+        self.view_sync.load(AppointmentManager.view_all_appointments())
+
+    def appointment_row(self, appt):
+        appt = AppointmentManager.enrich_appointment(appt, EnrichmentContext.from_collections())
+        return (
+            appt["appointment_id"],
+            appt["wellbeing_staff_name"],
+            appt["specialty"],
+            appt["gym_user_name"],
+            appt["gym_name"],
+            appt["date"],
+            appt["time"],
+            appt["cost"],
+            appt["status"]
+        )
 
     # Update Appointment Tab
     def create_update_tab(self):
@@ -206,6 +212,9 @@ class AppointmentManagerFrame(ttk.Frame):
             self.update_tree.heading(col, text=col)
         self.update_tree.bind("<<TreeviewSelect>>", self.on_update_select)
         self.update_tree.pack(expand=True, fill="both")
+        self.update_sync = TreeviewSync(
+            self.update_tree, "appointments", self.appointment_row, on_reload=self.load_update_appointments
+        )
 
         frame = ttk.Frame(self.update_tab)
         frame.pack(pady=5)
@@ -224,21 +233,7 @@ class AppointmentManagerFrame(ttk.Frame):
         self.load_update_appointments()
 
     def load_update_appointments(self):
-        for row in self.update_tree.get_children():
-            self.update_tree.delete(row)
-        appointments = AppointmentManager.view_all_appointments_enriched()
-        for appt in appointments:
-            self.update_tree.insert("", "end", values=(
-                appt["appointment_id"],
-                appt["wellbeing_staff_name"],
-                appt["specialty"],
-                appt["gym_user_name"],
-                appt["gym_name"],
-                appt["date"],
-                appt["time"],
-                appt["cost"],
-                appt["status"]
-            ))
+        self.update_sync.load(AppointmentManager.view_all_appointments())
 
     def on_update_select(self, event):
         selection = self.update_tree.selection()
@@ -268,7 +263,6 @@ class AppointmentManagerFrame(ttk.Frame):
 
         if AppointmentManager.update_appointment(self.selected_update_appt_id, new_date, new_time):
             messagebox.showinfo("Success", "Appointment updated successfully.")
-            self.load_update_appointments()
         else:
             messagebox.showerror("Error", "Failed to update appointment.")
 
@@ -283,6 +277,9 @@ class AppointmentManagerFrame(ttk.Frame):
             self.delete_tree.heading(col, text=col)
         self.delete_tree.bind("<<TreeviewSelect>>", self.on_delete_select)
         self.delete_tree.pack(expand=True, fill="both")
+        self.delete_sync = TreeviewSync(
+            self.delete_tree, "appointments", self.appointment_row, on_reload=self.load_delete_appointments
+        )
 
         delete_button = ttk.Button(self.delete_tab, text="Delete Appointment", command=self.delete_appointment)
         delete_button.pack(pady=10)
@@ -290,21 +287,7 @@ class AppointmentManagerFrame(ttk.Frame):
         self.load_delete_appointments()
 
     def load_delete_appointments(self):
-        for row in self.delete_tree.get_children():
-            self.delete_tree.delete(row)
-        appointments = AppointmentManager.view_all_appointments_enriched()
-        for appt in appointments:
-            self.delete_tree.insert("", "end", values=(
-                appt["appointment_id"],
-                appt["wellbeing_staff_name"],
-                appt["specialty"],
-                appt["gym_user_name"],
-                appt["gym_name"],
-                appt["date"],
-                appt["time"],
-                appt["cost"],
-                appt["status"]
-            ))
+        self.delete_sync.load(AppointmentManager.view_all_appointments())
 
     def on_delete_select(self, event):
         selection = self.delete_tree.selection()
@@ -319,7 +302,6 @@ class AppointmentManagerFrame(ttk.Frame):
 
         if AppointmentManager.delete_appointment(self.selected_delete_appt_id):
             messagebox.showinfo("Success", "Appointment deleted successfully.")
-            self.load_delete_appointments()
         else:
             messagebox.showerror("Error", "Appointment not found or could not be deleted.")
 
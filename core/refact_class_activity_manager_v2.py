@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from core.class_activity_manager import ClassActivityManager
+from core.class_registrations import ClassRegistrations
+from core.tree_sync import TreeviewSync
+from database.data_loader import DataLoader
 from core.gym_management import GymManager
 from core.member_management import MemberManagement
 import logging
@@ -49,6 +52,10 @@ class ClassManagementApp(ttk.Frame):
         self.create_view_tab()
         self.create_search_tab()
 
+        # Registration counts are shown per class, so registration changes re-render the class rows.
+        unsubscribe = DataLoader.subscribe("registrations", self.on_registrations_changed)
+        self.bind("<Destroy>", lambda event: unsubscribe() if event.widget is self else None, add="+")
+
     def create_search_tab(self):
         """
         Create the Search Activity tab with functionality to search by gym name or training staff.
@@ -86,6 +93,8 @@ class ClassManagementApp(ttk.Frame):
             self.search_tree.heading(col, text=col)
             self.search_tree.column(col, width=150, anchor="center")
         self.search_tree.grid(row=5, column=0, columnspan=4, padx=10, pady=10, sticky="nsew")
+        self.search_criteria = None
+        self.search_sync = TreeviewSync(self.search_tree, "classes", self.search_row)
 
         # Configure row and column weights
         self.search_tab.grid_columnconfigure(0, weight=1)
@@ -125,25 +134,8 @@ class ClassManagementApp(ttk.Frame):
         # Search activities
         try:
             activities = ClassActivityManager.search_activities(gym_id=gym_id, trainer_id=trainer_id)
-            for row in self.search_tree.get_children():
-                self.search_tree.delete(row)
-
-            for activity in activities:
-                registered_count = len(activity.get("registered_users", []))
-                schedule_formatted = self.format_schedule(activity["schedule"])
-                self.search_tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        activity["class_id"],
-                        activity["class_name"],
-                        activity["trainer_name"],
-                        activity["gym_name"],
-                        schedule_formatted,
-                        activity["capacity"],
-                        registered_count
-                    ),
-                )
+            self.search_criteria = (gym_id, trainer_id)
+            self.search_sync.load(activities)
             if not activities:
                 messagebox.showinfo("No Results", "No activities found for the selected criteria.")
         except Exception as e:
@@ -158,11 +150,32 @@ class ClassManagementApp(ttk.Frame):
         self.search_trainer_dropdown['values'] = self.get_training_staff_names()
         self.search_trainer_dropdown.set("Select Trainer")
 
-        for row in self.search_tree.get_children():
-            self.search_tree.delete(row)
+        self.search_criteria = None
+        self.search_sync.load([])
 
         messagebox.showinfo("Refreshed", "Search tab refreshed.")
 
+    def search_row(self, cls):
+        """Row values for a class in the search results, or None if it does not match the current search."""
+        if self.search_criteria is None:
+            return None
+        gym_id, trainer_id = self.search_criteria
+        if gym_id is not None and str(cls.get("gym_id")) != str(gym_id):
+            return None
+        if trainer_id is not None and str(cls.get("trainer_id")) != str(trainer_id):
+            return None
+        return self.class_row(cls)
+
+    def on_registrations_changed(self, changes):
+        """Re-render the rows of the classes whose registrations changed."""
+        if any(change.action == "reload" for change in changes):
+            self.classes_sync.on_reload()
+            self.search_sync.on_reload()
+            return
+        class_ids = {(change.record or change.previous).get("class_id") for change in changes}
+        self.classes_sync.refresh_rows(class_ids)
+        self.search_sync.refresh_rows(class_ids)
+
     def create_add_tab(self):
         """
         Create the Add Class tab with all required fields.
@@ -250,6 +263,7 @@ class ClassManagementApp(ttk.Frame):
         self.classes_tree.heading("Capacity", text="Capacity")
         self.classes_tree.heading("Registered Users", text="Registered Users")
         self.classes_tree.pack(expand=True, fill="both", padx=10, pady=10)
+        self.classes_sync = TreeviewSync(self.classes_tree, "classes", self.class_row)
 
         # 2.2 Refresh Button to Load Classes
         refresh_button = ttk.Button(self.view_tab, text="Refresh", command=self.view_all_classes)
@@ -537,7 +551,7 @@ class ClassManagementApp(ttk.Frame):
             messagebox.showinfo("Success", f"Class '{class_name}' added successfully with ID: {class_id}.")
             logger.info(f"Class '{class_name}' added successfully with ID: {class_id}.")
             self.clear_add_class_form()
-            self.view_all_classes()
+            self.manage_class_dropdown.set("Select Class")
             self.refresh_manage_class_dropdown()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add class: {e}")
@@ -564,25 +578,7 @@ class ClassManagementApp(ttk.Frame):
         Populate the classes_tree with all classes from the database.
         """
         try:
-            classes = ClassActivityManager.view_all_classes()
-            for row in self.classes_tree.get_children():
-                self.classes_tree.delete(row)
-            for cls in classes:
-                registered_count = len(cls.get("registered_users", []))
-                schedule_formatted = self.format_schedule(cls["schedule"])
-                self.classes_tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        cls["class_id"],
-                        cls["class_name"],
-                        cls["trainer_name"],
-                        cls["gym_name"],
-                        schedule_formatted,
-                        cls["capacity"],
-                        registered_count
-                    ),
-                )
+            self.classes_sync.load(ClassActivityManager.view_all_classes())
             logger.info("Classes loaded into the view successfully.")
             self.manage_class_dropdown['values'] = self.get_class_display_names()
             self.manage_class_dropdown.set("Select Class")
@@ -590,6 +586,17 @@ class ClassManagementApp(ttk.Frame):
             messagebox.showerror("Error", f"Failed to load classes: {e}")
             logger.error(f"Failed to load classes: {e}")
 
+    def class_row(self, cls):
+        return (
+            cls["class_id"],
+            cls["class_name"],
+            cls["trainer_name"],
+            cls["gym_name"],
+            self.format_schedule(cls["schedule"]),
+            cls["capacity"],
+            ClassRegistrations.class_count(cls["class_id"])
+        )
+
     def format_schedule(self, schedule_dict):
         """
         Format the schedule dictionary into a readable string.
@@ -720,7 +727,7 @@ class ClassManagementApp(ttk.Frame):
             ClassActivityManager.update_class(class_id, updates)
             messagebox.showinfo("Success", "Class updated successfully.")
             logger.info(f"Class '{class_id}' updated successfully with changes: {updates}")
-            self.view_all_classes()
+            self.manage_class_dropdown.set("Select Class")
             self.refresh_manage_class_dropdown()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update class: {e}")
@@ -752,7 +759,6 @@ class ClassManagementApp(ttk.Frame):
             ClassActivityManager.delete_class(class_id)
             messagebox.showinfo("Success", "Class deleted successfully.")
             logger.info(f"Class '{class_id}' deleted successfully.")
-            self.view_all_classes()
             self.refresh_manage_class_dropdown()
             self.manage_class_dropdown.set("Select Class")
             self.update_field_dropdown.set("Select Field")
@@ -51,7 +51,12 @@ class HealthConditionFrame(ttk.Frame):
         # Select gym member
         ttk.Label(frame, text="Select Gym Member:", font=("Helvetica", 12)).grid(row=0, column=0, sticky="e", padx=5,
                                                                                  pady=5)
-        member_names = MemberManagement.get_all_member_names()
+        # Members by name, so selecting one is a dictionary lookup rather than a search
+        self.members_by_name = {}
+        for member in MemberManagement.view_all_members():
+            if member.get("name"):
+                self.members_by_name.setdefault(member["name"], member)
+        member_names = list(self.members_by_name)
         self.member_name_var = tk.StringVar(value="Select Member")
         self.member_dropdown = ttk.Combobox(frame, textvariable=self.member_name_var, values=member_names,
                                             state="readonly")
@@ -132,11 +137,14 @@ class HealthConditionFrame(ttk.Frame):
         for widget in self.winfo_children():
             widget.destroy()
 
+    def find_member(self, name):
+        return self.members_by_name.get(name) or MemberManagement.search_member(name=name)
+
     def load_member_info(self, event):
         name = self.member_name_var.get()
         if not name or name == "Select Member":
             return
-        member = MemberManagement.search_member(name=name)
+        member = self.find_member(name)
         if not member:
             return
         # Display member info
@@ -229,7 +237,7 @@ class HealthConditionFrame(ttk.Frame):
         if not name or name == "Select Member":
             messagebox.showerror("Error", "Please select a member.")
             return
-        member = MemberManagement.search_member(name=name)
+        member = self.find_member(name)
         if not member:
             messagebox.showerror("Error", "Member not found.")
             return
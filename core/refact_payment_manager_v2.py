@@ -4,6 +4,7 @@ from tkinter import ttk, messagebox
 from tkcalendar import Calendar
 from core.payments import PaymentManager
 from core.member_management import MemberManagement
+from core.tree_sync import TreeviewSync
 
 
 class PaymentManagementFrame(ttk.Frame):
@@ -208,7 +209,6 @@ class PaymentManagementFrame(ttk.Frame):
                 discount_applied=discount_applied
             )
             messagebox.showinfo("Success", "Payment added successfully.")
-            self.view_all_payments()  # Refresh payments view
             self.user_dropdown.set("")  # Reset user selection
             self.amount_entry.delete(0, tk.END)
             self.payment_type_dropdown.set("Select Payment Type")
@@ -259,6 +259,10 @@ class PaymentManagementFrame(ttk.Frame):
         self.payments_tree.column("Payment Type", width=100, anchor="center")
 
         self.payments_tree.grid(row=0, column=0, sticky="nsew")
+        # Added, updated and deleted payments are patched in as they are saved
+        self.payments_sync = TreeviewSync(
+            self.payments_tree, "payments", self.payment_row, on_reload=self.view_all_payments
+        )
 
         # Scrollbars for Treeview
         scrollbar_vertical = ttk.Scrollbar(self.view_tab, orient=tk.VERTICAL, command=self.payments_tree.yview)
@@ -278,29 +282,23 @@ class PaymentManagementFrame(ttk.Frame):
     def view_all_payments(self):
         """Displays all payments in the Treeview."""
         try:
-            payments = PaymentManager.view_all_payments()
-            # Clear existing entries
-            for row in self.payments_tree.get_children():
-                self.payments_tree.delete(row)
-            # Insert new entries
-            for payment in payments:
-                self.payments_tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        payment.get("payment_id", "N/A"),
-                        payment.get("member_id", "N/A"),
-                        payment.get("member_name", "N/A"),
-                        payment.get("gym_name", "N/A"),
-                        f"${float(payment.get('amount', 0)):.2f}",
-                        payment.get("date", "N/A"),
-                        payment.get("status", "N/A"),
-                        payment.get("payment_type", "N/A"),
-                    ),
-                )
+            self.payments_sync.load(PaymentManager.view_all_payments())
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load payments: {e}")
 
+    def payment_row(self, payment):
+        """Values of a payment's row in the View Payments Treeview."""
+        return (
+            payment.get("payment_id", "N/A"),
+            payment.get("member_id", "N/A"),
+            payment.get("member_name", "N/A"),
+            payment.get("gym_name", "N/A"),
+            f"${float(payment.get('amount', 0)):.2f}",
+            payment.get("date", "N/A"),
+            payment.get("status", "N/A"),
+            payment.get("payment_type", "N/A"),
+        )
+
     def create_update_tab(self):
         """Creates the Update/Delete Payment interface."""
         # Configure grid layout
@@ -448,7 +446,10 @@ class PaymentManagementFrame(ttk.Frame):
         delete_button = ttk.Button(buttons_frame, text="Delete Payment", command=self.delete_payment)
         delete_button.grid(row=0, column=1, padx=5)
 
-        # Populate the Update/Delete Treeview
+        # Populate the Update/Delete Treeview and keep it in step with saves
+        self.update_payments_sync = TreeviewSync(
+            self.update_payments_tree, "payments", self.update_payment_row, on_reload=self.refresh_update_payments
+        )
         self.refresh_update_payments()
 
     def on_payment_select(self, event):
@@ -491,32 +492,26 @@ class PaymentManagementFrame(ttk.Frame):
         from core.member_management import MemberManagement
         """Refreshes the payments displayed in the Update/Delete Treeview."""
         try:
-            payments = PaymentManager.view_all_payments()
-            # Clear existing entries
-            for row in self.update_payments_tree.get_children():
-                self.update_payments_tree.delete(row)
-            # Insert new entries
-            for payment in payments:
-                self.update_payments_tree.insert(
-                    "",
-                    "end",
-                    values=(
-                        payment.get("payment_id", "N/A"),
-                        payment.get("member_id", "N/A"),
-                        payment.get("member_name", "N/A"),
-                        payment.get("gym_name", "N/A"),
-                        f"${float(payment.get('amount', 0)):.2f}",
-                        payment.get("date", "N/A"),
-                        payment.get("status", "N/A"),
-                        payment.get("payment_type", "N/A"),
-                        payment.get("payment_method", "N/A"),
-                        payment.get("discount_applied", "No"),
-                        payment.get("note", ""),
-                    ),
-                )
+            self.update_payments_sync.load(PaymentManager.view_all_payments())
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load payments: {e}")
 
+    def update_payment_row(self, payment):
+        """Values of a payment's row in the Update/Delete Treeview."""
+        return (
+            payment.get("payment_id", "N/A"),
+            payment.get("member_id", "N/A"),
+            payment.get("member_name", "N/A"),
+            payment.get("gym_name", "N/A"),
+            f"${float(payment.get('amount', 0)):.2f}",
+            payment.get("date", "N/A"),
+            payment.get("status", "N/A"),
+            payment.get("payment_type", "N/A"),
+            payment.get("payment_method", "N/A"),
+            payment.get("discount_applied", "No"),
+            payment.get("note", ""),
+        )
+
     def update_payment(self):
         from core.member_management import MemberManagement
         """Updates a payment's details."""
@@ -553,8 +548,6 @@ class PaymentManagementFrame(ttk.Frame):
                 discount_applied=new_discount_applied if new_discount_applied else None
             )
             messagebox.showinfo("Success", "Payment updated successfully.")
-            self.refresh_update_payments()
-            self.view_all_payments()  # Refresh view
 
         except ValueError as ve:
             messagebox.showwarning("Validation Error", str(ve))
@@ -579,8 +572,6 @@ class PaymentManagementFrame(ttk.Frame):
             # Delete payment
             PaymentManager.delete_payment(payment_id=payment_id)
             messagebox.showinfo("Success", "Payment deleted successfully.")
-            self.refresh_update_payments()
-            self.view_all_payments()  # Refresh view
 
             # Clear update fields
             self.update_payment_id_entry.config(state='normal')
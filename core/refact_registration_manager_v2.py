@@ -4,6 +4,10 @@ from core.registration_manager import RegistrationManager
 from core.class_activity_manager import ClassActivityManager
 from core.member_management import MemberManagement
 from core.gym_management import GymManager
+from core.class_registrations import ClassRegistrations
+from core.enrichment import EnrichmentContext
+from database.data_loader import DataLoader
+from core.tree_sync import TreeviewSync
 import logging
 import re
 
@@ -165,6 +169,10 @@ class RegistrationFrame(ttk.Frame):
         self.all_regs_tree.column("training_staff", width=120)
 
         self.all_regs_tree.pack(fill="both", expand=True)
+        # Registrations made or cancelled anywhere are patched in as they are saved
+        self.all_regs_sync = TreeviewSync(
+            self.all_regs_tree, "registrations", self.registration_row, on_reload=self.refresh_all_registrations
+        )
 
         # Refresh button for All Registrations tab
         refresh_all_button = ttk.Button(all_reg_frame, text="Refresh", command=self.refresh_all_registrations)
@@ -174,26 +182,33 @@ class RegistrationFrame(ttk.Frame):
         self.refresh_all_registrations()
 
     def refresh_all_registrations(self):
-        # Clear the tree first
-        for row in self.all_regs_tree.get_children():
-            self.all_regs_tree.delete(row)
-
-        # Get all registrations from RegistrationManager
-        all_data = RegistrationManager.get_all_registrations()
-
-        # Insert into the Treeview
-        for entry in all_data:
-            self.all_regs_tree.insert("", tk.END, values=(
-                entry["member_name"],
-                entry["member_id"],
-                entry["class_name"],
-                entry["class_id"],
-                entry["gym_name"],
-                entry["gym_id"],
-                entry["day"],
-                entry["time"],
-                entry["training_staff"]
-            ))
+        # Reload every row from the registrations collection, with one set of lookups for all of them
+        context = EnrichmentContext()
+        classes = DataLoader.get_collection("classes")
+        self.all_regs_sync.load(
+            ClassRegistrations.get_collection(),
+            lambda registration: self.registration_row(registration, context, classes),
+        )
+
+    def registration_row(self, registration, context=None, classes=None):
+        if context is None:
+            # A single row touched by a change event
+            entry = RegistrationManager.registration_details(registration)
+        else:
+            entry = RegistrationManager.describe_registration(context, registration, classes)
+        if entry is None:
+            return None
+        return (
+            entry["member_name"],
+            entry["member_id"],
+            entry["class_name"],
+            entry["class_id"],
+            entry["gym_name"],
+            entry["gym_id"],
+            entry["day"],
+            entry["time"],
+            entry["training_staff"]
+        )
 
     def refresh_reg_manager_data(self):
         # Refresh logic for Registration Manager tab:
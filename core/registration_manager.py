@@ -4,12 +4,15 @@ from database.data_loader import DataLoader
 from core.class_activity_manager import ClassActivityManager
 from core.member_management import MemberManagement
 from core.gym_management import GymManager
+from core.enrichment import EnrichmentContext
+from core.class_registrations import ClassRegistrations
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RegistrationManager:
     @staticmethod
+    @DataLoader.retry_on_conflict()
     def register_user_to_class(class_id, member_id, day, time):
         """
         Register a gym user to a specific schedule of a class.
@@ -21,8 +24,8 @@ class RegistrationManager:
         :return: None
         """
         logger.debug(f"Attempting to register member_id {member_id} to class_id {class_id} on {day} at {time}.")
-        classes = DataLoader.get_data("classes")
-        cls = next((c for c in classes if c["class_id"] == class_id), None)
+        registrations = ClassRegistrations.get_collection()
+        cls = DataLoader.get_collection("classes").get(class_id)
         if not cls:
             logger.error(f"Class ID {class_id} does not exist.")
             raise ValueError(f"Class ID {class_id} does not exist.")
@@ -41,10 +44,7 @@ class RegistrationManager:
             raise ValueError(f"Time '{time}' is not available on '{day}' for Class ID {class_id}.")
 
         # Check capacity for the specific schedule
-        current_count = sum(
-            1 for user in cls.get("registered_users", [])
-            if user["day"] == day and user["time"] == time
-        )
+        current_count = ClassRegistrations.slot_count(class_id, day, time, registrations)
         if current_count >= cls["capacity"]:
             logger.warning(f"Class ID {class_id} on {day} at {time} has reached its capacity.")
             raise ValueError(f"Class '{cls['class_name']}' on {day} at {time} has reached its capacity.")
@@ -60,21 +60,15 @@ class RegistrationManager:
             raise ValueError(f"Member ID {member_id} does not belong to Gym ID {cls['gym_id']}.")
 
         # Check if the user is already registered for this specific schedule
-        already_registered = any(
-            user["member_id"] == member_id and user["day"] == day and user["time"] == time
-            for user in cls.get("registered_users", [])
-        )
-        if already_registered:
+        registration_id = ClassRegistrations.registration_id(class_id, day, time, member_id)
+        if registration_id in registrations:
             logger.warning(f"Member ID {member_id} is already registered for Class ID {class_id} on {day} at {time}.")
             raise ValueError(f"Member ID {member_id} is already registered for this schedule.")
 
         # Register the user
-        cls["registered_users"].append({
-            "member_id": member_id,
-            "day": day,
-            "time": time
-        })
-        DataLoader.save_data("classes", classes)
+        registrations = ClassRegistrations.for_update()
+        registrations.insert(ClassRegistrations.new_registration(class_id, member_id, day, time))
+        DataLoader.save_collection(registrations)
         logger.info(f"Member ID {member_id} successfully registered to Class ID {class_id} on {day} at {time}.")
 
     @staticmethod
@@ -89,28 +83,24 @@ class RegistrationManager:
         :return: None
         """
         logger.debug(f"Attempting to unregister member_id {member_id} from class_id {class_id} on {day} at {time}.")
-        classes = DataLoader.get_data("classes")
-        cls = next((c for c in classes if c["class_id"] == class_id), None)
-        if not cls:
+        registrations = ClassRegistrations.get_collection()
+        if class_id not in DataLoader.get_collection("classes"):
             logger.error(f"Class ID {class_id} does not exist.")
             raise ValueError(f"Class ID {class_id} does not exist.")
 
-        if "registered_users" not in cls:
+        if not ClassRegistrations.class_count(class_id, registrations):
             logger.warning(f"No users are registered for Class ID {class_id}.")
             raise ValueError(f"No users are registered for Class ID {class_id}.")
 
-        # Find the registration entry
-        registration_entry = next(
-            (user for user in cls["registered_users"] if user["member_id"] == member_id and user["day"] == day and user["time"] == time),
-            None
-        )
-        if not registration_entry:
+        registration_id = ClassRegistrations.registration_id(class_id, day, time, member_id)
+        if registration_id not in registrations:
             logger.warning(f"Member ID {member_id} is not registered for Class ID {class_id} on {day} at {time}.")
             raise ValueError(f"Member ID {member_id} is not registered for this schedule.")
 
-        # Unregister the user
-        cls["registered_users"].remove(registration_entry)
-        DataLoader.save_data("classes", classes)
+        # Remove the registration entry
+        registrations = ClassRegistrations.for_update()
+        registrations.delete(registration_id)
+        DataLoader.save_collection(registrations)
         logger.info(f"Member ID {member_id} successfully unregistered from Class ID {class_id} on {day} at {time}.")
 
     @staticmethod
@@ -122,13 +112,12 @@ class RegistrationManager:
         :return: List of user dictionaries.
         """
         logger.debug(f"Retrieving registered users for class_id {class_id}.")
-        classes = DataLoader.get_data("classes")
-        cls = next((c for c in classes if c["class_id"] == class_id), None)
+        cls = DataLoader.get_collection("classes").get(class_id)
         if not cls:
             logger.error(f"Class ID {class_id} does not exist.")
             raise ValueError(f"Class ID {class_id} does not exist.")
 
-        member_ids = [user["member_id"] for user in cls.get("registered_users", [])]
+        member_ids = {user["member_id"] for user in ClassRegistrations.registered_users(class_id)}
         members = MemberManagement.view_all_members()
         # Corrected list comprehension
         registered_users = [m for m in members if m["member_id"] in member_ids]
@@ -141,36 +130,56 @@ class RegistrationManager:
         Retrieve all registration records with details about the gym, class, schedule, and training staff.
         """
         logger.debug("Retrieving all registrations from all classes.")
-        classes = DataLoader.get_data("classes")
-        members = MemberManagement.view_all_members()
-        gyms = GymManager.view_all_gyms()
+        registrations = ClassRegistrations.get_collection()
+        classes = DataLoader.get_collection("classes")
+        context = EnrichmentContext()
 
         all_data = []
-        for c in classes:
-            gym_id = c["gym_id"]
-            gym = next((g for g in gyms if g["gym_id"] == gym_id), None)
-            training_staff = c.get("trainer_name", "N/A")
-            class_name = c["class_name"]
-            class_id = c["class_id"]
-            registered_users = c.get("registered_users", [])
-            for ru in registered_users:
-                member_id = ru["member_id"]
-                day = ru["day"]
-                time = ru["time"]
-                member = next((m for m in members if m["member_id"] == member_id), {})
-                member_name = member.get("name", "Unknown")
-                gym_name = gym.get("gym_name", "Unknown") if gym else "Unknown"
-                all_data.append({
-                    "member_id": member_id,
-                    "member_name": member_name,
-                    "class_id": class_id,
-                    "class_name": class_name,
-                    "gym_id": gym_id,
-                    "gym_name": gym_name,
-                    "day": day,
-                    "time": time,
-                    "training_staff": training_staff
-                })
+        for registration in registrations:
+            entry = RegistrationManager.describe_registration(context, registration, classes)
+            if entry is not None:
+                all_data.append(entry)
 
         logger.info(f"Retrieved {len(all_data)} total registrations across all classes.")
         return all_data
+
+    @staticmethod
+    def describe_registration(context, registration, classes=None):
+        """
+        Return one registration with its class, gym, member and trainer details.
+
+        Build the context (and fetch classes) once per listing and pass them
+        for every row.
+
+        :param context: EnrichmentContext used for member and gym names.
+        :param registration: Record from the registrations collection.
+        :param classes: Classes collection to look the class up in (defaults to the cached one).
+        :return: Dictionary of details, or None if the registration's class no longer exists.
+        """
+        if classes is None:
+            classes = DataLoader.get_collection("classes")
+        cls = classes.get(registration["class_id"])
+        if not cls:
+            return None
+        return {
+            "registration_id": registration["registration_id"],
+            "member_id": registration["member_id"],
+            "member_name": context.member_name(registration["member_id"]),
+            "class_id": cls["class_id"],
+            "class_name": cls["class_name"],
+            "gym_id": cls["gym_id"],
+            "gym_name": context.gym_name(cls["gym_id"]),
+            "day": registration["day"],
+            "time": registration["time"],
+            "training_staff": cls.get("trainer_name", "N/A")
+        }
+
+    @staticmethod
+    def registration_details(registration):
+        """
+        Describe a single registration (see describe_registration) using the cached
+        collections, e.g. for a row touched by a change event.
+
+        :return: Dictionary of details, or None if the registration's class no longer exists.
+        """
+        return RegistrationManager.describe_registration(EnrichmentContext.from_collections(), registration)
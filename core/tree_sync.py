@@ -0,0 +1,102 @@
+# core/tree_sync.py
+import logging
+from database.data_loader import DataLoader
+
+logger = logging.getLogger(__name__)
+
+
+class TreeviewSync:
+    """
+    Keeps a ttk.Treeview in step with a data source through DataLoader change events.
+
+    Rows are inserted with the record's primary key as their item id, so a
+    change to one record updates, inserts or deletes just that row and the
+    cost of a refresh no longer depends on the size of the table. ``load``
+    still fills the tree from scratch (first display, Refresh buttons).
+
+    Saves happen on the Tk thread in this application, so events are applied
+    directly. The subscription ends when the tree is destroyed.
+    """
+
+    def __init__(self, tree, source_name, row_values, on_reload=None):
+        """
+        :param tree: The Treeview to maintain.
+        :param source_name: Data source whose records are shown one per row.
+        :param row_values: Function record -> tuple of column values, or None
+                           for records the tree does not show.
+        :param on_reload: Called when a change cannot be described record by record;
+                          defaults to loading every record of the source.
+        """
+        self.tree = tree
+        self.source_name = source_name
+        self.key = DataLoader.data_sources[source_name].get("key")
+        self.row_values = row_values
+        self.on_reload = on_reload or (lambda: self.load(DataLoader.get_data(source_name)))
+        self._unsubscribe = DataLoader.subscribe(source_name, self.apply)
+        tree.bind("<Destroy>", lambda event: self.close(), add="+")
+
+    def load(self, records, row_values=None):
+        """
+        Replace every row with the given records.
+
+        :param row_values: Row function for this load only, e.g. one sharing
+                           lookups built once for all the records; defaults to
+                           the tree's own.
+        """
+        row_values = row_values or self.row_values
+        self.tree.delete(*self.tree.get_children())
+        for record in records:
+            values = row_values(record)
+            if values is not None:
+                self._insert(record.get(self.key), values)
+
+    def apply(self, changes):
+        """Patch the rows affected by a list of Change events."""
+        for change in changes:
+            if change.action == "reload":
+                self.on_reload()
+                return
+            if change.action == "delete":
+                self._remove(change.key)
+            else:
+                self.show(change.key, change.record)
+
+    def refresh_rows(self, key_values):
+        """Re-render the rows of the given records, e.g. after a change to data they display."""
+        for key_value in key_values:
+            self.show(key_value, DataLoader.get_record(self.source_name, key_value))
+
+    def show(self, key_value, record):
+        """Insert, update or remove one record's row."""
+        values = self.row_values(record) if record is not None else None
+        if values is None:
+            self._remove(key_value)
+            return
+        item = self._item_id(key_value)
+        if item is not None and self.tree.exists(item):
+            self.tree.item(item, values=values)
+        else:
+            self._insert(key_value, values)
+
+    def close(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def _insert(self, key_value, values):
+        item = self._item_id(key_value)
+        if item is None or self.tree.exists(item):
+            # No key, or a duplicate key: the row cannot be addressed by later changes.
+            self.tree.insert("", "end", values=values)
+        else:
+            self.tree.insert("", "end", iid=item, values=values)
+
+    def _remove(self, key_value):
+        item = self._item_id(key_value)
+        if item is not None and self.tree.exists(item):
+            self.tree.delete(item)
+
+    @staticmethod
+    def _item_id(key_value):
+        # "" is the id of the tree's root, so it cannot name a row either.
+        return None if key_value is None or key_value == "" else str(key_value)
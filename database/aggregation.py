@@ -0,0 +1,64 @@
+# database/aggregation.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _getter(field):
+    """Turn a field name into an accessor; callables are used as-is."""
+    if callable(field):
+        return field
+    return lambda record: record.get(field)
+
+
+def index_by(records, key):
+    """
+    Build a key -> record map in one pass (the build side of a hash join).
+
+    :param records: Iterable of record dictionaries.
+    :param key: Field name or callable giving each record's join key.
+    :return: Dictionary of join key -> first record with that key.
+    """
+    get_key = _getter(key)
+    lookup = {}
+    for record in records:
+        lookup.setdefault(get_key(record), record)
+    return lookup
+
+
+def aggregate(records, group_by, sums=(), where=None):
+    """
+    Group records and compute a count plus numeric totals in a single pass.
+
+    :param records: Iterable of record dictionaries.
+    :param group_by: Field name or callable giving each record's group; records
+                     whose group is None are skipped.
+    :param sums: Field names (or {name: callable}) to total as floats per group.
+    :param where: Optional predicate; records for which it returns False are skipped.
+    :return: Dictionary of group -> {"count": int, <sum name>: float, ...}.
+
+    Example:
+        aggregate(payments, group_by=lambda p: (gym_of[p["member_id"]], p["status"]), sums=["amount"])
+    """
+    get_group = _getter(group_by)
+    if isinstance(sums, dict):
+        totals = [(name, _getter(field)) for name, field in sums.items()]
+    else:
+        totals = [(field, _getter(field)) for field in sums]
+
+    groups = {}
+    for record in records:
+        if where is not None and not where(record):
+            continue
+        group = get_group(record)
+        if group is None:
+            continue
+        result = groups.get(group)
+        if result is None:
+            result = groups[group] = {"count": 0, **{name: 0.0 for name, _ in totals}}
+        result["count"] += 1
+        for name, get_value in totals:
+            value = get_value(record)
+            if value not in (None, ""):
+                result[name] += float(value)
+    return groups
@@ -0,0 +1,268 @@
+# database/columnar.py
+import logging
+import math
+from array import array
+from datetime import date
+
+try:
+    import numpy
+except ImportError:  # optional; the pure-Python path gives the same results
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+
+class DictionaryColumn:
+    """A column of repeated values stored as integer codes into a list of distinct values."""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = array("q")
+        self._code_of = {}
+        self.extend(values)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+    def extend(self, values):
+        code_of = self._code_of
+        distinct = self.values
+        codes = []
+        for value in values:
+            try:
+                code = code_of[value]
+            except KeyError:
+                code = code_of[value] = len(distinct)
+                distinct.append(value)
+            except TypeError:
+                # Unhashable values (lists, dicts) are encoded by their text form.
+                value = str(value)
+                code = code_of.get(value)
+                if code is None:
+                    code = code_of[value] = len(distinct)
+                    distinct.append(value)
+            codes.append(code)
+        self.codes.extend(codes)
+
+    def code(self, value):
+        """Return the code of value, or None if it never occurs."""
+        try:
+            return self._code_of.get(value)
+        except TypeError:
+            return self._code_of.get(str(value))
+
+    def codes_of(self, wanted):
+        """Return the set of codes for a value or a list/tuple/set of values."""
+        values = wanted if isinstance(wanted, (list, tuple, set, frozenset)) else (wanted,)
+        codes = {self.code(value) for value in values}
+        codes.discard(None)
+        return codes
+
+
+def _to_float(value):
+    """Parse a numeric field: missing values count as 0.0 (as in aggregate), malformed ones become NaN."""
+    if value is None or value == "":
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _numeric_column(field, records):
+    column = array("d", [_to_float(record.get(field)) for record in records])
+    malformed = sum(1 for number in column if math.isnan(number))
+    if malformed:
+        logger.warning(f"{malformed} '{field}' values are not numbers; totals that include them raise ValueError.")
+    return column, malformed
+
+
+def _to_ordinal(value):
+    try:
+        return date.fromisoformat(str(value)[:10]).toordinal()
+    except ValueError:
+        return 0
+
+
+def _ordinals(values):
+    """Day ordinals for ISO date strings, parsing each distinct date once."""
+    seen = {}
+    result = array("q")
+    for value in values:
+        try:
+            ordinal = seen[value]
+        except KeyError:
+            ordinal = seen[value] = _to_ordinal(value)
+        except TypeError:
+            ordinal = _to_ordinal(value)
+        result.append(ordinal)
+    return result
+
+
+class ColumnarSnapshot:
+    """
+    Read-only column-oriented copy of a collection for analytics.
+
+    Numeric fields are parsed once into array("d") columns, categorical fields
+    (ids, statuses, types) are dictionary-encoded into integer codes, and date
+    fields become integer day ordinals. Filters and group-bys then work on the
+    integer codes instead of re-reading and re-parsing every dict. When NumPy
+    is installed they run vectorised (bincount over combined group codes);
+    otherwise a pure-Python loop over the arrays gives the same results.
+
+    Missing numeric values count as 0.0, like database.aggregation.aggregate.
+    Malformed ones are stored as NaN and counted in ``malformed``; a sum or
+    group total that includes one raises ValueError rather than silently
+    leaving it out.
+
+    Build one per data version through DataLoader.get_snapshot.
+    """
+
+    def __init__(self, records, numeric=(), categorical=(), dates=()):
+        records = records if isinstance(records, list) else list(records)
+        self.size = len(records)
+        self.numeric = {}
+        self.malformed = {}
+        for field in numeric:
+            self.numeric[field], self.malformed[field] = _numeric_column(field, records)
+        self.categorical = {
+            field: DictionaryColumn(record.get(field) for record in records) for field in categorical
+        }
+        self.dates = {field: _ordinals(record.get(field) for record in records) for field in dates}
+
+    def __len__(self):
+        return self.size
+
+    def translate(self, field, mapping, default=None):
+        """
+        Return a new categorical column holding mapping[value] for each row of field.
+
+        Only the distinct values are looked up, e.g. member_id -> gym_id maps
+        each member once however many payments they have.
+        """
+        source = self.categorical[field]
+        derived = DictionaryColumn(mapping.get(value, default) for value in source.values)
+        table = derived.codes
+        if numpy is not None:
+            derived.codes = array("q", numpy.asarray(table)[self._vector(source.codes)].tobytes())
+        else:
+            derived.codes = array("q", [table[code] for code in source.codes])
+        return derived
+
+    def count(self, where=None):
+        rows = self._rows(where)
+        if rows is None:
+            return self.size
+        return int(rows.sum()) if numpy is not None else len(rows)
+
+    def sum(self, value, where=None):
+        """Total of a numeric field over the rows matching where."""
+        column = self.numeric[value]
+        rows = self._rows(where)
+        if numpy is not None:
+            vector = self._vector(column)
+            total = float((vector if rows is None else vector[rows]).sum())
+        else:
+            total = math.fsum(column if rows is None else [column[row] for row in rows])
+        return self._checked(value, total)
+
+    def group_sum(self, by, value=None, where=None):
+        """
+        Group rows and total a numeric field per group.
+
+        :param by: Field name, categorical column (see translate) or a tuple of them.
+        :param value: Numeric field to total, or None to only count.
+        :param where: Dictionary of field -> value (or list/tuple/set of values,
+                      or a (first, last) ISO-date tuple for date fields).
+        :return: Dictionary of group (a tuple when by is a tuple) -> {"count": int, value: float},
+                 the same shape as database.aggregation.aggregate.
+        """
+        single = not isinstance(by, tuple)
+        columns = [key if isinstance(key, DictionaryColumn) else self.categorical[key]
+                   for key in ((by,) if single else by)]
+        sizes = [max(len(column.values), 1) for column in columns]
+        rows = self._rows(where)
+
+        # One integer per row identifies its group: the column codes in mixed radix.
+        if numpy is not None:
+            keys = numpy.zeros(self.size, dtype=numpy.int64)
+            for column, size in zip(columns, sizes):
+                keys = keys * size + self._vector(column.codes)
+            weights = self._vector(self.numeric[value]) if value is not None else None
+            if rows is not None:
+                keys = keys[rows]
+                weights = weights[rows] if weights is not None else None
+            counts = numpy.bincount(keys)
+            totals = numpy.bincount(keys, weights=weights) if weights is not None else None
+            found = numpy.nonzero(counts)[0].tolist()
+            counts = counts.tolist()
+            totals = totals.tolist() if totals is not None else None
+        else:
+            keys = columns[0].codes
+            for column, size in zip(columns[1:], sizes[1:]):
+                keys = [key * size + code for key, code in zip(keys, column.codes)]
+            if rows is not None:
+                keys = [keys[row] for row in rows]
+            counts = {}
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+            totals = None
+            if value is not None:
+                values = self.numeric[value]
+                totals = dict.fromkeys(counts, 0.0)
+                for key, amount in zip(keys, values if rows is None else [values[row] for row in rows]):
+                    totals[key] += amount
+            found = list(counts)
+
+        groups = {}
+        for key in found:
+            result = {"count": int(counts[key])}
+            if totals is not None:
+                result[value] = self._checked(value, float(totals[key]))
+            group = []
+            for column, size in zip(reversed(columns), reversed(sizes)):
+                key, code = divmod(key, size)
+                group.append(column.values[code])
+            groups[group[0] if single else tuple(reversed(group))] = result
+        return groups
+
+    def _checked(self, field, total):
+        if math.isnan(total):
+            logger.error(f"Cannot total '{field}': the rows include values that are not numbers.")
+            raise ValueError(f"Cannot total '{field}': {self.malformed[field]} values are not numbers.")
+        return total
+
+    @staticmethod
+    def _vector(column):
+        """Zero-copy NumPy view of an array column."""
+        return numpy.frombuffer(column, dtype=numpy.float64 if column.typecode == "d" else numpy.int64)
+
+    def _rows(self, where):
+        """Boolean mask (NumPy) or list of row numbers matching where; None selects every row."""
+        rows = None
+        for field, wanted in (where or {}).items():
+            if field in self.dates:
+                first, last = (_to_ordinal(bound) for bound in wanted)
+                column = self.dates[field]
+                if numpy is not None:
+                    ordinals = self._vector(column)
+                    match = (ordinals >= first) & (ordinals <= last)
+                elif rows is None:
+                    rows = [row for row, ordinal in enumerate(column) if first <= ordinal <= last]
+                else:
+                    rows = [row for row in rows if first <= column[row] <= last]
+            else:
+                column = self.categorical[field]
+                codes = column.codes_of(wanted)
+                if numpy is not None:
+                    match = numpy.isin(self._vector(column.codes), list(codes))
+                elif rows is None:
+                    rows = [row for row, code in enumerate(column.codes) if code in codes]
+                else:
+                    rows = [row for row in rows if column.codes[row] in codes]
+            if numpy is not None:
+                rows = match if rows is None else rows & match
+        return rows
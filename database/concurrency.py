@@ -0,0 +1,167 @@
+# database/concurrency.py
+import os
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictError(ValueError):
+    """Raised when a save conflicts with a change another process made to the same record."""
+
+
+class FileLock:
+    """
+    Advisory reader/writer lock on a lock file, shared between processes.
+
+    Uses flock() where available, so any number of readers can hold the lock
+    while a writer waits for exclusive access. On Windows (msvcrt) every lock
+    is exclusive. The lock is re-entrant within a process: nested acquisitions
+    of the same path reuse the file descriptor already held, since a second
+    flock() on a fresh descriptor would block on our own lock.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+
+    @classmethod
+    def for_path(cls, path):
+        """Return the process-wide lock object for path."""
+        with cls._registry_lock:
+            lock = cls._registry.get(path)
+            if lock is None:
+                lock = cls._registry[path] = cls(path)
+            return lock
+
+    def acquire(self, exclusive):
+        self._thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+                self._lock_fd(exclusive)
+                self._exclusive = exclusive
+            elif exclusive and not self._exclusive:
+                # Upgrade a shared lock held further up the stack.
+                self._lock_fd(True)
+                self._exclusive = True
+            self._depth += 1
+        except BaseException:
+            if self._depth == 0 and self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        try:
+            self._depth -= 1
+            if self._depth == 0:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+                os.close(self._fd)
+                self._fd = None
+        finally:
+            self._thread_lock.release()
+
+    def shared(self):
+        return _Held(self, exclusive=False)
+
+    def exclusive(self):
+        return _Held(self, exclusive=True)
+
+    def _lock_fd(self, exclusive):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+
+
+class _Held:
+    """Context manager returned by FileLock.shared() and FileLock.exclusive()."""
+
+    def __init__(self, lock, exclusive):
+        self.lock = lock
+        self.exclusive = exclusive
+
+    def __enter__(self):
+        self.lock.acquire(self.exclusive)
+        return self.lock
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+        return False
+
+
+def lock_path(source):
+    """Return the lock file guarding a data source (<file>.lock)."""
+    return source.get("lock") or source["file"] + ".lock"
+
+
+_MISSING = object()
+
+
+def merge_changes(source_name, key, base, ours, theirs):
+    """
+    Re-apply the records we changed since base onto the latest stored version.
+
+    :param key: Primary key field of the source.
+    :param base: The collection as it was when we read it.
+    :param ours: The collection we want to save (base plus our changes).
+    :param theirs: The collection as another process has saved it since.
+    :return: theirs with our inserted, updated and deleted records applied;
+             records we inserted are appended at the end.
+    :raises ConflictError: if a record we changed was also changed differently
+                           by the other writer, or records cannot be matched by key.
+    """
+    if not key:
+        raise ConflictError(f"{source_name} was changed by another process and has no primary key to merge on.")
+    base_index = _index(source_name, key, base)
+    ours_index = _index(source_name, key, ours)
+    merged = _index(source_name, key, theirs)
+    theirs_index = dict(merged)
+
+    for key_value, record in ours_index.items():
+        original = base_index.get(key_value, _MISSING)
+        if original == record:
+            continue
+        current = theirs_index.get(key_value, _MISSING)
+        if current != original and current != record:
+            raise ConflictError(f"{key} '{key_value}' in {source_name} was changed by another process.")
+        merged[key_value] = record
+
+    for key_value, original in base_index.items():
+        if key_value in ours_index:
+            continue
+        current = theirs_index.get(key_value, _MISSING)
+        if current is not _MISSING and current != original:
+            raise ConflictError(f"{key} '{key_value}' in {source_name} was changed by another process.")
+        merged.pop(key_value, None)
+    return list(merged.values())
+
+
+def _index(source_name, key, records):
+    index = {}
+    for record in records:
+        key_value = record.get(key)
+        if key_value is None or key_value in index:
+            raise ConflictError(f"{source_name} has missing or duplicate {key} values; cannot merge.")
+        index[key_value] = record
+    return index
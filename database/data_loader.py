@@ -1,7 +1,24 @@
 # database/data_loader.py
 import json
+import marshal
 import os
 import logging
+import threading
+import functools
+import weakref
+from itertools import islice
+from contextlib import ExitStack, contextmanager, nullcontext
+from database.concurrency import ConflictError, FileLock, lock_path, merge_changes
+from database.serialization import get_codec
+from database.storage import JsonStorage, JsonLinesStorage, JournalStorage
+from database.sqlite_storage import SqliteStorage
+from database.mmap_storage import MmapJsonLinesStorage
+from database.partitioned_storage import PartitionedStorage
+from database.keyed_collection import KeyedCollection
+from database.columnar import ColumnarSnapshot
+from database.events import ChangeBus, diff_records
+from database.read_snapshot import ReadSnapshot
+from database.query import date_range, equalities, matches, order, parse_where, project as project_fields
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,35 +28,90 @@ class DataLoader:
     # Define the base directory relative to this file's location
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "."))
 
-    # Updated data_sources to use only JSON
+    # Updated data_sources to use only JSON. "type" selects the storage engine
+    # (see storage_backends), "key" names the primary key of each record and
+    # "indexes" lists the foreign-key/date fields kept in secondary indexes
+    # (a tuple of fields declares a composite index, see KeyedCollection).
+    # An optional "codec" ("pretty", "compact", "fast" or "msgpack", see
+    # database/serialization.py) sets the on-disk encoding of json/journal sources.
+    # "columns" lists the numeric, categorical and date fields kept in the
+    # columnar snapshot used for analytics (see get_snapshot).
+    # "partitioned" sources are stored as one file per month of their
+    # "partition_by" date field, so date-bounded reads (see get_period) only
+    # open the months they need.
+    # New IDs come from a persisted sequence per source (see IdAllocator);
+    # "id_prefix" gives '<prefix><n>' IDs instead of 8-character short IDs.
     data_sources = {
         "members": {
             "file": os.path.join(base_dir, "members.json"),
-            "type": "json"
+            "type": "json",
+            "key": "member_id",
+            "indexes": ["gym_id"]
         },
         "payments": {
             "file": os.path.join(base_dir, "payments.json"),
-            "type": "json"
+            "type": "partitioned",
+            "partition_by": "date",
+            "key": "payment_id",
+            "id_prefix": "P",
+            "indexes": ["member_id", "date"],
+            "columns": {
+                "numeric": ["amount"],
+                "categorical": ["member_id", "gym_name", "status", "payment_type", "payment_method"],
+                "dates": ["date"]
+            }
         },
         "appointments": {
             "file": os.path.join(base_dir, "appointments.json"),
-            "type": "json"
+            "type": "json",
+            "key": "appointment_id",
+            "indexes": ["member_id", "trainer_id", "date"]
         },
         "attendance": {
             "file": os.path.join(base_dir, "attendance.json"),
-            "type": "json"
+            "type": "partitioned",
+            "partition_by": "date",
+            "key": "attendance_id",
+            "indexes": ["class_id", "user_id", "date"],
+            "columns": {
+                "categorical": ["class_id", "user_id"],
+                "dates": ["date"]
+            }
+        },
+        "attendance_rollups": {
+            "file": os.path.join(base_dir, "attendance_rollups.json"),
+            "type": "partitioned",
+            "partition_by": "date",
+            "key": "rollup_id",
+            "indexes": ["gym_id", "class_id"]
+        },
+        "attendance_archive": {
+            "file": os.path.join(base_dir, "attendance_archive.json"),
+            "type": "partitioned",
+            "partition_by": "date",
+            "key": "attendance_id"
         },
         "gyms": {
             "file": os.path.join(base_dir, "gyms.json"),
-            "type": "json"
+            "type": "json",
+            "key": "gym_id"
         },
         "locations": {
             "file": os.path.join(base_dir, "locations.json"),
-            "type": "json"
+            "type": "json",
+            "key": "location_id"
         },
         "classes": {
             "file": os.path.join(base_dir, "classes.json"),
-            "type": "json"
+            "type": "json",
+            "key": "class_id",
+            "indexes": ["gym_id", "trainer_id"]
+        },
+        "registrations": {
+            "file": os.path.join(base_dir, "registrations.json"),
+            "type": "journal",
+            "key": "registration_id",
+            "indexes": ["class_id", "member_id", ("class_id", "day", "time")]
         },
         "staff_roles": {
             "file": os.path.join(base_dir, "staff_roles.json"),
@@ -47,6 +119,50 @@ class DataLoader:
         }
     }
 
+    # In-process cache of parsed collections, keyed by source name. Each entry
+    # holds the file signature it was read at and a marshal snapshot of the
+    # data, so every caller still receives its own independent copy.
+    cache_enabled = True
+    _cache = {}
+    _cache_stats = {"hits": 0, "misses": 0}
+    # KeyedCollection per source, rebuilt when the source's signature changes
+    _collections = {}
+    # ColumnarSnapshot per source, rebuilt when the source's signature changes
+    _snapshots = {}
+
+    # Open ReadSnapshots (see read_snapshot) and the number of saves made so
+    # far, which versions them. A save hands each open snapshot that has not
+    # read the source yet the version it replaces.
+    _open_read_snapshots = weakref.WeakSet()
+    _read_snapshot_lock = threading.Lock()
+    _version = 0
+
+    # Saves deferred by group_commit(), per thread: source name -> marshal snapshot
+    _batch = threading.local()
+
+    # Several processes (front desks) sharing the database directory: reads and
+    # writes take advisory file locks, and a save whose collection was changed
+    # by another process since we read it is merged record by record. The
+    # collection's storage signature serves as its version stamp; _bases keeps
+    # the (version, snapshot) each source was last read at.
+    shared_access = False
+    _bases = {}
+
+    # Record-level insert/update/delete notifications published after each
+    # save, for screens that patch their rows instead of reloading (see
+    # database/events.py). Saves are only diffed while someone is subscribed.
+    changes = ChangeBus()
+
+    # Storage engines selectable per source through its "type" entry
+    storage_backends = {
+        "json": JsonStorage(),
+        "jsonl": JsonLinesStorage(),
+        "journal": JournalStorage(),
+        "sqlite": SqliteStorage(),
+        "mmap": MmapJsonLinesStorage(),
+        "partitioned": PartitionedStorage(),
+    }
+
     @staticmethod
     def get_data(source_name):
         """Retrieve data from the specified JSON source."""
@@ -55,26 +171,53 @@ class DataLoader:
             logger.error(f"Data source '{source_name}' not found.")
             raise ValueError(f"Data source '{source_name}' not found.")
 
-        file_path = source["file"]
-        if not os.path.exists(file_path):
-            DataLoader._initialize_file(source)
+        pending = DataLoader._pending().get(source_name)
+        if pending is None:
+            pending = DataLoader._transaction_reads().get(source_name)
+        if pending is not None:
+            return marshal.loads(pending)
 
-        if source["type"] == "json":
+        storage = DataLoader._get_storage(source_name, source)
+        with DataLoader._lock(source, exclusive=False):
+            signature = storage.signature(source)
+            data = DataLoader._cache_lookup(source_name, signature)
+            if data is None:
+                try:
+                    data = storage.read(source_name, source)
+                except Exception as e:
+                    logger.error(f"Error reading {source_name}.json: {e}")
+                    raise
+                signature = storage.signature(source)
+                DataLoader._cache_store(source_name, signature, data)
+            DataLoader._remember_base(source_name, signature, data)
+        # Lets get_collection cache only collections built from an actual read.
+        DataLoader._batch.last_read = (source_name, signature)
+        if getattr(DataLoader._batch, "transactions", 0):
+            # Later reads in this transaction are served from memory, not storage.
             try:
-                with open(file_path, "r") as f:
-                    data = json.load(f)
-                # Ensure data is a list
-                if not isinstance(data, list):
-                    logger.warning(f"Data in {source_name}.json is not a list. Resetting to empty list.")
-                    data = []
-            except json.JSONDecodeError:
-                logger.warning(f"{source_name}.json is empty or malformed. Initializing as empty list.")
-                data = []
-                DataLoader.save_data(source_name, data)
-            except Exception as e:
-                logger.error(f"Error reading {source_name}.json: {e}")
-                raise
-            return data
+                DataLoader._transaction_reads()[source_name] = marshal.dumps(data)
+            except ValueError:
+                pass
+        return data
+
+    @staticmethod
+    def iter_data(source_name):
+        """
+        Yield the records of a source one at a time.
+
+        Unlike get_data the collection is never held in memory as a whole (for
+        json, jsonl and sqlite sources), so long histories can be scanned in
+        constant memory. Records are read straight from storage and bypass the cache.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+
+        storage = DataLoader._get_storage(source_name, source)
+        if not hasattr(storage, "iter") or source_name in DataLoader._pending():
+            return iter(DataLoader.get_data(source_name))
+        return storage.iter(source_name, source)
 
     @staticmethod
     def save_data(source_name, data):
@@ -84,27 +227,693 @@ class DataLoader:
             logger.error(f"Data source '{source_name}' not found.")
             raise ValueError(f"Data source '{source_name}' not found.")
 
+        DataLoader._collections.pop(source_name, None)
+        DataLoader._snapshots.pop(source_name, None)
+        if getattr(DataLoader._batch, "depth", 0):
+            try:
+                # Snapshot now so later changes by the caller are not picked up at flush time.
+                DataLoader._pending()[source_name] = marshal.dumps(data)
+                return
+            except ValueError:
+                pass
+        DataLoader._write(source_name, source, data)
+
+    @staticmethod
+    @contextmanager
+    def group_commit():
+        """
+        Coalesce the saves made inside the block into one durable write per source.
+
+        save_data calls are held in memory (get_data and friends see them) and
+        the last version of each source is written, with a single fsync, when
+        the outermost block exits, even if it exits with an exception. Can also
+        be used as a decorator: @DataLoader.group_commit().
+        """
+        batch = DataLoader._batch
+        batch.depth = getattr(batch, "depth", 0) + 1
+        try:
+            yield
+        finally:
+            batch.depth -= 1
+            if batch.depth == 0:
+                DataLoader._flush_pending()
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """
+        Unit of work spanning several collections.
+
+        Inside the block each collection is read from storage at most once (later
+        get_data calls are answered from memory) and save_data calls are staged.
+        When the outermost block exits normally every staged collection is written
+        once, as with group_commit(). If the block raises, the changes staged
+        since it began are discarded; a nested transaction therefore acts as a
+        savepoint within the outer one. Can also be used as a decorator.
+
+        Example:
+            with DataLoader.transaction():
+                members = DataLoader.get_data("members")
+                payments = DataLoader.get_data("payments")
+                ...
+                DataLoader.save_data("members", members)
+                DataLoader.save_data("payments", payments)
+        """
+        batch = DataLoader._batch
+        pending = DataLoader._pending()
+        savepoint = dict(pending)
+        batch.transactions = getattr(batch, "transactions", 0) + 1
+        try:
+            with DataLoader.group_commit():
+                try:
+                    yield
+                except BaseException:
+                    pending.clear()
+                    pending.update(savepoint)
+                    logger.info("Transaction rolled back; staged changes discarded.")
+                    raise
+        finally:
+            batch.transactions -= 1
+            if not batch.transactions:
+                batch.reads = {}
+
+    @staticmethod
+    def _transaction_reads():
+        batch = DataLoader._batch
+        if not hasattr(batch, "reads"):
+            batch.reads = {}
+        return batch.reads
+
+    @staticmethod
+    def _pending():
+        batch = DataLoader._batch
+        if not hasattr(batch, "pending"):
+            batch.pending = {}
+        return batch.pending
+
+    @staticmethod
+    def _flush_pending():
+        """
+        Write every source saved during the finished group commit.
+
+        With shared access all the sources are locked (in name order, so desks
+        cannot deadlock) and merged before the first one is written; a conflict
+        therefore aborts the whole commit rather than leaving it half applied.
+        """
+        pending = DataLoader._pending()
+        staged = sorted(pending.items())
+        pending.clear()
+        with ExitStack() as locks:
+            for source_name, _ in staged:
+                locks.enter_context(DataLoader._lock(DataLoader.data_sources[source_name], exclusive=True))
+            batch = [
+                (source_name, DataLoader._rebase(source_name, marshal.loads(snapshot)))
+                for source_name, snapshot in staged
+            ]
+            error = None
+            for source_name, data in batch:
+                try:
+                    DataLoader._write(source_name, DataLoader.data_sources[source_name], data, rebase=False)
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                raise error
+
+    @staticmethod
+    def _write(source_name, source, data, rebase=True):
         file_path = source["file"]
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-        if source["type"] == "json":
+        storage = DataLoader._get_storage(source_name, source)
+        DataLoader._collections.pop(source_name, None)
+        DataLoader._snapshots.pop(source_name, None)
+        watched = DataLoader.changes.has_subscribers(source_name)
+        with DataLoader._lock(source, exclusive=True):
+            if rebase:
+                data = DataLoader._rebase(source_name, data)
             try:
-                with open(file_path, "w") as f:
-                    json.dump(data, f, indent=4)
+                previous = DataLoader._stored_data(source_name, source, storage) if watched else None
+                DataLoader._preserve_for_snapshots(source_name, source, storage)
+                storage.write(source_name, source, data)
+                with DataLoader._read_snapshot_lock:
+                    DataLoader._version += 1
+                signature = storage.signature(source)
+                DataLoader._cache_store(source_name, signature, data)
+                DataLoader._remember_base(source_name, signature, data)
                 logger.info(f"Data saved to {source_name}.json successfully.")
             except Exception as e:
                 logger.error(f"Failed to save data to {source_name}.json: {e}")
                 raise
+        if watched:
+            DataLoader.changes.publish(source_name, diff_records(source_name, source.get("key"), previous, data))
+
+    @staticmethod
+    def _stored_data(source_name, source, storage):
+        """Return the records currently stored for a source, or None if they cannot be read."""
+        entry = DataLoader._cache.get(source_name)
+        try:
+            if entry is not None and entry["signature"] == storage.signature(source):
+                return marshal.loads(entry["snapshot"])
+            return storage.read(source_name, source)
+        except Exception as e:
+            logger.warning(f"Could not read {source_name} to describe its changes: {e}")
+            return None
+
+    @staticmethod
+    def subscribe(source_name, callback):
+        """
+        Call callback(changes) after every save of a source, with one Change per
+        inserted, updated or deleted record (see database/events.py).
+
+        :return: A function that cancels the subscription.
+        """
+        if source_name not in DataLoader.data_sources:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        return DataLoader.changes.subscribe(source_name, callback)
+
+    @staticmethod
+    def read_snapshot(preload=False):
+        """
+        Return a ReadSnapshot: a consistent read-only view of every source as of now.
+
+        Use it for jobs that read several collections over a long time, such as
+        a run of reports, so they see one moment of the data while desks keep
+        saving. Taking the snapshot copies nothing (see ReadSnapshot); close it,
+        or use it as a context manager, when the job is done.
+
+        :param preload: Pin every source immediately, reading those not in the
+                        cache, so later saves by other processes are not seen either.
+        """
+        snapshot = ReadSnapshot(DataLoader._version, {}, {}, DataLoader)
+        # Registered before anything is pinned, so no save can slip in unnoticed.
+        with DataLoader._read_snapshot_lock:
+            DataLoader._open_read_snapshots.add(snapshot)
+        for source_name, source in DataLoader.data_sources.items():
+            signature = DataLoader._get_storage(source_name, source).signature(source)
+            snapshot._signatures[source_name] = signature
+            entry = DataLoader._cache.get(source_name) if DataLoader.cache_enabled else None
+            if entry is not None and entry["signature"] == signature:
+                snapshot._pin(source_name, entry["snapshot"])
+            elif preload:
+                DataLoader._pin_for_snapshot(snapshot, source_name)
+        logger.debug(f"Took read snapshot at version {snapshot.version}.")
+        return snapshot
+
+    @staticmethod
+    def _pin_for_snapshot(snapshot, source_name):
+        """Pin the stored contents of a source in a snapshot and return its encoded data."""
+        source = DataLoader.data_sources[source_name]
+        storage = DataLoader._get_storage(source_name, source)
+        with DataLoader._lock(source, exclusive=False):
+            signature = storage.signature(source)
+            payload = DataLoader._encoded_data(source_name, source, storage, signature)
+        return snapshot._pin(source_name, payload, signature)
+
+    @staticmethod
+    def _preserve_for_snapshots(source_name, source, storage):
+        """Before a save, give open snapshots that have not read the source its current contents."""
+        with DataLoader._read_snapshot_lock:
+            waiting = [s for s in DataLoader._open_read_snapshots if not s.is_pinned(source_name)]
+        if not waiting:
+            return
+        signature = storage.signature(source)
+        payload = DataLoader._encoded_data(source_name, source, storage, signature)
+        for snapshot in waiting:
+            snapshot._pin(source_name, payload, signature)
+
+    @staticmethod
+    def _release_snapshot(snapshot):
+        with DataLoader._read_snapshot_lock:
+            DataLoader._open_read_snapshots.discard(snapshot)
+
+    @staticmethod
+    def _encoded_data(source_name, source, storage, signature):
+        """Return the stored records of a source marshal-encoded, from the cache when it is current."""
+        entry = DataLoader._cache.get(source_name)
+        if DataLoader.cache_enabled and entry is not None and entry["signature"] == signature:
+            return entry["snapshot"]
+        return marshal.dumps(storage.read(source_name, source))
+
+    @staticmethod
+    def enable_shared_access():
+        """Lock data files and merge concurrent saves, for desks sharing one database directory."""
+        DataLoader.shared_access = True
+
+    @staticmethod
+    def disable_shared_access():
+        DataLoader.shared_access = False
+        DataLoader._bases.clear()
+
+    @staticmethod
+    def retry_on_conflict(attempts=3):
+        """
+        Decorator that re-runs an operation when its save hits a ConflictError.
+
+        Each attempt starts over from get_data, so validations such as class
+        capacity are checked again against the other desk's changes.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                for attempt in range(1, attempts + 1):
+                    try:
+                        return func(*args, **kwargs)
+                    except ConflictError as e:
+                        if attempt == attempts:
+                            raise
+                        logger.warning(f"{func.__qualname__} conflicted with another desk ({e}); retrying.")
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _lock(source, exclusive):
+        if not DataLoader.shared_access:
+            return nullcontext()
+        lock = FileLock.for_path(lock_path(source))
+        return lock.exclusive() if exclusive else lock.shared()
+
+    @staticmethod
+    def _remember_base(source_name, signature, data):
+        """Record the version a source was read or written at, for merging later saves."""
+        if not DataLoader.shared_access:
+            return
+        entry = DataLoader._cache.get(source_name)
+        if entry is not None and entry["signature"] == signature:
+            snapshot = entry["snapshot"]
+        else:
+            try:
+                snapshot = marshal.dumps(data)
+            except ValueError:
+                DataLoader._bases.pop(source_name, None)
+                return
+        DataLoader._bases[source_name] = (signature, snapshot)
+
+    @staticmethod
+    def _rebase(source_name, data):
+        """
+        Return data merged onto the stored collection if another process saved it
+        since we read it (the caller holds the exclusive lock).
+        """
+        base = DataLoader._bases.get(source_name) if DataLoader.shared_access else None
+        if base is None:
+            return data
+        source = DataLoader.data_sources[source_name]
+        storage = DataLoader._get_storage(source_name, source)
+        if storage.signature(source) == base[0]:
+            return data
+        current = storage.read(source_name, source)
+        merged = merge_changes(source_name, source.get("key"), marshal.loads(base[1]), data, current)
+        logger.info(f"Merged this desk's changes to {source_name} with concurrent changes from another process.")
+        return merged
+
+    @staticmethod
+    def get_collection(source_name):
+        """
+        Return the source as a KeyedCollection indexed on its primary key and
+        on the fields listed in its "indexes" entry.
+
+        With the cache enabled the collection is kept between calls and only
+        rebuilt when the underlying data changes, so lookups by key are O(1).
+        Each caller receives a copy-on-write view of it: changes made through
+        insert/update/delete stay private to that view until it is saved with
+        save_collection.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+
+        if not DataLoader.cache_enabled or source_name in DataLoader._pending():
+            return KeyedCollection(
+                source_name, source.get("key"), DataLoader.get_data(source_name), source.get("indexes", ())
+            )
+
+        storage = DataLoader._get_storage(source_name, source)
+        cached = DataLoader._collections.get(source_name)
+        if cached and cached["signature"] == storage.signature(source):
+            return cached["collection"].view()
+
+        DataLoader._batch.last_read = None
+        collection = KeyedCollection(
+            source_name, source.get("key"), DataLoader.get_data(source_name), source.get("indexes", ())
+        )
+        last_read = DataLoader._batch.last_read
+        if last_read is not None and last_read[0] == source_name:
+            DataLoader._collections[source_name] = {"signature": last_read[1], "collection": collection}
+        return collection.view()
+
+    @staticmethod
+    def get_snapshot(source_name):
+        """
+        Return a read-only ColumnarSnapshot of the source's "columns" fields.
+
+        The snapshot is built once per data version (storage signature) and
+        shared between callers, so revenue totals and other group-bys over
+        payments or attendance no longer re-read and re-parse every record.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        columns = source.get("columns")
+        if not columns:
+            raise ValueError(f"Data source '{source_name}' has no columnar layout.")
+
+        if not DataLoader.cache_enabled or source_name in DataLoader._pending():
+            return ColumnarSnapshot(DataLoader.get_data(source_name), **columns)
+
+        storage = DataLoader._get_storage(source_name, source)
+        signature = storage.signature(source)
+        cached = DataLoader._snapshots.get(source_name)
+        if cached and cached["signature"] == signature:
+            return cached["snapshot"]
+
+        snapshot = ColumnarSnapshot(DataLoader.get_data(source_name), **columns)
+        DataLoader._snapshots[source_name] = {"signature": signature, "snapshot": snapshot}
+        logger.info(f"Built columnar snapshot of {source_name} ({len(snapshot)} records).")
+        return snapshot
+
+    @staticmethod
+    def save_collection(collection):
+        """Persist a KeyedCollection after insert/update/delete calls, keeping its index warm."""
+        source_name = collection.source_name
+        before = DataLoader._cache.get(source_name)
+        DataLoader.save_data(source_name, collection.records())
+        # Cached only once the save has written through to the data cache: a
+        # save staged by group_commit()/transaction() may still be rolled back.
+        after = DataLoader._cache.get(source_name)
+        if after is not None and after is not before and source_name not in DataLoader._pending():
+            DataLoader._collections[source_name] = {"signature": after["signature"], "collection": collection.view()}
+
+    @staticmethod
+    def get_record(source_name, key_value, default=None):
+        """
+        Return the record of a source with the given primary key, or default.
+
+        Engines with their own key index (mmap) read just that record;
+        otherwise the lookup goes through the source's KeyedCollection.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+
+        storage = DataLoader._get_storage(source_name, source)
+        if hasattr(storage, "get") and source_name not in DataLoader._pending():
+            with DataLoader._lock(source, exclusive=False):
+                record = storage.get(source_name, source, key_value)
+            return default if record is None else record
+        return DataLoader.get_collection(source_name).get(key_value, default)
+
+    @staticmethod
+    def find(source_name, **criteria):
+        """
+        Return the records of a source whose fields equal the given values.
+
+        Engines that can filter natively (SQLite) receive the criteria directly
+        so indexed columns are used, and a date criterion on a partitioned
+        source reads only that month. Other sources with a primary key are
+        answered from their KeyedCollection's indexes; the rest are scanned.
+
+        :param source_name: Name of the data source.
+        :param criteria: Field/value pairs that must all match.
+        :return: List of matching records.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+
+        storage = DataLoader._get_storage(source_name, source)
+        if hasattr(storage, "query") and source_name not in DataLoader._pending():
+            with DataLoader._lock(source, exclusive=False):
+                return storage.query(source_name, source, criteria)
+        field = source.get("partition_by")
+        if isinstance(criteria.get(field), str) and hasattr(storage, "read_period"):
+            # A date criterion selects one partition; read it instead of the whole history.
+            day = criteria[field]
+            return DataLoader.get_period(source_name, day, day, **criteria)
+        if source.get("key"):
+            return DataLoader.get_collection(source_name).find(**criteria)
+        return [
+            record for record in DataLoader.get_data(source_name)
+            if all(record.get(field) == value for field, value in criteria.items())
+        ]
+
+    @staticmethod
+    def get_period(source_name, first, last=None, **criteria):
+        """
+        Return the records of a source dated between first and last, inclusive.
+
+        For partitioned sources only the months overlapping the range are read;
+        other sources are filtered after a full read.
+
+        :param source_name: Name of the data source (must have a "partition_by" field).
+        :param first: First date, as 'YYYY-MM-DD' or a date.
+        :param last: Last date (defaults to first, i.e. a single day).
+        :param criteria: Further field/value pairs that must all match.
+        :return: List of matching records.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        field = source.get("partition_by")
+        if not field:
+            raise ValueError(f"Data source '{source_name}' has no date field to select periods on.")
+
+        first = first.isoformat() if hasattr(first, "isoformat") else str(first)
+        last = first if last is None else (last.isoformat() if hasattr(last, "isoformat") else str(last))
+        storage = DataLoader._get_storage(source_name, source)
+        staged = source_name in DataLoader._pending() or source_name in DataLoader._transaction_reads()
+        if hasattr(storage, "read_period") and not staged:
+            with DataLoader._lock(source, exclusive=False):
+                records = storage.read_period(source_name, source, first, last)
+        else:
+            records = [
+                record for record in DataLoader.get_data(source_name)
+                if record.get(field) is not None and first <= str(record.get(field))[:10] <= last
+            ]
+        return [
+            record for record in records
+            if all(record.get(name) == value for name, value in criteria.items())
+        ]
+
+    @staticmethod
+    def iter_period(source_name, first, last=None):
+        """
+        Yield the records of a source dated between first and last, inclusive.
+
+        The streaming counterpart of get_period: partitioned sources are read
+        one overlapping month at a time, other sources through iter_data, so
+        the range is never held in memory as a whole.
+
+        :param source_name: Name of the data source (must have a "partition_by" field).
+        :param first: First date, as 'YYYY-MM-DD' or a date.
+        :param last: Last date (defaults to first, i.e. a single day).
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        field = source.get("partition_by")
+        if not field:
+            raise ValueError(f"Data source '{source_name}' has no date field to select periods on.")
+
+        first = first.isoformat() if hasattr(first, "isoformat") else str(first)
+        last = first if last is None else (last.isoformat() if hasattr(last, "isoformat") else str(last))
+        storage = DataLoader._get_storage(source_name, source)
+        staged = source_name in DataLoader._pending() or source_name in DataLoader._transaction_reads()
+        if hasattr(storage, "iter_period") and not staged:
+            return storage.iter_period(source_name, source, first, last)
+        return (
+            record for record in DataLoader.iter_data(source_name)
+            if record.get(field) is not None and first <= str(record.get(field))[:10] <= last
+        )
+
+    @staticmethod
+    def query(source_name, where=None, project=None, order_by=None, limit=None, explain=False):
+        """
+        Return the records of a source matching where, optionally projected, sorted and limited.
+
+        The conditions are routed to the best access path available, in order:
+        the storage engine's own query (SQLite receives the equality conditions),
+        the months overlapping a date range on a partitioned source's
+        "partition_by" field, the KeyedCollection index of the most selective
+        equality on an indexed field, or else a scan. Every condition is then
+        checked on the candidates, so the result does not depend on the path.
+
+        :param source_name: Name of the data source.
+        :param where: {field: value} for equality or {field: (operator, operand)},
+                      e.g. {"status": "Paid", "date": ("between", "2024-07-01", "2024-09-30")};
+                      see database/query.py for the operators.
+        :param project: Optional list of fields to return, in that order.
+        :param order_by: Optional field or list of fields; prefix "-" for descending.
+        :param limit: Optional maximum number of records.
+        :param explain: Return the query plan instead of the records: a dictionary
+                        with "access" ("engine", "partitions", "index" or "scan"),
+                        "index" (the field whose index is used), "partitions" (the
+                        date range read), the parsed "conditions", "order_by" and
+                        "limit", plus "engine_plan" when the engine can explain itself.
+        :return: List of matching records, or the plan.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+
+        conditions = parse_where(where)
+        criteria = equalities(conditions)
+        storage = DataLoader._get_storage(source_name, source)
+        period = date_range(conditions, source["partition_by"]) if source.get("partition_by") else None
+        plan = {"source": source_name, "access": "scan", "index": None, "partitions": None,
+                "conditions": conditions, "order_by": order_by, "limit": limit}
+        collection = None
+        if hasattr(storage, "query") and source_name not in DataLoader._pending():
+            plan["access"] = "engine"
+            if explain and hasattr(storage, "explain"):
+                plan["engine_plan"] = storage.explain(source_name, source, criteria)
+        elif period and hasattr(storage, "read_period"):
+            plan["access"], plan["partitions"] = "partitions", period
+        elif source.get("key"):
+            collection = DataLoader.get_collection(source_name)
+            plan["index"] = collection.index_for(criteria)
+            plan["access"] = "index" if plan["index"] is not None else "scan"
+        logger.debug(f"Query plan for {source_name}: {plan}")
+        if explain:
+            return plan
+
+        if plan["access"] == "engine":
+            with DataLoader._lock(source, exclusive=False):
+                records = storage.query(source_name, source, criteria)
+        elif plan["access"] == "partitions":
+            records = DataLoader.get_period(source_name, *period)
+        elif collection is not None:
+            # Conditions are checked before records are copied out of the collection.
+            records = collection.select(criteria, lambda record: matches(record, conditions))
+        else:
+            records = DataLoader.get_data(source_name)
+        results = (record for record in records if matches(record, conditions))
+        if order_by:
+            results = order(results, order_by)
+        results = list(islice(results, limit)) if limit is not None else list(results)
+        return project_fields(results, project) if project else results
+
+    @staticmethod
+    def set_codec(source_name, codec_name, file_path=None):
+        """
+        Re-encode a source with another codec and keep using it from now on.
+
+        :param source_name: Name of the data source.
+        :param codec_name: Codec to switch to (see database/serialization.py).
+        :param file_path: Optional new file for the source; use one when switching
+                          to or from a binary codec so the old file is left intact.
+        """
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+
+        get_codec(codec_name)
+        data = DataLoader.get_data(source_name)
+        source["codec"] = codec_name
+        if file_path:
+            source["file"] = file_path
+        DataLoader.save_data(source_name, data)
+        logger.info(f"{source_name} now stored with the '{codec_name}' codec.")
+
+    @staticmethod
+    def compact(source_name):
+        """Fold a journal-backed source's log into its base snapshot right away."""
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        storage = DataLoader._get_storage(source_name, source)
+        if hasattr(storage, "compact"):
+            storage.compact(source_name, source)
+
+    @staticmethod
+    def _get_storage(source_name, source):
+        """Return the storage engine configured for a source."""
+        storage = DataLoader.storage_backends.get(source["type"])
+        if storage is None:
+            logger.error(f"Unsupported storage type '{source['type']}' for {source_name}.")
+            raise ValueError(f"Unsupported storage type '{source['type']}' for {source_name}.")
+        return storage
+
+    @staticmethod
+    def enable_cache():
+        """Turn the in-process collection cache on."""
+        DataLoader.cache_enabled = True
+
+    @staticmethod
+    def disable_cache():
+        """Turn the in-process collection cache off and drop its contents (used by tests)."""
+        DataLoader.cache_enabled = False
+        DataLoader.clear_cache()
+
+    @staticmethod
+    def clear_cache(source_name=None):
+        """Drop cached data for one source, or for all sources if none is given."""
+        if source_name is None:
+            DataLoader._cache.clear()
+            DataLoader._collections.clear()
+            DataLoader._snapshots.clear()
+        else:
+            DataLoader._cache.pop(source_name, None)
+            DataLoader._collections.pop(source_name, None)
+            DataLoader._snapshots.pop(source_name, None)
+
+    @staticmethod
+    def cache_stats():
+        """Return cache hit/miss counters and the sources currently cached."""
+        return {
+            "hits": DataLoader._cache_stats["hits"],
+            "misses": DataLoader._cache_stats["misses"],
+            "cached_sources": sorted(DataLoader._cache),
+        }
+
+    @staticmethod
+    def reset_cache_stats():
+        """Reset the cache hit/miss counters."""
+        DataLoader._cache_stats["hits"] = 0
+        DataLoader._cache_stats["misses"] = 0
+
+    @staticmethod
+    def _cache_lookup(source_name, signature):
+        """Return a fresh copy of the cached data, or None if the cache is cold or stale."""
+        if not DataLoader.cache_enabled:
+            return None
+        entry = DataLoader._cache.get(source_name)
+        if entry and entry["signature"] == signature:
+            DataLoader._cache_stats["hits"] += 1
+            return marshal.loads(entry["snapshot"])
+        DataLoader._cache_stats["misses"] += 1
+        return None
+
+    @staticmethod
+    def _cache_store(source_name, signature, data):
+        """Remember data as the current contents of a source (write-through on save)."""
+        if not DataLoader.cache_enabled:
+            return
+        try:
+            snapshot = marshal.dumps(data)
+        except ValueError:
+            # Data holds values marshal cannot encode; skip caching rather than fail the caller.
+            DataLoader._cache.pop(source_name, None)
+            return
+        DataLoader._cache[source_name] = {
+            "signature": signature,
+            "snapshot": snapshot,
+        }
 
     @staticmethod
     def _initialize_file(source):
         """Initialize a new JSON data file with an empty list."""
-        file_path = source["file"]
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         try:
-            with open(file_path, "w") as f:
-                json.dump([], f, indent=4)
-            logger.info(f"Initialized JSON file: {file_path}")
+            DataLoader.storage_backends["json"].initialize(source)
         except Exception as e:
             logger.error(f"Failed to initialize {source['file']}: {e}")
             raise
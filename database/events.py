@@ -0,0 +1,105 @@
+# database/events.py
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# One change to one record of a source. action is "insert", "update",
+# "delete" or "reload" (the source changed in a way that cannot be described
+# record by record, e.g. it has no primary key). record is the new version
+# (None on delete), previous the old one (None on insert).
+Change = namedtuple("Change", "source action key record previous")
+
+
+class ChangeBus:
+    """
+    Per-source publish/subscribe of record-level changes.
+
+    DataLoader publishes the changes of every save to the callbacks subscribed
+    to that source, so screens can patch the affected rows instead of
+    reloading the whole collection. Callbacks run synchronously on the saving
+    thread, after the data has been written.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, source_name, callback):
+        """
+        Call callback(changes) with the list of Change tuples after each save of source_name.
+
+        :return: A function that removes the subscription.
+        """
+        with self._lock:
+            self._subscribers.setdefault(source_name, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._subscribers.get(source_name, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+                if not callbacks:
+                    self._subscribers.pop(source_name, None)
+
+        return unsubscribe
+
+    def has_subscribers(self, source_name):
+        return bool(self._subscribers.get(source_name))
+
+    def publish(self, source_name, changes):
+        if not changes:
+            return
+        with self._lock:
+            callbacks = list(self._subscribers.get(source_name, ()))
+        for callback in callbacks:
+            try:
+                callback(changes)
+            except Exception as e:
+                # A failing listener must not turn a completed save into an error.
+                logger.error(f"Change listener for {source_name} failed: {e}")
+
+
+def diff_records(source_name, key, old, new):
+    """
+    Describe how a collection changed between two saves, record by record.
+
+    :param key: Primary key field of the source.
+    :param old: The records before the save, or None if unknown.
+    :param new: The records after the save.
+    :return: List of Change tuples, in the order of new (deletions last), or a
+             single "reload" change when records cannot be matched by key.
+    """
+    reload = [Change(source_name, "reload", None, None, None)]
+    if old is None or not key:
+        return reload
+    old_index = _index(key, old)
+    new_index = _index(key, new)
+    if old_index is None or new_index is None:
+        return reload
+
+    changes = []
+    for key_value, record in new_index.items():
+        previous = old_index.get(key_value)
+        if previous is None:
+            changes.append(Change(source_name, "insert", key_value, record, None))
+        elif previous != record:
+            changes.append(Change(source_name, "update", key_value, record, previous))
+    for key_value, previous in old_index.items():
+        if key_value not in new_index:
+            changes.append(Change(source_name, "delete", key_value, None, previous))
+    return changes
+
+
+def _index(key, records):
+    index = {}
+    for record in records:
+        key_value = record.get(key) if isinstance(record, dict) else None
+        try:
+            if key_value is None or key_value in index:
+                return None
+        except TypeError:
+            return None
+        index[key_value] = record
+    return index
@@ -1,5 +1,6 @@
 import csv
 import json
+from database.streaming import iter_records, write_json_lines
 
 
 class FileHandler:
@@ -30,3 +31,13 @@ class FileHandler:
     def write_json(filepath, data):
         with open(filepath, mode="w") as file:
             json.dump(data, file, indent=4)
+
+    @staticmethod
+    def iter_json(filepath):
+        """Yield records from a JSON-array or JSON-Lines file without loading it all."""
+        return iter_records(filepath)
+
+    @staticmethod
+    def write_json_lines(filepath, records):
+        """Write records (any iterable) as JSON-Lines; returns the number written."""
+        return write_json_lines(filepath, records)
@@ -0,0 +1,293 @@
+# database/health_store.py
+import copy
+import hashlib
+import hmac
+import json
+import os
+import logging
+import threading
+from collections import OrderedDict
+from database.concurrency import FileLock
+from database.storage import atomic_replace, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Marks a line whose member's profile was deleted.
+TOMBSTONE = b"-"
+
+
+class HealthStore:
+    """
+    Encrypted health profiles, one ciphertext per member, in an append-only file.
+
+    Each line of the data file is "<lookup> <token>", where lookup is a keyed
+    hash of the member ID (so the file does not reveal which members have a
+    profile) and token is that member's profile encrypted on its own with the
+    cipher (a Fernet instance, or anything with encrypt/decrypt on bytes).
+    Saving a profile appends one line; reading one seeks to its line through
+    an in-memory lookup -> (offset, length) index and decrypts that token
+    only, so neither depends on how many members have a profile. The most
+    recently read profiles are kept decrypted in a bounded LRU cache.
+
+    The index is saved next to the data file as <file>.idx, together with the
+    size and inode of the data file it covers. Lines appended since (by this
+    or another process) are picked up by reading only the new tail; a missing
+    or stale index is rebuilt with one scan. When superseded lines take up
+    more than half the file, it is rewritten with the live lines only.
+    """
+
+    def __init__(self, path, cipher, index_key, cache_size=128, fsync=True,
+                 min_compaction_bytes=64 * 1024, index_save_interval=256):
+        """
+        :param path: Data file; created on the first save.
+        :param cipher: Object with encrypt(bytes) -> bytes and decrypt(bytes) -> bytes.
+        :param index_key: Secret bytes keying the member ID hashes.
+        :param cache_size: Number of decrypted profiles kept in memory.
+        :param min_compaction_bytes: Files smaller than this are never compacted.
+        :param index_save_interval: Appends between two saves of the index file.
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.cipher = cipher
+        self.cache_size = cache_size
+        self.fsync = fsync
+        self.min_compaction_bytes = min_compaction_bytes
+        self.index_save_interval = index_save_interval
+        self._index_key = index_key
+        self._index = None
+        self._cache = OrderedDict()
+        self._unsaved = 0
+        self._lock = threading.RLock()
+        self._file_lock = FileLock.for_path(path + ".lock")
+
+    def lookup(self, member_id):
+        """Return the keyed hash that stands for member_id in the data file."""
+        return hmac.new(self._index_key, str(member_id).encode("utf-8"), hashlib.blake2b).hexdigest()[:32]
+
+    def get(self, member_id, default=None):
+        """Return a copy of a member's profile, or default if it has none."""
+        lookup = self.lookup(member_id)
+        with self._lock:
+            self._sync()
+            entry = self._index["offsets"].get(lookup)
+            if entry is None:
+                return default
+            cached = self._cache.get(lookup)
+            if cached is not None and cached[0] == entry[0]:
+                self._cache.move_to_end(lookup)
+                return copy.deepcopy(cached[1])
+            token = self._read_token(lookup, entry)
+            if token is None:
+                # The file was compacted by another process since the index was read.
+                self._rebuild()
+                entry = self._index["offsets"].get(lookup)
+                token = self._read_token(lookup, entry) if entry else None
+                if token is None:
+                    return default
+            profile = self._decrypt(token)["profile"]
+            self._remember(lookup, entry[0], profile)
+            return copy.deepcopy(profile)
+
+    def put(self, member_id, profile):
+        """Encrypt and save a member's profile, replacing any previous one."""
+        self.put_many({member_id: profile})
+
+    def put_many(self, profiles):
+        """Save several profiles ({member_id: profile}) with one append."""
+        entries = []
+        for member_id, profile in profiles.items():
+            payload = {"member_id": member_id, "profile": profile}
+            token = self.cipher.encrypt(json.dumps(payload).encode("utf-8"))
+            entries.append((self.lookup(member_id), token, profile))
+        self._append(entries)
+
+    def delete(self, member_id):
+        """
+        Remove a member's profile; returns False if there was none.
+
+        The file is compacted right away, so neither the member's profile nor
+        its superseded versions stay in it.
+        """
+        lookup = self.lookup(member_id)
+        with self._file_lock.exclusive(), self._lock:
+            self._sync()
+            if lookup not in self._index["offsets"]:
+                return False
+            self._append([(lookup, TOMBSTONE, None)])
+            if os.path.exists(self.path):
+                self.compact()
+        return True
+
+    def __contains__(self, member_id):
+        with self._lock:
+            self._sync()
+            return self.lookup(member_id) in self._index["offsets"]
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._index["offsets"])
+
+    def profiles(self):
+        """Yield (member_id, profile) for every stored profile, decrypting one line at a time."""
+        with self._lock:
+            self._sync()
+            entries = list(self._index["offsets"].items())
+        for lookup, entry in entries:
+            with self._lock:
+                token = self._read_token(lookup, entry)
+            if token is not None:
+                payload = self._decrypt(token)
+                yield payload["member_id"], payload["profile"]
+
+    def compact(self):
+        """Rewrite the data file with the live line of each member only."""
+        with self._file_lock.exclusive(), self._lock:
+            self._sync()
+            entries = sorted(self._index["offsets"].items(), key=lambda item: item[1][0])
+            offsets = {}
+            position = 0
+            with atomic_replace(self.path, self.fsync) as temp_path:
+                with open(self.path, "rb") as source, open(temp_path, "wb") as target:
+                    for lookup, (offset, length) in entries:
+                        source.seek(offset)
+                        target.write(source.read(length))
+                        offsets[lookup] = [position, length]
+                        position += length
+            stat = os.stat(self.path)
+            self._index = {"size": stat.st_size, "inode": stat.st_ino, "dead": 0, "offsets": offsets}
+            self._cache.clear()
+            self._save_index()
+        logger.info(f"Compacted {self.path} to {len(offsets)} profiles.")
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _append(self, entries):
+        lines = [lookup.encode("ascii") + b" " + token + b"\n" for lookup, token, _ in entries]
+        with self._file_lock.exclusive(), self._lock:
+            self._sync()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                position = f.tell()
+                if position > self._index["size"]:
+                    # A line left incomplete by a crashed writer (we hold the lock).
+                    logger.warning(f"Dropping an incomplete line at the end of {self.path}.")
+                    f.truncate(self._index["size"])
+                    position = self._index["size"]
+                f.write(b"".join(lines))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            for line, (lookup, token, profile) in zip(lines, entries):
+                self._apply(lookup, position, len(line), token == TOMBSTONE)
+                if profile is not None:
+                    self._remember(lookup, position, copy.deepcopy(profile))
+                position += len(line)
+            self._index["size"] = position
+            self._index["inode"] = os.stat(self.path).st_ino
+            self._unsaved += len(lines)
+            if self._should_compact():
+                self.compact()
+            elif self._unsaved >= self.index_save_interval:
+                self._save_index()
+
+    def _apply(self, lookup, offset, length, deleted):
+        """Point lookup at a new line, counting the line it replaces as dead."""
+        offsets = self._index["offsets"]
+        previous = offsets.pop(lookup, None)
+        if previous is not None:
+            self._index["dead"] += previous[1]
+        if deleted:
+            self._index["dead"] += length
+            self._cache.pop(lookup, None)
+        else:
+            offsets[lookup] = [offset, length]
+
+    def _should_compact(self):
+        size = self._index["size"]
+        return size >= self.min_compaction_bytes and self._index["dead"] * 2 > size
+
+    def _remember(self, lookup, offset, profile):
+        self._cache[lookup] = (offset, profile)
+        self._cache.move_to_end(lookup)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _decrypt(self, token):
+        return json.loads(self.cipher.decrypt(token).decode("utf-8"))
+
+    def _read_token(self, lookup, entry):
+        """Return the token of the line at entry, or None if that line is not lookup's."""
+        offset, length = entry
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                line = f.read(length)
+        except FileNotFoundError:
+            return None
+        prefix = lookup.encode("ascii") + b" "
+        if not line.startswith(prefix) or not line.endswith(b"\n"):
+            return None
+        return line[len(prefix):-1]
+
+    def _sync(self):
+        """Bring the index up to date with the data file, reading only what was appended."""
+        if self._index is None:
+            self._index = self._load_index()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._index["size"]:
+                self._rebuild()
+            return
+        if stat.st_ino != self._index["inode"] or stat.st_size < self._index["size"]:
+            self._rebuild()
+        elif stat.st_size > self._index["size"]:
+            self._scan(self._index["size"])
+
+    def _rebuild(self):
+        logger.info(f"Rebuilding the index of {self.path}.")
+        self._cache.clear()
+        self._index = {"size": 0, "inode": None, "dead": 0, "offsets": {}}
+        try:
+            self._index["inode"] = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        self._scan(0)
+        self._save_index()
+
+    def _scan(self, start):
+        """Index the complete lines from byte start on; a line still being written is left for later."""
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            position = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                lookup, _, token = line.rstrip(b"\n").partition(b" ")
+                lookup = lookup.decode("ascii")
+                previous = self._index["offsets"].get(lookup)
+                if previous is None or previous[0] != position:
+                    self._cache.pop(lookup, None)
+                self._apply(lookup, position, len(line), token == TOMBSTONE)
+                position += len(line)
+        self._index["size"] = position
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            if {"size", "inode", "dead", "offsets"} <= set(index):
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"size": 0, "inode": None, "dead": 0, "offsets": {}}
+
+    def _save_index(self):
+        try:
+            write_atomic(self.index_path, json.dumps(self._index, separators=(",", ":")).encode("utf-8"), fsync=False)
+        except OSError as e:
+            logger.warning(f"Could not save the index of {self.path}: {e}")
+        self._unsaved = 0
@@ -0,0 +1,179 @@
+# database/id_allocator.py
+import json
+import os
+import logging
+import threading
+from database.concurrency import FileLock
+from database.storage import write_atomic
+
+logger = logging.getLogger(__name__)
+
+# First character of allocated short IDs. Legacy short IDs are the first 8
+# characters of a UUID, i.e. lowercase hex, so they can never start with it.
+SHORT_ID_MARKER = "x"
+SHORT_ID_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+SHORT_ID_WIDTH = 7
+
+
+def short_id(number):
+    """Format a sequence number as an 8-character ID, e.g. 46 -> 'x000001a'."""
+    if not 0 < number < len(SHORT_ID_DIGITS) ** SHORT_ID_WIDTH:
+        raise ValueError(f"Sequence number {number} does not fit in a short ID.")
+    digits = []
+    while number:
+        number, digit = divmod(number, len(SHORT_ID_DIGITS))
+        digits.append(SHORT_ID_DIGITS[digit])
+    return SHORT_ID_MARKER + "".join(reversed(digits)).rjust(SHORT_ID_WIDTH, "0")
+
+
+def short_id_number(record_id):
+    """
+    Return the sequence number of a short ID such as 'x000001a', or None for other IDs.
+
+    Callers may store short IDs behind a prefix of their own (attendance uses
+    'A' + short ID), so only the last SHORT_ID_WIDTH + 1 characters are read.
+    """
+    text = str(record_id)[-(SHORT_ID_WIDTH + 1):]
+    if len(text) != SHORT_ID_WIDTH + 1 or not text.startswith(SHORT_ID_MARKER):
+        return None
+    number = 0
+    for digit in text[1:]:
+        value = SHORT_ID_DIGITS.find(digit)
+        if value < 0:
+            return None
+        number = number * len(SHORT_ID_DIGITS) + value
+    return number
+
+
+def counter_of(record_id, prefix):
+    """Return the number of a '<prefix><n>' ID such as 'P12', or None for other IDs."""
+    text = str(record_id)
+    if text.startswith(prefix) and text[len(prefix):].isdigit():
+        return int(text[len(prefix):])
+    return None
+
+
+class IdAllocator:
+    """
+    Hands out record IDs from a persisted sequence per collection.
+
+    Each collection's last reserved number is kept in <file>.ids.json next to
+    its data file. A process reserves a block of ``block_size`` numbers at a
+    time under an exclusive lock on that file, then serves IDs from the block
+    in memory, so an insert neither scans the existing records nor touches
+    the disk most of the time, and processes sharing the data never hand out
+    the same number. Numbers left in a block when a process exits are never
+    used, so sequences can have gaps.
+
+    Sources with an "id_prefix" (payments: "P") get '<prefix><n>' IDs. Every
+    other source gets 8-character IDs starting with SHORT_ID_MARKER, which
+    cannot collide with the 8-character UUID prefixes issued before. Either
+    way, a sequence whose file is missing (first use, fresh checkout, restored
+    backup) starts after the highest number already in the data, found with
+    one scan.
+    """
+
+    # Numbers reserved from a sequence file at a time.
+    block_size = 64
+
+    _blocks = {}
+    _pid = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def state_path(source):
+        return os.path.splitext(source["file"])[0] + ".ids.json"
+
+    @staticmethod
+    def next_ids(source_name, count=1, existing=None):
+        """
+        Return count new IDs for a source.
+
+        :param source_name: Name of the data source (see DataLoader.data_sources).
+        :param count: Number of IDs to allocate; large counts are reserved as one block.
+        :param existing: Optional records of the source, used instead of reading
+                         them when a prefixed sequence is used for the first time.
+        :return: List of new unique string IDs, in allocation order.
+        """
+        from database.data_loader import DataLoader
+
+        source = DataLoader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        prefix = source.get("id_prefix")
+
+        def seed():
+            records = DataLoader.iter_data(source_name) if existing is None else existing
+            if prefix is None:
+                numbers = (short_id_number(record.get(source["key"])) for record in records)
+            else:
+                numbers = (counter_of(record.get(source["key"]), prefix) for record in records)
+            return max((number for number in numbers if number is not None), default=0)
+
+        numbers = IdAllocator.next_numbers(IdAllocator.state_path(source), count, seed)
+        if prefix is None:
+            return [short_id(number) for number in numbers]
+        return [f"{prefix}{number}" for number in numbers]
+
+    @staticmethod
+    def prefix_of(source_name):
+        """Return the "id_prefix" of a source, or None if it uses short IDs."""
+        from database.data_loader import DataLoader
+
+        return DataLoader.data_sources.get(source_name, {}).get("id_prefix")
+
+    @staticmethod
+    def source_for_key(key):
+        """Return the name of the first data source whose primary key is key, or None."""
+        from database.data_loader import DataLoader
+
+        return next((name for name, source in DataLoader.data_sources.items() if source.get("key") == key), None)
+
+    @staticmethod
+    def next_numbers(path, count, seed=None):
+        """
+        Return count unused numbers of the sequence stored at path.
+
+        :param seed: Callable returning the last number already in use, called
+                     only when the sequence file does not exist yet.
+        """
+        with IdAllocator._lock:
+            if IdAllocator._pid != os.getpid():
+                # Blocks inherited from a parent process are the parent's to use.
+                IdAllocator._blocks = {}
+                IdAllocator._pid = os.getpid()
+            numbers = []
+            block = IdAllocator._blocks.get(path)
+            while len(numbers) < count:
+                if block is None or block[0] >= block[1]:
+                    size = max(IdAllocator.block_size, count - len(numbers))
+                    first = IdAllocator.reserve(path, size, seed)
+                    block = IdAllocator._blocks[path] = [first, first + size]
+                taken = min(block[1] - block[0], count - len(numbers))
+                numbers.extend(range(block[0], block[0] + taken))
+                block[0] += taken
+            return numbers
+
+    @staticmethod
+    def reserve(path, size, seed=None):
+        """
+        Reserve size numbers in the sequence file and return the first one.
+
+        The exclusive lock makes reservations by concurrent processes disjoint.
+        """
+        with FileLock.for_path(path + ".lock").exclusive():
+            try:
+                with open(path, "r") as f:
+                    last = json.load(f)["last"]
+            except FileNotFoundError:
+                last = seed() if seed else 0
+                logger.info(f"Starting ID sequence {path} after {last}.")
+            write_atomic(path, json.dumps({"last": last + size}).encode("utf-8"))
+        return last + 1
+
+    @staticmethod
+    def reset():
+        """Forget the blocks reserved by this process (their numbers stay unused)."""
+        with IdAllocator._lock:
+            IdAllocator._blocks = {}
@@ -0,0 +1,267 @@
+# database/keyed_collection.py
+import copy
+import marshal
+
+
+def copy_record(record):
+    """Return an independent copy of a JSON-style record."""
+    return marshal.loads(marshal.dumps(record))
+
+
+class KeyedCollection:
+    """
+    The records of one data source with a dictionary index on its primary key.
+
+    Point lookups by key are O(1). Secondary (multi-valued) indexes can be
+    declared on foreign-key fields so ``find`` and ``count`` only visit the
+    matching records. An index may also be declared on a tuple of fields
+    (e.g. ``("class_id", "day", "time")``); ``count_indexed`` then returns the
+    number of records sharing those values in O(1). All indexes are maintained incrementally by ``insert``,
+    ``update`` and ``delete``; persist the result with
+    ``DataLoader.save_collection``. Records handed out by ``get`` and ``find``
+    are copies, so callers can change them without touching the collection.
+    ``view`` returns a collection sharing the records and indexes; the first
+    change to either side copies them (copy-on-write), so a shared, cached
+    collection is never changed through a view.
+    """
+
+    def __init__(self, source_name, key, records, indexes=()):
+        if not key:
+            raise ValueError(f"Data source '{source_name}' has no primary key configured.")
+        self.source_name = source_name
+        self.key = key
+        self._records = {}
+        self._index = {}
+        self._duplicates = set()
+        self._secondary = {field: {} for field in indexes if field != key}
+        self._next_slot = 0
+        self._shared = False
+        for record in records:
+            self._append(record)
+
+    def view(self):
+        """Return a copy-on-write view of this collection, in O(1)."""
+        view = copy.copy(self)
+        view._shared = self._shared = True
+        return view
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key_value):
+        return key_value in self._index
+
+    def __iter__(self):
+        """Iterate over the stored records (treat them as read-only)."""
+        return iter(self._records.values())
+
+    def keys(self):
+        return list(self._index)
+
+    def get(self, key_value, default=None):
+        """Return a copy of the record with the given primary key, or default."""
+        slot = self._index.get(key_value)
+        if slot is None:
+            return default
+        return copy_record(self._records[slot])
+
+    def add_index(self, field):
+        """Declare a secondary index on field and build it from the current records."""
+        if field == self.key or field in self._secondary:
+            return
+        self._own()
+        self._secondary[field] = {}
+        for slot, record in self._records.items():
+            self._index_field(field, slot, record)
+
+    def indexed_fields(self):
+        return [self.key] + list(self._secondary)
+
+    def find(self, **criteria):
+        """
+        Return copies of the records whose fields equal all the given values.
+
+        The most selective indexed criterion narrows the candidates; remaining
+        criteria are checked on those records only. Without any indexed
+        criterion this falls back to a scan.
+        """
+        return [copy_record(record) for record in self._matches(criteria)]
+
+    def select(self, criteria, predicate=None):
+        """
+        Return copies of the records matching criteria for which predicate (if any) is true.
+
+        Like find, but the predicate is applied before records are copied, so
+        a selective predicate over a scan copies only the records it keeps.
+        """
+        return [
+            copy_record(record) for record in self._matches(criteria)
+            if predicate is None or predicate(record)
+        ]
+
+    def index_for(self, criteria):
+        """Return the indexed field find would use for criteria, or None for a scan."""
+        return self._best_index(criteria)[0]
+
+    def count(self, **criteria):
+        """Return how many records match the criteria, without copying them."""
+        return sum(1 for _ in self._matches(criteria))
+
+    def count_indexed(self, field, value):
+        """
+        Return the number of records whose indexed field (or tuple of fields) equals value.
+
+        The size of the index bucket is kept up to date by every insert, update
+        and delete, so this is O(1).
+        """
+        try:
+            return len(self._secondary[field].get(value, ()))
+        except TypeError:
+            return 0
+
+    def records(self):
+        """Return copies of all records, in stored order."""
+        return copy_record(list(self._records.values()))
+
+    def insert(self, record):
+        """Add a new record; its primary key must not already exist."""
+        key_value = record.get(self.key)
+        if key_value is None:
+            raise ValueError(f"Record is missing primary key '{self.key}'.")
+        if key_value in self._index:
+            raise ValueError(f"Duplicate {self.key} '{key_value}' in {self.source_name}.")
+        self._own()
+        self._append(copy_record(record))
+
+    def update(self, key_value, changes):
+        """Apply a dictionary of field changes to the record with the given primary key."""
+        slot = self._index.get(key_value)
+        if slot is None:
+            raise ValueError(f"{self.key} '{key_value}' not found in {self.source_name}.")
+        self._own()
+        # Replaced rather than changed in place: views made earlier may still hold the old record.
+        record = self._records[slot] = dict(self._records[slot])
+        new_key = changes.get(self.key, key_value)
+        if new_key != key_value:
+            if new_key in self._index:
+                raise ValueError(f"Duplicate {self.key} '{new_key}' in {self.source_name}.")
+            self._unindex(key_value, slot)
+            self._index[new_key] = slot
+        changed = [field for field in self._secondary if _touches(field, changes)]
+        for field in changed:
+            self._unindex_field(field, slot, record)
+        record.update(copy_record(changes))
+        for field in changed:
+            self._index_field(field, slot, record)
+
+    def delete(self, key_value):
+        """Remove the record with the given primary key; returns True if it existed."""
+        slot = self._index.get(key_value)
+        if slot is None:
+            return False
+        self._own()
+        for field in self._secondary:
+            self._unindex_field(field, slot, self._records[slot])
+        del self._records[slot]
+        self._unindex(key_value, slot)
+        return True
+
+    def _own(self):
+        """Copy the record map and indexes shared with other views before changing them."""
+        if not self._shared:
+            return
+        self._records = dict(self._records)
+        self._index = dict(self._index)
+        self._duplicates = set(self._duplicates)
+        self._secondary = {
+            field: {value: dict(bucket) for value, bucket in buckets.items()}
+            for field, buckets in self._secondary.items()
+        }
+        self._shared = False
+
+    def _best_index(self, criteria):
+        """Return (field, slots) of the most selective indexed criterion, or (None, None)."""
+        best, candidates = None, None
+        for field, value in criteria.items():
+            try:
+                if field == self.key and value not in self._duplicates:
+                    slot = self._index.get(value)
+                    bucket = {slot: None} if slot is not None else {}
+                elif field in self._secondary:
+                    bucket = self._secondary[field].get(value, {})
+                else:
+                    continue
+            except TypeError:
+                continue  # an unhashable value cannot be looked up
+            if candidates is None or len(bucket) < len(candidates):
+                best, candidates = field, bucket
+        return best, candidates
+
+    def _matches(self, criteria):
+        """Yield the stored records matching criteria, in stored order."""
+        candidates = self._best_index(criteria)[1]
+        slots = sorted(candidates) if candidates is not None else self._records
+        for slot in slots:
+            record = self._records[slot]
+            if all(record.get(field) == value for field, value in criteria.items()):
+                yield record
+
+    def _append(self, record):
+        slot = self._next_slot
+        self._next_slot += 1
+        self._records[slot] = record
+        for field in self._secondary:
+            self._index_field(field, slot, record)
+        key_value = record.get(self.key) if isinstance(record, dict) else None
+        if key_value is None:
+            return
+        if key_value in self._index:
+            # Keep the first occurrence indexed, matching the old next(...) scans.
+            self._duplicates.add(key_value)
+        else:
+            self._index[key_value] = slot
+
+    def _unindex(self, key_value, slot):
+        if self._index.get(key_value) == slot:
+            del self._index[key_value]
+        if key_value in self._duplicates:
+            # Re-point the key at the next record sharing it, if any remains.
+            remaining = [s for s, r in self._records.items() if r.get(self.key) == key_value and s != slot]
+            if remaining:
+                self._index[key_value] = remaining[0]
+            if len(remaining) <= 1:
+                self._duplicates.discard(key_value)
+
+    def _index_field(self, field, slot, record):
+        value = _field_value(field, record)
+        try:
+            self._secondary[field].setdefault(value, {})[slot] = None
+        except TypeError:
+            # Unhashable values (lists, dicts) cannot equal a scalar lookup; leave them out.
+            pass
+
+    def _unindex_field(self, field, slot, record):
+        value = _field_value(field, record)
+        try:
+            bucket = self._secondary[field].get(value)
+        except TypeError:
+            return
+        if bucket is not None:
+            bucket.pop(slot, None)
+            if not bucket:
+                del self._secondary[field][value]
+
+
+def _field_value(field, record):
+    """Value of an indexed field, or the tuple of values of a composite index."""
+    if not isinstance(record, dict):
+        return None
+    if isinstance(field, tuple):
+        return tuple(record.get(name) for name in field)
+    return record.get(field)
+
+
+def _touches(field, changes):
+    if isinstance(field, tuple):
+        return any(name in changes for name in field)
+    return field in changes
@@ -0,0 +1,245 @@
+# database/mmap_storage.py
+import argparse
+import json
+import mmap
+import os
+import logging
+import threading
+from database.storage import JsonLinesStorage, JsonStorage, atomic_replace, file_signature, write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class MmapJsonLinesStorage(JsonLinesStorage):
+    """
+    JSON-Lines collection read through a memory map, with a sidecar offset index.
+
+    Next to the data file, <file>.idx maps every primary key, and every value
+    of the source's "indexes" fields, to the byte offsets of the matching
+    lines. Point lookups (``get``) and filtered reads (``query``) seek straight
+    to those lines, so their cost depends on the number of matches rather than
+    on the size of the file, and the mapped pages are shared with every other
+    process reading the same file through the OS page cache.
+
+    The index records the signature of the data file it describes and is
+    rebuilt with one scan whenever it is missing or stale.
+    """
+
+    def __init__(self, fsync=True, fsync_directory=False):
+        super().__init__(fsync, fsync_directory)
+        self._maps = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def index_path(source):
+        return source.get("index_file") or source["file"] + ".idx"
+
+    def write(self, source_name, source, data):
+        """Rewrite the data file and its offset index."""
+        lines = [json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n" for record in data]
+        offsets = []
+        position = 0
+        for line in lines:
+            offsets.append(position)
+            position += len(line)
+        with atomic_replace(source["file"], self.fsync, self.fsync_directory) as temp_path:
+            with open(temp_path, "wb") as f:
+                f.writelines(lines)
+
+        index = self._build_index(source, zip(offsets, data))
+        index["signature"] = file_signature(source["file"])
+        self._save_index(source, index)
+        with self._lock:
+            self._indexes[source["file"]] = index
+            self._maps.pop(source["file"], None)
+
+    def get(self, source_name, source, key_value):
+        """Return the record with the given primary key, or None."""
+        index = self._load_index(source_name, source)
+        offset = index["offsets"].get(key_value)
+        if offset is None:
+            return None
+        return self._record_at(source, offset)
+
+    def query(self, source_name, source, criteria):
+        """
+        Return records whose fields equal the given values, in file order.
+
+        The most selective criterion on the primary key or an indexed field
+        picks the lines to decode; without one, the file is scanned.
+        """
+        index = self._load_index(source_name, source)
+        candidates = None
+        for field, value in criteria.items():
+            try:
+                if field == index["key"]:
+                    offset = index["offsets"].get(value)
+                    found = [offset] if offset is not None else []
+                elif field in index["fields"]:
+                    found = index["fields"][field].get(value, [])
+                else:
+                    continue
+            except TypeError:
+                # Unhashable criterion values never match an indexed scalar.
+                return []
+            if candidates is None or len(found) < len(candidates):
+                candidates = found
+
+        if candidates is None:
+            records = self.iter(source_name, source)
+        else:
+            records = (self._record_at(source, offset) for offset in sorted(candidates))
+        return [
+            record for record in records
+            if all(record.get(field) == value for field, value in criteria.items())
+        ]
+
+    def _record_at(self, source, offset):
+        mapped = self._map(source)
+        end = mapped.find(b"\n", offset)
+        return json.loads(mapped[offset:end if end != -1 else len(mapped)])
+
+    def _map(self, source):
+        path = source["file"]
+        signature = file_signature(path)
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+        if not signature or not signature[1]:
+            mapped = b""  # mmap cannot map an empty file
+        else:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            self._maps[path] = (signature, mapped)
+        return mapped
+
+    def _load_index(self, source_name, source):
+        """Return the offset index for the current data file, rebuilding it if stale."""
+        path = source["file"]
+        if not os.path.exists(path):
+            self.initialize(source)
+        signature = file_signature(path)
+        with self._lock:
+            index = self._indexes.get(path)
+        if index and index["signature"] == signature and set(index["fields"]) == set(self._fields(source)):
+            return index
+
+        index = self._read_index(source, signature)
+        if index is None:
+            logger.info(f"Rebuilding offset index for {source_name}.")
+            index = self._build_index(source, self._scan(source))
+            index["signature"] = signature
+            self._save_index(source, index)
+        with self._lock:
+            self._indexes[path] = index
+        return index
+
+    def _scan(self, source):
+        """Yield (offset, record) for every line of the data file."""
+        mapped = self._map(source)
+        offset = 0
+        while offset < len(mapped):
+            end = mapped.find(b"\n", offset)
+            if end == -1:
+                end = len(mapped)
+            line = mapped[offset:end]
+            if line.strip():
+                yield offset, json.loads(line)
+            offset = end + 1
+
+    @staticmethod
+    def _fields(source):
+        """Secondary fields indexed for a source (its "indexes" minus the primary key and composites)."""
+        return [
+            field for field in source.get("indexes", [])
+            if field != source.get("key") and isinstance(field, str)
+        ]
+
+    @staticmethod
+    def _build_index(source, entries):
+        key = source.get("key")
+        fields = MmapJsonLinesStorage._fields(source)
+        offsets = {}
+        postings = {field: {} for field in fields}
+        for offset, record in entries:
+            if key:
+                offsets.setdefault(record.get(key), offset)
+            for field in fields:
+                try:
+                    postings[field].setdefault(record.get(field), []).append(offset)
+                except TypeError:
+                    pass
+        return {"key": key, "offsets": offsets, "fields": postings}
+
+    def _read_index(self, source, signature):
+        """Load the sidecar index if it describes the current data file."""
+        try:
+            with open(self.index_path(source), "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if tuple(stored.get("signature") or ()) != tuple(signature or ()):
+            return None
+        if set(stored.get("fields", {})) != set(self._fields(source)):
+            return None
+        return {
+            "key": stored["key"],
+            "offsets": {key_value: offset for key_value, offset in stored["offsets"]},
+            "fields": {
+                field: {value: offsets for value, offsets in postings}
+                for field, postings in stored["fields"].items()
+            },
+            "signature": signature,
+        }
+
+    def _save_index(self, source, index):
+        # JSON objects only take string keys, so the maps are stored as pairs.
+        stored = {
+            "signature": index["signature"],
+            "key": index["key"],
+            "offsets": list(index["offsets"].items()),
+            "fields": {field: list(postings.items()) for field, postings in index["fields"].items()},
+        }
+        try:
+            write_atomic(self.index_path(source), json.dumps(stored, separators=(",", ":")).encode("utf-8"),
+                         self.fsync, self.fsync_directory)
+        except OSError as e:
+            # The index is derived data; it will be rebuilt on the next read.
+            logger.warning(f"Could not save offset index {self.index_path(source)}: {e}")
+
+
+def migrate_to_mmap(source_names, target_dir=None):
+    """
+    Copy JSON collections into memory-mapped JSON-Lines files with offset indexes.
+
+    :param source_names: Sources to convert (e.g. ["attendance", "payments", "appointments"]).
+    :param target_dir: Directory for the .jsonl files (defaults to each source's directory).
+    :return: Dictionary of source name -> path of the new data file.
+    """
+    from database.data_loader import DataLoader
+
+    json_storage = JsonStorage()
+    mmap_storage = MmapJsonLinesStorage()
+    migrated = {}
+    for source_name in source_names:
+        source = DataLoader.data_sources[source_name]
+        directory = target_dir or os.path.dirname(source["file"])
+        target = dict(source, file=os.path.join(directory, f"{source_name}.jsonl"), type="mmap")
+        data = json_storage.read(source_name, source)
+        mmap_storage.write(source_name, target, data)
+        migrated[source_name] = target["file"]
+        logger.info(f"Wrote {len(data)} {source_name} records to {target['file']}.")
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert JSON collections to memory-mapped JSON-Lines.")
+    parser.add_argument("sources", nargs="+", help="Sources to convert, e.g. attendance payments appointments")
+    parser.add_argument("--target-dir", help="Directory for the .jsonl files (default: alongside the JSON files)")
+    args = parser.parse_args()
+    for name, path in migrate_to_mmap(args.sources, args.target_dir).items():
+        print(f"{name}: {path}")
+    print('Point the entries in DataLoader.data_sources at these files with "type": "mmap" to use them.')
@@ -0,0 +1,397 @@
+# database/partitioned_storage.py
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from database.serialization import get_codec, paused_gc
+from database.storage import JsonStorage, file_signature, write_atomic
+
+logger = logging.getLogger(__name__)
+
+_MONTH = re.compile(r"^\d{4}-\d{2}")
+
+# Partition holding records whose date field is missing or not an ISO date.
+UNDATED = "undated"
+
+
+def partition_of(value):
+    """Return the partition name ("YYYY-MM", or UNDATED) for a date field value."""
+    text = str(value) if value is not None else ""
+    return text[:7] if _MONTH.match(text) else UNDATED
+
+
+class PartitionedStorage(JsonStorage):
+    """
+    Stores a collection as one array file per calendar month plus a manifest.
+
+    Records are partitioned on the source's "partition_by" date field into
+    <dir>/<YYYY-MM>.json (records without a usable date go to undated.json),
+    where <dir> is the source's "partition_dir" or its file path without the
+    extension. <dir>/manifest.json lists the partitions with their record
+    count and a digest of their contents.
+
+    Saves still receive the whole collection, but only partitions whose
+    digest changed are rewritten, so adding today's payment touches this
+    month's file and the manifest. The records of each partition as last
+    read or written are kept in memory (like JournalStorage's state), and a
+    partition whose records still compare equal keeps its digest without
+    being encoded again. ``read_period`` opens only the partitions
+    that overlap a date range, so its cost follows the size of the range, not
+    of the history. Reads return records grouped by month, oldest first.
+
+    Each partition file and the manifest are replaced atomically, but a save
+    that changes several months is not atomic as a whole. If the manifest is
+    lost, it is rebuilt from the partition files.
+
+    A source that still has its old single file and no manifest keeps being
+    read and written as that file, in its own order, until it is split with
+    ``migrate`` (``python -m database.partitioned_storage``). The split renames
+    the old file to <file>.imported, so it is never imported again; from then
+    on records come back grouped by month rather than in insertion order.
+    """
+
+    def __init__(self, fsync=True, fsync_directory=False, cached_partitions=12):
+        """
+        :param cached_partitions: Number of recently read partitions kept in memory for read_period.
+        """
+        super().__init__(fsync, fsync_directory)
+        self.cached_partitions = cached_partitions
+        self._manifests = {}
+        self._partitions = OrderedDict()
+        self._known = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def partition_dir(source):
+        return source.get("partition_dir") or os.path.splitext(source["file"])[0]
+
+    @staticmethod
+    def manifest_path(source):
+        return os.path.join(PartitionedStorage.partition_dir(source), "manifest.json")
+
+    @staticmethod
+    def partition_path(source, name):
+        return os.path.join(PartitionedStorage.partition_dir(source), f"{name}.json")
+
+    def initialize(self, source):
+        """Create an empty manifest for the source."""
+        self._save_manifest(source, {"partitions": {}})
+        logger.info(f"Initialized partitioned storage in {self.partition_dir(source)}")
+
+    def signature(self, source):
+        if self._unsplit(source):
+            return file_signature(source["file"])
+        # Every save rewrites the manifest, so it stands for the whole collection.
+        return file_signature(self.manifest_path(source))
+
+    def read(self, source_name, source):
+        """Load every partition, oldest month first."""
+        if self._unsplit(source):
+            return JsonStorage.read(self, source_name, source)
+        manifest = self._manifest(source_name, source)
+        signature = self.signature(source)
+        records = []
+        groups = {}
+        for name in sorted(manifest["partitions"]):
+            partition = self._read_partition(source_name, source, name)
+            groups[name] = partition
+            records.extend(partition)
+        if self.signature(source) == signature:
+            self._remember(source, signature, groups)
+        return records
+
+    def iter(self, source_name, source):
+        """Yield the records one partition at a time."""
+        if self._unsplit(source):
+            yield from JsonStorage.iter(self, source_name, source)
+            return
+        for name in sorted(self._manifest(source_name, source)["partitions"]):
+            yield from self._read_partition(source_name, source, name)
+
+    def read_period(self, source_name, source, first, last):
+        """
+        Return the records whose date field lies between first and last (ISO dates, inclusive).
+
+        Only the monthly partitions overlapping the range are opened; recently
+        used ones are served from memory while their file is unchanged.
+        """
+        field = source["partition_by"]
+        if self._unsplit(source):
+            return list(self._in_period(JsonStorage.iter(self, source_name, source), field, first, last))
+        records = []
+        for name in sorted(self._manifest(source_name, source)["partitions"]):
+            if name == UNDATED or not first[:7] <= name <= last[:7]:
+                continue
+            for record in self._cached_partition(source_name, source, name):
+                value = record.get(field)
+                if value is not None and first <= str(value)[:10] <= last:
+                    records.append(record)
+        return records
+
+    def iter_period(self, source_name, source, first, last):
+        """
+        Yield the records of read_period one partition at a time.
+
+        Partitions are read straight from disk and not kept in the read_period
+        cache, so scanning a long range holds at most one month in memory.
+        """
+        field = source["partition_by"]
+        if self._unsplit(source):
+            yield from self._in_period(JsonStorage.iter(self, source_name, source), field, first, last)
+            return
+        for name in sorted(self._manifest(source_name, source)["partitions"]):
+            if name == UNDATED or not first[:7] <= name <= last[:7]:
+                continue
+            yield from self._in_period(self._read_partition(source_name, source, name), field, first, last)
+
+    @staticmethod
+    def _in_period(records, field, first, last):
+        for record in records:
+            value = record.get(field)
+            if value is not None and first <= str(value)[:10] <= last:
+                yield record
+
+    def write(self, source_name, source, data):
+        """Rewrite the partitions whose records changed, then the manifest."""
+        if self._unsplit(source):
+            JsonStorage.write(self, source_name, source, data)
+            return
+        self._write_partitions(source_name, source, data)
+
+    def migrate(self, source_name, source):
+        """
+        Split a source's old single file into monthly partitions.
+
+        The file is renamed to <file>.imported once the partitions and the
+        manifest are saved. Records are grouped by month from then on, so
+        reads no longer return them in the file's order.
+
+        :return: Number of records moved, or None if the source has no single file left to split.
+        """
+        if not os.path.exists(source["file"]):
+            return None
+        with self._lock:
+            if self._unsplit(source):
+                data = JsonStorage.read(self, source_name, source)
+                self._write_partitions(source_name, source, data)
+            else:
+                # Split by an earlier run that stopped before the rename.
+                data = self.read(source_name, source)
+            # Renamed so a lost manifest can never bring back this old copy of the data.
+            os.replace(source["file"], source["file"] + ".imported")
+        logger.info(
+            f"Split {len(data)} {source_name} records from {source['file']} into monthly partitions; "
+            f"the old file is now {source['file']}.imported."
+        )
+        return len(data)
+
+    def _write_partitions(self, source_name, source, data):
+        field = source["partition_by"]
+        codec = self.codec(source)
+        groups = {}
+        for record in data:
+            groups.setdefault(partition_of(record.get(field)), []).append(record)
+
+        with self._lock:
+            manifest = self._manifest(source_name, source, create=False)
+            previous = manifest["partitions"]
+            known = self._known_groups(source, codec.name)
+            partitions = {}
+            written = []
+            changed = {}
+            for name, records in groups.items():
+                entry = previous.get(name)
+                if entry is not None and known.get(name) == records:
+                    # Same records as last read or written: no need to encode them for a digest.
+                    partitions[name] = entry
+                    continue
+                digest = self._digest(codec.name, records)
+                if entry is None or entry["digest"] != digest or not os.path.exists(self.partition_path(source, name)):
+                    write_atomic(self.partition_path(source, name), codec.dumps(records),
+                                 self.fsync, self.fsync_directory)
+                    written.append(name)
+                partitions[name] = {"records": len(records), "digest": digest}
+                changed[name] = records
+
+            self._save_manifest(source, {"partitions": partitions})
+            for name in set(previous) - set(partitions):
+                path = self.partition_path(source, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._remember(source, self.signature(source), changed, codec.name,
+                           {name: known[name] for name in partitions if name not in changed})
+        logger.debug(f"Saved {source_name}: rewrote partitions {sorted(written)} of {len(partitions)}.")
+
+    def _remember(self, source, signature, groups, codec_name=None, unchanged=None):
+        """
+        Keep independent copies of each partition's records as of the manifest signature.
+
+        :param unchanged: Partitions already remembered, kept as they are rather than copied again.
+        """
+        try:
+            groups = marshal.loads(marshal.dumps(groups))
+        except ValueError:
+            # Values marshal cannot copy; later saves digest every partition.
+            with self._lock:
+                self._known.pop(self.manifest_path(source), None)
+            return
+        groups.update(unchanged or {})
+        with self._lock:
+            self._known[self.manifest_path(source)] = {
+                "signature": signature,
+                "codec": codec_name or self.codec(source).name,
+                "groups": groups,
+            }
+
+    def _known_groups(self, source, codec_name):
+        """Return the remembered partitions if they still describe the files on disk, else {}."""
+        known = self._known.get(self.manifest_path(source))
+        if not known or known["codec"] != codec_name or known["signature"] != self.signature(source):
+            return {}
+        return known["groups"]
+
+    def _unsplit(self, source):
+        """True while the source is still an old single file that migrate has not split."""
+        return not os.path.exists(self.manifest_path(source)) and os.path.exists(source["file"])
+
+    def _manifest(self, source_name, source, create=True):
+        """Return the parsed manifest, rebuilding a lost one or starting an empty one."""
+        path = self.manifest_path(source)
+        signature = file_signature(path)
+        if signature is None:
+            if not create:
+                return {"partitions": {}}
+            if not self._rebuild_manifest(source_name, source):
+                self.initialize(source)
+            signature = file_signature(path)
+
+        with self._lock:
+            cached = self._manifests.get(path)
+            if cached and cached[0] == signature:
+                return cached[1]
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        with self._lock:
+            self._manifests[path] = (signature, manifest)
+        return manifest
+
+    def _rebuild_manifest(self, source_name, source):
+        """Recreate a missing manifest from the partition files; returns False if there are none."""
+        directory = self.partition_dir(source)
+        names = []
+        if os.path.isdir(directory):
+            names = sorted(
+                entry[:-len(".json")] for entry in os.listdir(directory)
+                if entry.endswith(".json") and entry != "manifest.json"
+                and (entry == f"{UNDATED}.json" or _MONTH.match(entry))
+            )
+        if not names:
+            return False
+        codec = self.codec(source)
+        partitions = {}
+        for name in names:
+            records = self._read_partition(source_name, source, name)
+            partitions[name] = {"records": len(records), "digest": self._digest(codec.name, records)}
+        self._save_manifest(source, {"partitions": partitions})
+        logger.warning(f"Rebuilt the missing manifest of {source_name} from {len(names)} partition files.")
+        return True
+
+    def _save_manifest(self, source, manifest):
+        os.makedirs(self.partition_dir(source), exist_ok=True)
+        write_atomic(self.manifest_path(source), json.dumps(manifest, indent=4).encode("utf-8"),
+                     self.fsync, self.fsync_directory)
+
+    def _read_partition(self, source_name, source, name):
+        path = self.partition_path(source, name)
+        codec = self.codec(source)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            with paused_gc():
+                return codec.loads(payload)
+        except FileNotFoundError:
+            logger.error(f"Partition {name} of {source_name} is missing from {path}.")
+            return []
+        except codec.decode_errors:
+            # Keep the damaged file for recovery; the next save rewrites the partition.
+            os.replace(path, path + ".corrupt")
+            logger.error(f"Partition {name} of {source_name} is malformed; moved it to {path}.corrupt.")
+            return []
+
+    def _cached_partition(self, source_name, source, name):
+        path = self.partition_path(source, name)
+        signature = file_signature(path)
+        with self._lock:
+            cached = self._partitions.get(path)
+            if cached and cached[0] == signature:
+                self._partitions.move_to_end(path)
+                return marshal.loads(cached[1])
+
+        records = self._read_partition(source_name, source, name)
+        try:
+            snapshot = marshal.dumps(records)
+        except ValueError:
+            return records
+        with self._lock:
+            self._partitions[path] = (signature, snapshot)
+            self._partitions.move_to_end(path)
+            while len(self._partitions) > self.cached_partitions:
+                self._partitions.popitem(last=False)
+        return records
+
+    @staticmethod
+    def _digest(codec_name, records):
+        """Fingerprint of a partition's records (and encoding), used to skip unchanged files."""
+        # Compact JSON rather than marshal: marshal's output depends on string
+        # interning, so equal records read by different paths would differ.
+        payload = get_codec("fast").dumps(records)
+        return hashlib.blake2b(codec_name.encode("utf-8") + b"\0" + payload, digest_size=16).hexdigest()
+
+
+def migrate_single_files(source_names=None):
+    """
+    Split the old single files of partitioned sources into monthly partitions.
+
+    :param source_names: Sources to split (defaults to every partitioned source).
+    :return: Dictionary of source name -> number of records moved, for the sources that had a file to split.
+    """
+    from database.data_loader import DataLoader
+
+    unknown = sorted(set(source_names or ()) - set(DataLoader.data_sources))
+    if unknown:
+        logger.error(f"Unknown data sources: {', '.join(unknown)}.")
+        raise ValueError(f"Unknown data sources: {', '.join(unknown)}.")
+
+    migrated = {}
+    for source_name, source in DataLoader.data_sources.items():
+        if source_names and source_name not in source_names:
+            continue
+        if source["type"] != "partitioned":
+            if source_names:
+                logger.error(f"{source_name} is not a partitioned source.")
+                raise ValueError(f"{source_name} is not a partitioned source.")
+            continue
+        storage = DataLoader._get_storage(source_name, source)
+        with DataLoader._lock(source, exclusive=True):
+            count = storage.migrate(source_name, source)
+        DataLoader.clear_cache(source_name)
+        if count is not None:
+            migrated[source_name] = count
+    return migrated
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Split partitioned sources stored as one file into monthly partitions.")
+    parser.add_argument("sources", nargs="*", help="Sources to split (default: every partitioned source)")
+    args = parser.parse_args()
+    migrated = migrate_single_files(args.sources or None)
+    for name, count in migrated.items():
+        print(f"{name}: {count} records split into monthly partitions")
+    if not migrated:
+        print("Nothing to split.")
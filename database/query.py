@@ -0,0 +1,130 @@
+# database/query.py
+import logging
+import operator
+
+logger = logging.getLogger(__name__)
+
+
+def _compare(function):
+    def compare(value, operand):
+        if value is None:
+            return False
+        try:
+            return function(value, operand)
+        except TypeError:
+            return False  # e.g. a number compared with a string never matches
+    return compare
+
+
+def _lower(value):
+    return str(value).lower()
+
+
+# Operators a where condition can use, as field: (operator, operand).
+# A plain value means equality. "between" takes both bounds: ("between", low, high).
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": _compare(operator.lt),
+    "<=": _compare(operator.le),
+    ">": _compare(operator.gt),
+    ">=": _compare(operator.ge),
+    "in": lambda value, operand: value in operand,
+    "between": _compare(lambda value, operand: operand[0] <= value <= operand[1]),
+    "iequals": lambda value, operand: value is not None and _lower(value) == _lower(operand),
+    "icontains": lambda value, operand: value is not None and _lower(operand) in _lower(value),
+}
+
+# Operators that bound a date field, and so the partitions a query reads
+_LOWER_BOUNDS = ("==", ">", ">=")
+_UPPER_BOUNDS = ("==", "<", "<=")
+
+
+def _plain(value):
+    """Dates and datetimes compare as their ISO text, the way records store them."""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def parse_where(where):
+    """
+    Turn a where dictionary into a list of (field, operator, operand) conditions.
+
+    :param where: {field: value} for equality, or {field: (operator, operand)}
+                  with an operator from OPERATORS, e.g.
+                  {"gym_id": "G1", "date": ("between", "2024-07-01", "2024-09-30")}.
+    """
+    conditions = []
+    for field, condition in (where or {}).items():
+        if isinstance(condition, tuple) and condition and isinstance(condition[0], str) and condition[0] in OPERATORS:
+            op = condition[0]
+            if op == "between":
+                if len(condition) != 3:
+                    raise ValueError(f"'between' on '{field}' needs a low and a high bound.")
+                operand = (_plain(condition[1]), _plain(condition[2]))
+            else:
+                if len(condition) != 2:
+                    raise ValueError(f"Operator '{op}' on '{field}' takes one operand.")
+                operand = condition[1]
+                operand = [_plain(item) for item in operand] if op == "in" else _plain(operand)
+        else:
+            op, operand = "==", _plain(condition)
+        conditions.append((field, op, operand))
+    return conditions
+
+
+def equalities(conditions):
+    """Return the equality conditions as {field: value}, the part indexes and engines can use."""
+    return {field: operand for field, op, operand in conditions if op == "=="}
+
+
+def matches(record, conditions):
+    """Return True if the record satisfies every condition."""
+    return all(OPERATORS[op](record.get(field), operand) for field, op, operand in conditions)
+
+
+def date_range(conditions, field):
+    """
+    Return the (first, last) ISO dates the conditions allow on a date field, or
+    None if they do not bound it. Missing bounds are open ("" and "9999-12-31").
+    """
+    first, last, bounded = "", "9999-12-31", False
+    for name, op, operand in conditions:
+        if name != field:
+            continue
+        low = high = None
+        if op == "between":
+            low, high = operand
+        elif op in _LOWER_BOUNDS or op in _UPPER_BOUNDS:
+            low = operand if op in _LOWER_BOUNDS else None
+            high = operand if op in _UPPER_BOUNDS else None
+        if low is not None:
+            first, bounded = max(first, str(low)[:10]), True
+        if high is not None:
+            last, bounded = min(last, str(high)[:10]), True
+    return (first, last) if bounded else None
+
+
+def order(records, order_by):
+    """
+    Sort records by one field or a list of fields; prefix a field with "-" for descending.
+
+    Records missing a field sort after those that have it.
+    """
+    fields = [order_by] if isinstance(order_by, str) else list(order_by)
+    records = list(records)
+    for field in reversed(fields):
+        descending = field.startswith("-")
+        name = field[1:] if descending else field
+        present = [record for record in records if record.get(name) is not None]
+        missing = [record for record in records if record.get(name) is None]
+        try:
+            present.sort(key=lambda record: record[name], reverse=descending)
+        except TypeError:
+            present.sort(key=lambda record: str(record[name]), reverse=descending)
+        records = present + missing
+    return records
+
+
+def project(records, fields):
+    """Return each record reduced to the given fields, in that order (missing fields become None)."""
+    return [{field: record.get(field) for field in fields} for record in records]
@@ -0,0 +1,148 @@
+# database/read_snapshot.py
+import marshal
+import logging
+import threading
+from contextlib import nullcontext
+from itertools import islice
+from database.keyed_collection import KeyedCollection
+from database.query import matches, order, parse_where, project as project_fields
+
+logger = logging.getLogger(__name__)
+
+
+class ReadSnapshot:
+    """
+    A read-only view of every data source as it stood when the snapshot was taken.
+
+    Created with DataLoader.read_snapshot(). Taking a snapshot copies nothing:
+    sources already in the cache are pinned by reference to their cached
+    encoded bytes, which are never modified in place, and the others are
+    pinned the first time they are read. If this process saves a source the
+    snapshot has not pinned yet, the save first hands the snapshot the
+    version it is replacing (copy-on-write), so writers never wait for a
+    report and a report never sees a save made after it started.
+
+    Changes saved by *other* processes to a source before the snapshot first
+    reads it are visible (and logged); pinning every source up front instead
+    needs ``DataLoader.read_snapshot(preload=True)``.
+
+    The snapshot offers the read side of the DataLoader API (get_data,
+    iter_data, get_collection, get_record, find, query), so report code that
+    takes a data_loader works unchanged. Each get_data call returns a fresh
+    copy; collections are built once per snapshot and must not be modified.
+    """
+
+    def __init__(self, version, signatures, pinned, loader):
+        """
+        :param version: Number of saves this process had made when the snapshot was taken.
+        :param signatures: Storage signature of each source at that moment.
+        :param pinned: Encoded data of the sources pinned immediately.
+        :param loader: The DataLoader class, used to read sources not pinned yet.
+        """
+        self.version = version
+        self.closed = False
+        self._signatures = signatures
+        self._pinned = pinned
+        self._loader = loader
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """Release the pinned data; later reads raise ValueError."""
+        self.closed = True
+        self._loader._release_snapshot(self)
+        with self._lock:
+            self._pinned = {}
+            self._collections = {}
+
+    def read_snapshot(self, preload=False):
+        """Return this snapshot (for code written against DataLoader.read_snapshot), left open on exit."""
+        return nullcontext(self)
+
+    def get_data(self, source_name):
+        """Return a copy of a source's records as of the snapshot."""
+        return marshal.loads(self._payload(source_name))
+
+    def iter_data(self, source_name):
+        return iter(self.get_data(source_name))
+
+    def get_collection(self, source_name):
+        """Return a copy-on-write view of the source's KeyedCollection, built once per snapshot."""
+        with self._lock:
+            collection = self._collections.get(source_name)
+        if collection is None:
+            source = self._loader.data_sources[source_name]
+            collection = KeyedCollection(
+                source_name, source.get("key"), self.get_data(source_name), source.get("indexes", ())
+            )
+            with self._lock:
+                collection = self._collections.setdefault(source_name, collection)
+        return collection.view()
+
+    def get_record(self, source_name, key_value, default=None):
+        return self.get_collection(source_name).get(key_value, default)
+
+    def find(self, source_name, **criteria):
+        source = self._source(source_name)
+        if source.get("key"):
+            return self.get_collection(source_name).find(**criteria)
+        return [
+            record for record in self.get_data(source_name)
+            if all(record.get(field) == value for field, value in criteria.items())
+        ]
+
+    def query(self, source_name, where=None, project=None, order_by=None, limit=None):
+        """DataLoader.query over the snapshot: equalities use the collection's indexes, the rest is scanned."""
+        source = self._source(source_name)
+        conditions = parse_where(where)
+        if source.get("key"):
+            criteria = {field: operand for field, op, operand in conditions if op == "=="}
+            records = self.get_collection(source_name).select(criteria, lambda record: matches(record, conditions))
+        else:
+            records = [record for record in self.get_data(source_name) if matches(record, conditions)]
+        if order_by:
+            records = order(records, order_by)
+        if limit is not None:
+            records = list(islice(records, limit))
+        return project_fields(records, project) if project else records
+
+    def is_pinned(self, source_name):
+        with self._lock:
+            return source_name in self._pinned
+
+    def _source(self, source_name):
+        source = self._loader.data_sources.get(source_name)
+        if not source:
+            logger.error(f"Data source '{source_name}' not found.")
+            raise ValueError(f"Data source '{source_name}' not found.")
+        return source
+
+    def _payload(self, source_name):
+        if self.closed:
+            raise ValueError("The read snapshot has been closed.")
+        self._source(source_name)
+        with self._lock:
+            payload = self._pinned.get(source_name)
+        if payload is None:
+            payload = self._loader._pin_for_snapshot(self, source_name)
+        return payload
+
+    def _pin(self, source_name, payload, signature=None):
+        """Keep payload as this snapshot's version of a source unless one is pinned already."""
+        with self._lock:
+            if source_name in self._pinned:
+                return self._pinned[source_name]
+            if signature is not None and self._signatures.get(source_name, signature) != signature:
+                logger.warning(
+                    f"Read snapshot {self.version}: {source_name} was changed by another process "
+                    "after the snapshot was taken; using its current contents."
+                )
+            self._pinned[source_name] = payload
+            return payload
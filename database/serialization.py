@@ -0,0 +1,145 @@
+# database/serialization.py
+import gc
+import json
+import logging
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary format
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class JsonCodec:
+    """
+    Standard-library JSON codec.
+
+    indent=4 reproduces the original pretty-printed files; indent=None with
+    compact separators gives the smallest text output. Every JSON codec can
+    read files written by any other, so switching between them needs no migration.
+    """
+
+    binary = False
+    decode_errors = (json.JSONDecodeError,)
+
+    def __init__(self, name, indent=None):
+        self.name = name
+        self.indent = indent
+
+    def dumps(self, data):
+        """Return data encoded as UTF-8 bytes."""
+        if self.indent is None:
+            return json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return json.dumps(data, indent=self.indent).encode("utf-8")
+
+    def loads(self, payload):
+        return json.loads(payload)
+
+
+class FastJsonCodec(JsonCodec):
+    """
+    Compact JSON encoded with orjson when it is installed.
+
+    Falls back to the standard library (compact separators) when orjson is
+    missing, or for values orjson rejects such as integers wider than 64 bits.
+    """
+
+    def __init__(self, name):
+        super().__init__(name, indent=None)
+
+    def dumps(self, data):
+        if orjson is None:
+            return super().dumps(data)
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().dumps(data)
+
+    def loads(self, payload):
+        if orjson is None:
+            return super().loads(payload)
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so decode_errors still applies.
+        return orjson.loads(payload)
+
+
+class MsgpackCodec:
+    """
+    Binary MessagePack codec for hot collections (requires the msgpack package).
+
+    Files written with it are not JSON; give such sources their own file name
+    (e.g. members.msgpack) so they are not mistaken for JSON arrays.
+    """
+
+    binary = True
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def decode_errors(self):
+        # Without msgpack nothing is decoded, so no error means the file is corrupt.
+        return () if msgpack is None else (ValueError, msgpack.UnpackException)
+
+    def dumps(self, data):
+        self._require()
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, payload):
+        self._require()
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+    def _require(self):
+        # ImportError rather than ValueError: a missing package must never look
+        # like a malformed file, or readers would move valid data aside.
+        if msgpack is None:
+            raise ImportError(f"Codec '{self.name}' needs the msgpack package (pip install msgpack).")
+
+
+@contextmanager
+def paused_gc():
+    """
+    Suspend the cyclic garbage collector while decoding a large collection.
+
+    Decoding allocates one container per record and field; each allocation
+    burst triggers full collections that scan the half-built result and can
+    double the load time. Decoded JSON holds no reference cycles, so nothing
+    is lost by deferring collection until the load finishes.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+DEFAULT_CODEC = "pretty"
+
+codecs = {
+    "pretty": JsonCodec("pretty", indent=4),
+    "compact": JsonCodec("compact"),
+    "fast": FastJsonCodec("fast"),
+    "msgpack": MsgpackCodec("msgpack"),
+}
+
+
+def get_codec(name=None):
+    """Return the codec registered under name (the pretty JSON codec by default)."""
+    codec = codecs.get(name or DEFAULT_CODEC)
+    if codec is None:
+        logger.error(f"Unsupported codec '{name}'.")
+        raise ValueError(f"Unsupported codec '{name}'.")
+    return codec
+
+
+def available_codecs():
+    """Return the names of the codecs usable in this environment."""
+    return [name for name, codec in codecs.items() if not (isinstance(codec, MsgpackCodec) and msgpack is None)]
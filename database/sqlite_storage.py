@@ -0,0 +1,254 @@
+# database/sqlite_storage.py
+import argparse
+import json
+import os
+import re
+import logging
+import sqlite3
+import threading
+from database.storage import file_signature
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _quote(identifier):
+    """Validate a table/column name before it is interpolated into SQL."""
+    if not _IDENTIFIER.match(identifier):
+        raise ValueError(f"Invalid identifier '{identifier}'.")
+    return f'"{identifier}"'
+
+
+class SqliteStorage:
+    """
+    Stores each collection as a SQLite table in WAL mode.
+
+    Every row keeps the full record as JSON plus copies of the source's
+    "indexes" fields in their own indexed columns, so filters on those fields
+    can be answered by an index lookup (see ``query``) instead of a Python scan.
+    """
+
+    def __init__(self, database=None):
+        self.database = database
+        self._local = threading.local()
+        self._prepared = set()
+
+    def database_path(self, source):
+        """Return the database file for a source (defaults to gym_management.db next to its JSON file)."""
+        return (
+            source.get("database")
+            or self.database
+            or os.path.join(os.path.dirname(source["file"]), "gym_management.db")
+        )
+
+    def indexed_fields(self, source_name, source):
+        # Composite indexes (tuples of fields) only exist in KeyedCollection.
+        return [field for field in source.get("indexes", []) if isinstance(field, str)]
+
+    def signature(self, source):
+        path = self.database_path(source)
+        return file_signature(path), file_signature(path + "-wal")
+
+    def read(self, source_name, source):
+        """Load the whole collection in its stored order."""
+        connection = self._connect(source)
+        self._ensure_table(connection, source_name, source)
+        rows = connection.execute(f"SELECT record FROM {_quote(source_name)} ORDER BY position")
+        return [json.loads(record) for (record,) in rows]
+
+    def iter(self, source_name, source):
+        """Yield the records in stored order, decoding one row at a time."""
+        connection = self._connect(source)
+        self._ensure_table(connection, source_name, source)
+        for (record,) in connection.execute(f"SELECT record FROM {_quote(source_name)} ORDER BY position"):
+            yield json.loads(record)
+
+    def write(self, source_name, source, data):
+        """Persist data, touching only the rows that were inserted, changed or removed."""
+        connection = self._connect(source)
+        self._ensure_table(connection, source_name, source)
+        table = _quote(source_name)
+        fields = self.indexed_fields(source_name, source)
+        rows = self._rows(source.get("key"), fields, data)
+
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            existing = {
+                pk: (position, record)
+                for pk, position, record in connection.execute(f"SELECT pk, position, record FROM {table} ORDER BY position")
+            }
+            live = {row[0] for row in rows}
+            surviving = [row[0] for row in rows if row[0] in existing]
+            if surviving == [pk for pk in existing if pk in live]:
+                # Order is preserved: keep existing positions and append new rows after them.
+                next_position = max((position for position, _ in existing.values()), default=-1) + 1
+                for index, row in enumerate(rows):
+                    if row[0] in existing:
+                        rows[index] = (row[0], existing[row[0]][0], *row[2:])
+                    else:
+                        rows[index] = (row[0], next_position, *row[2:])
+                        next_position += 1
+            changed = [row for row in rows if existing.get(row[0]) != (row[1], row[2])]
+            removed = [(pk,) for pk in existing if pk not in live]
+
+            if removed:
+                connection.executemany(f"DELETE FROM {table} WHERE pk = ?", removed)
+            if changed:
+                columns = ", ".join(["pk", "position", "record"] + [_quote(f) for f in fields])
+                placeholders = ", ".join("?" * (3 + len(fields)))
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})", changed
+                )
+        logger.debug(f"SQLite save for {source_name}: {len(changed)} upserted, {len(removed)} removed.")
+
+    def query(self, source_name, source, criteria):
+        """
+        Return records whose fields equal the given values.
+
+        Criteria on indexed fields become indexed column comparisons; any other
+        field is matched with json_extract on the stored record.
+        """
+        connection = self._connect(source)
+        self._ensure_table(connection, source_name, source)
+        where, params = self._where(source_name, source, criteria)
+        rows = connection.execute(
+            f"SELECT record FROM {_quote(source_name)}{where} ORDER BY position", params
+        )
+        return [json.loads(record) for (record,) in rows]
+
+    def explain(self, source_name, source, criteria):
+        """Return SQLite's query plan for a criteria dictionary (used to confirm index use)."""
+        connection = self._connect(source)
+        self._ensure_table(connection, source_name, source)
+        where, params = self._where(source_name, source, criteria)
+        plan = connection.execute(f"EXPLAIN QUERY PLAN SELECT record FROM {_quote(source_name)}{where}", params)
+        return [row[-1] for row in plan]
+
+    def _where(self, source_name, source, criteria):
+        indexed = set(self.indexed_fields(source_name, source))
+        clauses, params = [], []
+        for field, value in criteria.items():
+            if field in indexed:
+                clauses.append(f"{_quote(field)} = ?")
+            else:
+                _quote(field)
+                clauses.append(f"json_extract(record, '$.{field}') = ?")
+            params.append(value)
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _connect(self, source):
+        """Return this thread's connection to the source's database."""
+        path = self.database_path(source)
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(path)
+        if connection is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connections[path] = connection
+        return connection
+
+    def _ensure_table(self, connection, source_name, source):
+        path = self.database_path(source)
+        fields = self.indexed_fields(source_name, source)
+        marker = (path, source_name, tuple(fields))
+        if marker in self._prepared:
+            return
+
+        table = _quote(source_name)
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "pk TEXT PRIMARY KEY, position INTEGER NOT NULL, record TEXT NOT NULL)"
+        )
+        existing_columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        for field in fields:
+            if field not in existing_columns:
+                # Newly indexed field on an existing table: add and backfill the column.
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {_quote(field)}")
+                connection.execute(f"UPDATE {table} SET {_quote(field)} = json_extract(record, '$.{field}')")
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{source_name}_{field}')} ON {table} ({_quote(field)})"
+            )
+            if field != "date" and "date" in fields:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{source_name}_{field}_date')} "
+                    f"ON {table} ({_quote(field)}, \"date\")"
+                )
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{source_name}_position')} ON {table} (position)")
+        self._prepared.add(marker)
+
+    @staticmethod
+    def _rows(key, fields, data):
+        """Build (pk, position, record_json, *indexed_values) tuples for a collection."""
+        keys = [record.get(key) if key and isinstance(record, dict) else None for record in data]
+        # Fall back to positional keys when the primary key is missing or not unique.
+        use_positions = None in keys or len(set(map(str, keys))) != len(keys)
+        rows = []
+        for position, record in enumerate(data):
+            pk = f"#{position}" if use_positions else str(keys[position])
+            values = [record.get(field) if isinstance(record, dict) else None for field in fields]
+            rows.append((pk, position, json.dumps(record, separators=(",", ":")), *values))
+        return rows
+
+
+def migrate_json_to_sqlite(source_names=None, database=None):
+    """
+    Import the current collections into SQLite.
+
+    Each source is read through its configured storage (DataLoader.get_data),
+    so journals are replayed and partitioned sources are read from their
+    partitions.
+
+    :param source_names: Sources to import (defaults to every non-SQLite source
+                         with stored data); naming one with no stored data is an error.
+    :param database: Target database file (defaults to gym_management.db in the database directory).
+    :return: Dictionary of source name -> number of records imported.
+    """
+    from database.data_loader import DataLoader
+
+    unknown = sorted(set(source_names or ()) - set(DataLoader.data_sources))
+    if unknown:
+        logger.error(f"Unknown data sources: {', '.join(unknown)}.")
+        raise ValueError(f"Unknown data sources: {', '.join(unknown)}.")
+
+    sqlite_storage = SqliteStorage(database)
+    imported = {}
+    for source_name, source in DataLoader.data_sources.items():
+        if source_names and source_name not in source_names:
+            continue
+        if source["type"] == "sqlite":
+            continue
+        if not _has_stored_data(DataLoader._get_storage(source_name, source), source):
+            if source_names:
+                logger.error(f"{source_name} has no stored data to import.")
+                raise ValueError(f"{source_name} has no stored data to import.")
+            logger.warning(f"Not importing {source_name}: it has no stored data yet.")
+            continue
+        data = DataLoader.get_data(source_name)
+        sqlite_storage.write(source_name, source, data)
+        imported[source_name] = len(data)
+        logger.info(f"Imported {len(data)} {source_name} records into {sqlite_storage.database_path(source)}.")
+    return imported
+
+
+def _has_stored_data(storage, source):
+    """True if the source's file or any file its storage signs (journal, manifest) exists."""
+    if os.path.exists(source["file"]):
+        return True
+    signature = storage.signature(source)
+    if isinstance(signature, tuple) and all(isinstance(part, tuple) or part is None for part in signature):
+        return any(part is not None for part in signature)
+    return signature is not None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the stored collections into a SQLite database.")
+    parser.add_argument("sources", nargs="*", help="Sources to import (default: all)")
+    parser.add_argument("--database", help="Target SQLite file (default: database/gym_management.db)")
+    args = parser.parse_args()
+    for name, count in migrate_json_to_sqlite(args.sources or None, args.database).items():
+        print(f"{name}: {count} records imported")
+    print('Set "type": "sqlite" on the migrated entries in DataLoader.data_sources to use them.')
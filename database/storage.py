@@ -0,0 +1,454 @@
+# database/storage.py
+import json
+import marshal
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from database.concurrency import FileLock, lock_path
+from database.serialization import get_codec, paused_gc
+from database.streaming import iter_json_array, iter_json_lines, write_json_lines
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(file_path):
+    """Return the (mtime, size, inode) triple used to detect external changes to a file."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def fsync_directory(directory):
+    """Flush a directory entry so a completed rename survives a power loss (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_replace(file_path, fsync=True, sync_directory=False):
+    """
+    Yield a temporary path next to file_path and move it over file_path on success.
+
+    Readers see either the old file or the complete new one, never a partial
+    write. With fsync the new contents reach the disk before the rename; with
+    sync_directory the rename itself is flushed too. If the block raises, the
+    temporary file is removed and file_path is left untouched.
+    """
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(file_path)}.{os.urandom(6).hex()}.tmp")
+    # Created like open(..., "w") would (0o666 minus umask), unlike mkstemp's 0o600.
+    os.close(os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+    try:
+        yield temp_path
+        if fsync:
+            with open(temp_path, "rb+") as f:
+                os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if sync_directory:
+        fsync_directory(directory)
+
+
+def write_atomic(file_path, payload, fsync=True, sync_directory=False):
+    """Replace file_path with payload (bytes) atomically; see atomic_replace."""
+    with atomic_replace(file_path, fsync, sync_directory) as temp_path:
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+
+
+class JsonStorage:
+    """
+    Stores a collection as a single array file.
+
+    The encoding comes from the source's "codec" entry (see database/serialization.py);
+    the default is the original pretty-printed JSON layout.
+
+    Saves go through a temporary file that is fsynced and renamed over the
+    original, so a crash mid-save leaves the previous contents intact.
+    """
+
+    def __init__(self, fsync=True, fsync_directory=False):
+        """
+        :param fsync: Flush each save to disk before it replaces the old file.
+        :param fsync_directory: Also flush the directory entry after the rename.
+        """
+        self.fsync = fsync
+        self.fsync_directory = fsync_directory
+
+    @staticmethod
+    def codec(source):
+        return get_codec(source.get("codec"))
+
+    def initialize(self, source):
+        """Create an empty array file for the source."""
+        file_path = source["file"]
+        write_atomic(file_path, self.codec(source).dumps([]), self.fsync, self.fsync_directory)
+        logger.info(f"Initialized JSON file: {file_path}")
+
+    def signature(self, source):
+        return file_signature(source["file"])
+
+    def read(self, source_name, source):
+        """
+        Load the whole collection.
+
+        An empty or malformed file is reset to an empty list; a malformed file
+        with content is first moved aside to <file>.corrupt so it can be recovered.
+        """
+        file_path = source["file"]
+        if not os.path.exists(file_path):
+            self.initialize(source)
+        codec = self.codec(source)
+        try:
+            with open(file_path, "rb") as f:
+                payload = f.read()
+            with paused_gc():
+                data = codec.loads(payload)
+            # Ensure data is a list
+            if not isinstance(data, list):
+                logger.warning(f"Data in {source_name}.json is not a list. Resetting to empty list.")
+                data = []
+        except codec.decode_errors:
+            if os.path.getsize(file_path):
+                os.replace(file_path, file_path + ".corrupt")
+                logger.error(f"{source_name}.json is malformed; moved it to {file_path}.corrupt.")
+            logger.warning(f"{source_name}.json is empty or malformed. Initializing as empty list.")
+            data = []
+            JsonStorage.write(self, source_name, source, data)
+        return data
+
+    def iter(self, source_name, source):
+        """Yield the records one at a time without loading the whole file."""
+        if not os.path.exists(source["file"]):
+            return iter(())
+        if self.codec(source).binary:
+            return iter(self.read(source_name, source))
+        return iter_json_array(source["file"])
+
+    def write(self, source_name, source, data):
+        """Rewrite the whole collection."""
+        write_atomic(source["file"], self.codec(source).dumps(data), self.fsync, self.fsync_directory)
+
+
+class JsonLinesStorage(JsonStorage):
+    """
+    Stores a collection as compact JSON-Lines, one record per line.
+
+    Records can be streamed with ``iter`` in constant memory. Convert an
+    existing pretty-printed file with ``python -m database.streaming``.
+    """
+
+    def initialize(self, source):
+        file_path = source["file"]
+        write_atomic(file_path, b"", self.fsync, self.fsync_directory)
+        logger.info(f"Initialized JSON-Lines file: {file_path}")
+
+    def read(self, source_name, source):
+        if not os.path.exists(source["file"]):
+            self.initialize(source)
+        return list(iter_json_lines(source["file"]))
+
+    def iter(self, source_name, source):
+        if not os.path.exists(source["file"]):
+            return iter(())
+        return iter_json_lines(source["file"])
+
+    def write(self, source_name, source, data):
+        with atomic_replace(source["file"], self.fsync, self.fsync_directory) as temp_path:
+            write_json_lines(temp_path, data)
+
+
+class JournalStorage(JsonStorage):
+    """
+    Stores a collection as a JSON base snapshot plus an append-only journal.
+
+    Each save is diffed against the last known state by the source's primary
+    key ("key" in the data source entry) and only the insert/update/delete
+    records are appended to the journal, one JSON object per line. Reads
+    replay the journal over the base snapshot. Once the journal holds more
+    than ``compaction_ratio`` entries per live record, it is folded back into
+    the base snapshot on a background thread.
+
+    Saves that cannot be expressed as a diff first replace the journal with a
+    single "reset" entry holding the whole collection, so a crash while the
+    base snapshot is rewritten never replays older entries over it.
+    """
+
+    def __init__(self, compaction_ratio=0.5, min_compaction_entries=1000, background=True,
+                 fsync=True, fsync_directory=False):
+        super().__init__(fsync, fsync_directory)
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_entries = min_compaction_entries
+        self.background = background
+        self._states = {}
+        self._locks = {}
+        self._compacting = set()
+        self._registry_lock = threading.Lock()
+
+    @staticmethod
+    def journal_path(source):
+        """Return the journal file used for a source (defaults to <file>.journal)."""
+        return source.get("journal") or os.path.splitext(source["file"])[0] + ".journal"
+
+    def signature(self, source):
+        return file_signature(source["file"]), file_signature(self.journal_path(source))
+
+    def read(self, source_name, source):
+        with self._lock(source_name):
+            records = self._replay(source_name, source)
+            self._states[source_name] = self._state_from(source, records)
+            return list(records.values())
+
+    def iter(self, source_name, source):
+        # The journal has to be replayed over the snapshot, so this cannot stream.
+        return iter(self.read(source_name, source))
+
+    def write(self, source_name, source, data):
+        key = source.get("key")
+        with self._lock(source_name):
+            state = self._states.get(source_name)
+            if state is None or state["signature"] != self.signature(source):
+                records = self._replay(source_name, source)
+                state = self._state_from(source, records)
+
+            entries = self._diff(key, state["records"], data) if key else None
+            if entries is None:
+                # No usable primary key, duplicate keys or a reordered collection:
+                # fall back to rewriting the snapshot.
+                self._rewrite(source_name, source, data)
+                self._states[source_name] = self._state_from(source, self._index(key, data))
+                return
+
+            if entries:
+                os.makedirs(os.path.dirname(self.journal_path(source)), exist_ok=True)
+                with open(self.journal_path(source), "a") as f:
+                    f.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                logger.debug(f"Appended {len(entries)} journal entries to {source_name}.")
+
+            records = self._index(key, data)
+            self._states[source_name] = {
+                "records": records,
+                "journal_entries": state["journal_entries"] + len(entries),
+                "signature": self.signature(source),
+            }
+            if self._needs_compaction(self._states[source_name]):
+                self._schedule_compaction(source_name, source)
+
+    def compact(self, source_name, source, attempts=3):
+        """
+        Fold the journal into the base snapshot and truncate it.
+
+        The new snapshot is written without holding the lock; if a full
+        rewrite replaced the base or the journal meanwhile, the snapshot is
+        stale and compaction starts over (up to attempts times). The source's
+        lock file is held too (shared while reading, exclusive while swapping
+        the files), so saves made by other processes through DataLoader are
+        never lost, even when compaction runs on its background thread.
+        """
+        try:
+            for _ in range(attempts):
+                if self._compact_once(source_name, source):
+                    logger.info(f"Compacted journal for {source_name}.")
+                    return True
+            logger.warning(f"Gave up compacting {source_name}: it was rewritten during every attempt.")
+            return False
+        finally:
+            self._compacting.discard(source_name)
+
+    def _compact_once(self, source_name, source):
+        journal = self.journal_path(source)
+        file_lock = FileLock.for_path(lock_path(source))
+        # The file lock is always taken before self._lock, the order DataLoader._write uses.
+        with file_lock.shared(), self._lock(source_name):
+            state = self._states.get(source_name)
+            if state is None or state["signature"] != self.signature(source):
+                state = self._state_from(source, self._replay(source_name, source))
+            snapshot = marshal.loads(marshal.dumps(list(state["records"].values())))
+            base_signature = file_signature(source["file"])
+            journal_signature = file_signature(journal)
+            journal_offset = journal_signature[1] if journal_signature else 0
+
+        # Write the new snapshot without holding the lock so writers keep appending.
+        temp_path = f"{source['file']}.{os.urandom(6).hex()}.compact"
+        with open(temp_path, "wb") as f:
+            f.write(self.codec(source).dumps(snapshot))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+        with file_lock.exclusive(), self._lock(source_name):
+            current = file_signature(journal)
+            if file_signature(source["file"]) != base_signature or not self._same_journal(journal_signature, current):
+                os.remove(temp_path)
+                return False
+            tail = ""
+            if os.path.exists(journal):
+                with open(journal, "r") as f:
+                    f.seek(journal_offset)
+                    tail = f.read()
+            # Replaying journal entries is idempotent, so a crash between these two
+            # renames only means the old entries are applied again on the next read.
+            os.replace(temp_path, source["file"])
+            with atomic_replace(journal, self.fsync, self.fsync_directory) as temp_journal:
+                with open(temp_journal, "w") as f:
+                    f.write(tail)
+
+            state = self._states.get(source_name)
+            if state is not None:
+                state["journal_entries"] = tail.count("\n")
+                state["signature"] = self.signature(source)
+        return True
+
+    @staticmethod
+    def _same_journal(before, after):
+        """True if after is before's journal file with only appends since (same inode, not shorter)."""
+        if before is None:
+            return True  # created since; everything in it is in the tail
+        return after is not None and after[2] == before[2] and after[1] >= before[1]
+
+    def _lock(self, source_name):
+        with self._registry_lock:
+            return self._locks.setdefault(source_name, threading.RLock())
+
+    def _replay(self, source_name, source):
+        """Rebuild the collection from the base snapshot and the journal."""
+        key = source.get("key")
+        records = self._index(key, super().read(source_name, source))
+        journal = self.journal_path(source)
+        if not os.path.exists(journal):
+            return records
+
+        with open(journal, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted append; everything before it is intact.
+                    logger.warning(f"Ignoring malformed journal entry {line_number} for {source_name}.")
+                    continue
+                if entry["op"] == "reset":
+                    records = self._index(key, entry["records"])
+                elif entry["op"] == "delete":
+                    records.pop(entry["key"], None)
+                elif entry["op"] == "insert" and entry.get("index", len(records)) < len(records):
+                    records = self._insert_at(records, entry["index"], entry["key"], entry["record"])
+                else:
+                    records[entry["key"]] = entry["record"]
+        return records
+
+    @staticmethod
+    def _insert_at(records, index, record_key, record):
+        """Return records with record inserted at position index (dicts can only append)."""
+        items = list(records.items())
+        items.insert(index, (record_key, record))
+        return dict(items)
+
+    def _rewrite(self, source_name, source, data):
+        """
+        Replace the whole collection.
+
+        The journal is first replaced by one "reset" entry holding data, then
+        the base snapshot is rewritten, then the journal is emptied. Each step
+        is an atomic rename, and after a crash at any point replay yields
+        either the old collection or data, never older entries applied over
+        the new base.
+        """
+        journal = self.journal_path(source)
+        reset = json.dumps({"op": "reset", "records": data}, separators=(",", ":")) + "\n"
+        with atomic_replace(journal, self.fsync, self.fsync_directory) as temp_journal:
+            with open(temp_journal, "w") as f:
+                f.write(reset)
+        super().write(source_name, source, data)
+        with atomic_replace(journal, self.fsync, self.fsync_directory) as temp_journal:
+            pass
+
+    def _state_from(self, source, records):
+        journal = self.journal_path(source)
+        entries = 0
+        if os.path.exists(journal):
+            with open(journal, "rb") as f:
+                entries = sum(1 for _ in f)
+        return {
+            "records": marshal.loads(marshal.dumps(records)),
+            "journal_entries": entries,
+            "signature": self.signature(source),
+        }
+
+    @staticmethod
+    def _index(key, data):
+        """Map primary key -> independent copy of each record, preserving order."""
+        records = marshal.loads(marshal.dumps(data))
+        if not key:
+            return dict(enumerate(records))
+        return {record.get(key, index): record for index, record in enumerate(records)}
+
+    @staticmethod
+    def _diff(key, previous, data):
+        """
+        Return journal entries turning previous into data, or None if a full rewrite is needed.
+
+        Deletes come first, then inserts and updates in the order of data.
+        Each insert carries its position in data. Replayed in that order, every
+        insert lands where it was made, because the records before it are
+        already in place.
+        """
+        seen = set()
+        changes = []
+        surviving_order = []
+        for index, record in enumerate(data):
+            record_key = record.get(key) if isinstance(record, dict) else None
+            if record_key is None or record_key in seen:
+                return None
+            seen.add(record_key)
+            old = previous.get(record_key)
+            if old is None:
+                changes.append({"op": "insert", "key": record_key, "index": index, "record": record})
+                continue
+            surviving_order.append(record_key)
+            if old != record:
+                changes.append({"op": "update", "key": record_key, "record": record})
+
+        if [k for k in previous if k in seen] != surviving_order:
+            # Replay keeps the surviving records in their stored order, so moving one needs a rewrite.
+            return None
+        return [{"op": "delete", "key": k} for k in previous if k not in seen] + changes
+
+    def _needs_compaction(self, state):
+        entries = state["journal_entries"]
+        return (
+            entries >= self.min_compaction_entries
+            and entries > self.compaction_ratio * max(len(state["records"]), 1)
+        )
+
+    def _schedule_compaction(self, source_name, source):
+        if source_name in self._compacting:
+            return
+        self._compacting.add(source_name)
+        if self.background:
+            threading.Thread(target=self._compact_safely, args=(source_name, source), daemon=True).start()
+        else:
+            self._compact_safely(source_name, source)
+
+    def _compact_safely(self, source_name, source):
+        try:
+            self.compact(source_name, source)
+        except Exception as e:
+            self._compacting.discard(source_name)
+            logger.error(f"Failed to compact journal for {source_name}: {e}")
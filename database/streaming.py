@@ -0,0 +1,193 @@
+# database/streaming.py
+import argparse
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",]"
+
+
+def detect_format(file_path):
+    """
+    Return "json" for a JSON-array file or "jsonl" for a JSON-Lines file.
+
+    Only the first non-whitespace character is inspected; empty files count as "json".
+    """
+    with open(file_path, "r") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return "json"
+            stripped = chunk.lstrip(_WHITESPACE)
+            if stripped:
+                return "json" if stripped[0] == "[" else "jsonl"
+
+
+def iter_json_array(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the elements of a JSON-array file one at a time.
+
+    The file is read in chunks and each element is decoded as soon as it is
+    complete, so memory use is bounded by the largest single record rather
+    than by the size of the file.
+
+    :param file_path: Path to a file containing a top-level JSON array.
+    :param chunk_size: Number of characters read per chunk.
+    """
+    with open(file_path, "r") as f:
+        buffer = ""
+        position = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        def skip_whitespace():
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer) or eof:
+                    return
+                fill()
+
+        skip_whitespace()
+        if position >= len(buffer):
+            return
+        if buffer[position] != "[":
+            raise ValueError(f"{file_path} does not contain a JSON array.")
+        position += 1
+
+        expect_value = True
+        while True:
+            skip_whitespace()
+            if position >= len(buffer):
+                raise ValueError(f"Unexpected end of file in {file_path}.")
+            char = buffer[position]
+            if char == "]":
+                return
+            if char == ",":
+                if expect_value:
+                    raise ValueError(f"Unexpected ',' in {file_path}.")
+                position += 1
+                expect_value = True
+                continue
+            if not expect_value:
+                raise ValueError(f"Expected ',' or ']' in {file_path}.")
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if not eof and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                # A number cut at a chunk boundary ("12" of "12.5") decodes early; read on.
+                fill()
+                continue
+            position = end
+            expect_value = False
+            yield value
+
+
+def iter_json_lines(file_path):
+    """Yield the records of a JSON-Lines file, skipping blank lines."""
+    with open(file_path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number} of {file_path}: {e}") from e
+
+
+def iter_records(file_path):
+    """Yield the records of a JSON-array or JSON-Lines file, whichever it contains."""
+    if not os.path.exists(file_path):
+        return iter(())
+    if detect_format(file_path) == "jsonl":
+        return iter_json_lines(file_path)
+    return iter_json_array(file_path)
+
+
+def write_json_array(file_path, records, indent=4):
+    """
+    Write records as a JSON array one element at a time.
+
+    With the default indent the output is identical to ``json.dump(records, f, indent=4)``,
+    i.e. the layout of the existing data files.
+
+    :return: Number of records written.
+    """
+    newline = "" if indent is None else "\n"
+    pad = "" if indent is None else (" " * indent if isinstance(indent, int) else indent)
+    count = 0
+    with open(file_path, "w") as f:
+        for record in records:
+            text = json.dumps(record, indent=indent)
+            f.write(("[" if count == 0 else ",") + newline)
+            f.write(pad + text.replace("\n", "\n" + pad) if pad else text)
+            count += 1
+        f.write(newline + "]" if count else "[]")
+    return count
+
+
+def write_json_lines(file_path, records):
+    """
+    Write records as compact JSON-Lines, one record per line.
+
+    :return: Number of records written.
+    """
+    count = 0
+    with open(file_path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def convert(source_path, target_path, to="jsonl", indent=4):
+    """
+    Convert a data file between the pretty-printed JSON-array layout and JSON-Lines.
+
+    The input format is detected automatically and records are streamed, so
+    files larger than memory can be converted.
+
+    :param to: "jsonl" for compact JSON-Lines or "json" for a JSON array.
+    :param indent: Indentation used when writing a JSON array.
+    :return: Number of records converted.
+    """
+    if to not in ("json", "jsonl"):
+        raise ValueError(f"Unsupported target format '{to}'. Use 'json' or 'jsonl'.")
+    if os.path.abspath(source_path) == os.path.abspath(target_path):
+        raise ValueError("Source and target files must differ.")
+    records = iter_records(source_path)
+    if to == "jsonl":
+        count = write_json_lines(target_path, records)
+    else:
+        count = write_json_array(target_path, records, indent=indent)
+    logger.info(f"Converted {count} records from {source_path} to {target_path} ({to}).")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert data files between JSON arrays and JSON-Lines.")
+    parser.add_argument("source", help="Input file (JSON array or JSON-Lines)")
+    parser.add_argument("target", help="Output file")
+    parser.add_argument("--to", choices=["json", "jsonl"], default="jsonl", help="Output format (default: jsonl)")
+    parser.add_argument("--indent", type=int, default=4, help="Indent for JSON-array output (default: 4)")
+    args = parser.parse_args()
+    print(f"{convert(args.source, args.target, args.to, args.indent)} records converted")
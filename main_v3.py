@@ -265,6 +265,8 @@ class GymManagementSystem(tk.Tk):
         self.deiconify()
 
 if __name__ == "__main__":
+    # Several front desks may run against the same database directory
+    DataLoader.enable_shared_access()
     app = GymManagementSystem()
     app.mainloop()
     print("Current working directory:", os.getcwd())
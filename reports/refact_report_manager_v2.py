@@ -5,6 +5,7 @@ import logging
 from datetime import datetime
 import matplotlib.pyplot as plt
 import pandas as pd
+from core.class_registrations import ClassRegistrations
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -15,9 +16,13 @@ class ReportManagementFrame(ttk.Frame):
         super().__init__(parent)
         self.data_loader = data_loader
         self.reports_dir = reports_dir
+        # Pending run_report_steps callback and the read snapshot it reports on
+        self._report_job = None
+        self._report_snapshot = None
         self.ensure_reports_dir()
         print(os.path.abspath(self.reports_dir))
         self.create_widgets()
+        self.bind("<Destroy>", self._on_destroy, add="+")
 
     def ensure_reports_dir(self):
         """
@@ -82,7 +87,7 @@ class ReportManagementFrame(ttk.Frame):
         Saves the report as 'attendance_report.jpeg'.
         """
         try:
-            classes = self.data_loader.get_data("classes")
+            classes = ClassRegistrations.classes_with_registrations(self.data_loader)
             logger.debug(f"Loaded classes data: {classes}")
 
             # Prepare data for total registrations per class
@@ -296,7 +301,7 @@ class ReportManagementFrame(ttk.Frame):
         Saves the report as 'appointments_vs_staff_cost_report.jpeg'.
         """
         try:
-            classes = self.data_loader.get_data("classes")
+            classes = ClassRegistrations.classes_with_registrations(self.data_loader)
             logger.debug(f"Loaded classes data: {classes}")
 
             # Calculate total number of class registrations
@@ -336,14 +341,53 @@ class ReportManagementFrame(ttk.Frame):
     def generate_all_reports(self):
         """
         Generates all reports: Attendance, Membership Growth, Payment, Appointments vs Staff Cost, Membership Fees.
+
+        The reports read from one read snapshot, so they all describe the same
+        moment, and run one per event-loop turn so the window stays responsive
+        while desks keep saving in between.
         """
+        self.cancel_report_steps()
         self.log_status("Starting generation of all reports.")
-        self.generate_attendance_report()
-        self.generate_membership_growth_report()
-        self.generate_payment_report()
-        self.generate_appointments_vs_staff_cost_report()
-        self.generate_membership_fees_report()
-        self.log_status("All reports have been generated successfully.")
+        snapshot = self.data_loader.read_snapshot()
+        self.run_report_steps(snapshot, [
+            self.generate_attendance_report,
+            self.generate_membership_growth_report,
+            self.generate_payment_report,
+            self.generate_appointments_vs_staff_cost_report,
+            self.generate_membership_fees_report,
+        ])
+
+    def run_report_steps(self, snapshot, steps):
+        """Run the first report on the snapshot, then schedule the rest; close the snapshot after the last."""
+        self._report_job = None
+        self._report_snapshot = snapshot
+        live_loader = self.data_loader
+        self.data_loader = snapshot
+        try:
+            steps[0]()
+        except Exception:
+            self.cancel_report_steps()
+            raise
+        finally:
+            self.data_loader = live_loader
+        if len(steps) > 1:
+            self._report_job = self.after(1, self.run_report_steps, snapshot, steps[1:])
+        else:
+            self.cancel_report_steps()
+            self.log_status("All reports have been generated successfully.")
+
+    def cancel_report_steps(self):
+        """Drop the reports still scheduled, if any, and close their read snapshot."""
+        if self._report_job is not None:
+            self.after_cancel(self._report_job)
+            self._report_job = None
+        if self._report_snapshot is not None:
+            self._report_snapshot.close()
+            self._report_snapshot = None
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.cancel_report_steps()
 
 '''
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ import logging
 from datetime import datetime
 import matplotlib.pyplot as plt
 import pandas as pd
+from core.class_registrations import ClassRegistrations
 
 
 # Configure logging
@@ -45,7 +46,7 @@ class ReportManager:
         Saves the report as 'attendance_report.jpeg'.
         """
         try:
-            classes = self.data_loader.get_data("classes")
+            classes = ClassRegistrations.classes_with_registrations(self.data_loader)
             logger.debug(f"Loaded classes data: {classes}")
 
             # Prepare data for total registrations per class
@@ -258,7 +259,7 @@ class ReportManager:
         :param appointment_fee: Fee charged per appointment (default is $50).
         """
         try:
-            classes = self.data_loader.get_data("classes")
+            classes = ClassRegistrations.classes_with_registrations(self.data_loader)
             logger.debug(f"Loaded classes data: {classes}")
 
             # Calculate total number of class registrations
@@ -297,13 +298,18 @@ class ReportManager:
     def generate_all_reports(self):
         """
         Generates all reports: Attendance, Membership Growth, and Payment.
+
+        The reports read from one read snapshot, so they all describe the same
+        moment even while other desks keep saving.
         """
         logger.info("Starting generation of all reports.")
-        self.generate_attendance_report()
-        self.generate_membership_growth_report()
-        self.generate_payment_report()
-        self.generate_appointments_vs_staff_cost_report()
-        self.generate_membership_fees_report()
+        with self.data_loader.read_snapshot() as snapshot:
+            reports = ReportManager(snapshot, self.reports_dir)
+            reports.generate_attendance_report()
+            reports.generate_membership_growth_report()
+            reports.generate_payment_report()
+            reports.generate_appointments_vs_staff_cost_report()
+            reports.generate_membership_fees_report()
         logger.info("All reports have been generated successfully.")
 
 
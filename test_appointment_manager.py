@@ -6,7 +6,7 @@ from core.appointments import AppointmentManager
 class TestAppointmentManager(unittest.TestCase):
     @patch("database.data_loader.DataLoader.get_data")
     @patch("database.data_loader.DataLoader.save_data")
-    @patch("utils.helpers.generate_unique_id")
+    @patch("core.appointments.generate_unique_id")
     def test_schedule_appointment(self, mock_generate_unique_id, mock_save_data, mock_get_data):
         mock_get_data.return_value = []
         mock_generate_unique_id.return_value = "bb0e99ec"
@@ -22,6 +22,7 @@ class TestAppointmentManager(unittest.TestCase):
 
         mock_save_data.assert_called_once()
         saved_appointment = mock_save_data.call_args[0][1][0]
+        self.assertEqual(saved_appointment["appointment_id"], "bb0e99ec")
         self.assertEqual(saved_appointment["member_id"], "M1")
         self.assertEqual(saved_appointment["trainer_id"], "T1")
         self.assertEqual(saved_appointment["date"], "2024-12-20")
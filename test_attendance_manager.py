@@ -1,13 +1,18 @@
+import os
+import shutil
+import tempfile
 from unittest import TestCase
 from unittest.mock import patch
 from core.attendance_tracking import AttendanceManager
+from database.data_loader import DataLoader
+from database.partitioned_storage import PartitionedStorage
 
 class TestAttendanceManager(TestCase):
-
+    @patch("core.attendance_tracking.AttendanceRollups.record")
     @patch("core.attendance_tracking.generate_unique_id")  # Corrected patch target
     @patch("database.data_loader.DataLoader.save_data")
     @patch("database.data_loader.DataLoader.get_data")
-    def test_add_attendance(self, mock_get_data, mock_save_data, mock_generate_unique_id):
+    def test_add_attendance(self, mock_get_data, mock_save_data, mock_generate_unique_id, mock_record_rollups):
         # Mock data for attendance
         mock_attendance_records = []
         mock_get_data.return_value = mock_attendance_records
@@ -28,6 +33,8 @@ class TestAttendanceManager(TestCase):
 
         # Ensure save_data was called with the updated attendance records
         mock_save_data.assert_called_once_with("attendance", mock_attendance_records)
+        # And counted in the rollups
+        mock_record_rollups.assert_called_once_with(mock_attendance_records[0])
 
 
     @patch("database.data_loader.DataLoader.get_data")
@@ -43,19 +50,40 @@ class TestAttendanceManager(TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["attendance_id"], "A001")
 
-    @patch("database.data_loader.DataLoader.get_data")
-    def test_get_attendance_by_class_with_date(self, mock_get_data):
-        mock_attendance_records = [
+    def use_partitioned_attendance(self, records):
+        """Point the attendance source at a temporary partitioned store holding records."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        source = dict(DataLoader.data_sources["attendance"], file=os.path.join(temp_dir, "attendance.json"))
+        sources_patch = patch.dict(DataLoader.data_sources, {"attendance": source})
+        sources_patch.start()
+        self.addCleanup(sources_patch.stop)
+        DataLoader.save_data("attendance", records)
+
+    def test_get_attendance_by_class_with_date(self):
+        self.use_partitioned_attendance([
             {"attendance_id": "A001", "class_id": "C001", "user_id": "U123", "date": "2024-06-01"},
             {"attendance_id": "A002", "class_id": "C001", "user_id": "U456", "date": "2024-06-02"},
-        ]
-        mock_get_data.return_value = mock_attendance_records
+        ])
 
         # Retrieve attendance by class and date
         result = AttendanceManager.get_attendance_by_class("C001", "2024-06-01")
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["attendance_id"], "A001")
 
+    def test_get_attendance_by_period_reads_only_overlapping_months(self):
+        self.use_partitioned_attendance([
+            {"attendance_id": "A001", "class_id": "C001", "user_id": "U123", "date": "2024-05-31"},
+            {"attendance_id": "A002", "class_id": "C001", "user_id": "U456", "date": "2024-06-02"},
+            {"attendance_id": "A003", "class_id": "C002", "user_id": "U456", "date": "2024-07-01"},
+        ])
+
+        with patch.object(PartitionedStorage, "_read_partition", autospec=True,
+                          side_effect=PartitionedStorage._read_partition) as read_partition:
+            result = AttendanceManager.get_attendance_by_period("2024-06-01", "2024-06-30")
+        self.assertEqual([r["attendance_id"] for r in result], ["A002"])
+        self.assertEqual([call.args[3] for call in read_partition.call_args_list], ["2024-06"])
+
     @patch("database.data_loader.DataLoader.get_data")
     def test_get_attendance_by_user(self, mock_get_data):
         mock_attendance_records = [
@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+from core.attendance_rollups import AttendanceRollups
+from core.attendance_tracking import AttendanceManager
+from database.data_loader import DataLoader
+
+
+class TestAttendanceRollups(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.temp_dir, "classes.json"), "w") as f:
+            json.dump([{"class_id": "C1", "gym_id": "G1"}, {"class_id": "C2", "gym_id": "G2"}], f)
+        sources = {"classes": {"file": os.path.join(self.temp_dir, "classes.json"), "type": "json", "key": "class_id"}}
+        for name in ("attendance", "attendance_rollups", "attendance_archive"):
+            sources[name] = dict(DataLoader.data_sources[name], file=os.path.join(self.temp_dir, f"{name}.json"))
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+
+        # History recorded before rollups existed
+        DataLoader.save_data("attendance", [
+            {"attendance_id": "A1", "class_id": "C1", "user_id": "U1", "date": "2023-03-01", "timestamp": "09:15:00"},
+            {"attendance_id": "A2", "class_id": "C1", "user_id": "U2", "date": "2023-03-01", "timestamp": "09:40:00"},
+            {"attendance_id": "A3", "class_id": "C2", "user_id": "U1", "date": "2024-06-01", "timestamp": "18:05:00"},
+        ])
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    @patch("core.attendance_tracking.generate_unique_id", side_effect=["101", "102"])
+    def test_add_attendance_updates_rollups_incrementally(self, mock_generate_unique_id):
+        AttendanceManager.add_attendance("C1", "U3", "2023-03-01")
+        self.assertEqual(AttendanceRollups.check_ins("2023-01-01", "2024-12-31"), {"G1": 3, "G2": 1})
+
+        AttendanceManager.add_attendance("C2", "U3", "2024-06-01")
+        self.assertEqual(AttendanceRollups.check_ins("2024-06-01", by=("gym_id", "class_id")), {("G2", "C2"): 2})
+        self.assertEqual(len(DataLoader.get_data("attendance")), 5)
+
+    def test_hourly_rollups(self):
+        hours = AttendanceRollups.check_ins("2023-03-01", granularity="hour", by="hour", gym_id="G1")
+        self.assertEqual(hours, {"09": 2})
+
+    def test_retention_archives_old_rows_and_keeps_counts(self):
+        removed = AttendanceRollups.apply_retention(today=date(2024, 6, 30), retention_days=365)
+
+        self.assertEqual(removed, 2)
+        self.assertEqual([r["attendance_id"] for r in DataLoader.get_data("attendance")], ["A3"])
+        self.assertEqual([r["attendance_id"] for r in DataLoader.get_data("attendance_archive")], ["A1", "A2"])
+        self.assertEqual(AttendanceRollups.check_ins("2023-03-01"), {"G1": 2})
+
+        # Rebuilding reads the archive too
+        AttendanceRollups.rebuild()
+        self.assertEqual(AttendanceRollups.check_ins("2023-01-01", "2024-12-31"), {"G1": 2, "G2": 1})
+
+    def test_retention_delete(self):
+        AttendanceRollups.apply_retention(today=date(2024, 6, 30), retention_days=365, action="delete")
+        self.assertEqual(DataLoader.get_data("attendance_archive"), [])
+        self.assertEqual(AttendanceRollups.check_ins("2023-03-01"), {"G1": 2})
+
+        with self.assertRaises(ValueError):
+            AttendanceRollups.apply_retention(action="shred")
+
+
+if __name__ == "__main__":
+    unittest.main()
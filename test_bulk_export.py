@@ -0,0 +1,88 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from core.bulk_export import BulkExport
+from database.data_loader import DataLoader
+
+
+class TestBulkExport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        initial = {
+            "members": [
+                {"member_id": "M1", "name": "Ann", "gym_id": "G1"},
+                {"member_id": "M2", "name": "Bob", "gym_id": "G2"},
+            ],
+            "classes": [{"class_id": "C1", "class_name": "Yoga", "gym_id": "G1",
+                         "schedule": {"Monday": ["09:00"]}}],
+        }
+        sources = {}
+        for name, key in (("members", "member_id"), ("classes", "class_id")):
+            sources[name] = {"file": self.path(f"{name}.json"), "type": "json", "key": key}
+            with open(sources[name]["file"], "w") as f:
+                json.dump(initial[name], f)
+        sources["payments"] = dict(DataLoader.data_sources["payments"], file=self.path("payments.json"))
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+        DataLoader.save_data("payments", [
+            {"payment_id": f"P{i}", "member_id": "M1" if i % 2 else "M2", "amount": f"{i}.00",
+             "date": f"2024-{month:02d}-15", "status": "Paid" if i % 3 else "Pending"}
+            for i, month in enumerate(range(1, 13), start=1)
+        ])
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def test_payments_for_gym_in_quarter_as_projected_gzip_csv(self):
+        with patch.object(DataLoader, "get_data", wraps=DataLoader.get_data) as get_data:
+            count = BulkExport.export(
+                "payments", self.path("q3.csv.gz"), fields=["payment_id", "amount", "status"],
+                start_date="2024-07-01", end_date="2024-09-30", gym_id="G1"
+            )
+
+        self.assertNotIn("payments", [call.args[0] for call in get_data.call_args_list])
+        self.assertEqual(count, 2)
+        with gzip.open(self.path("q3.csv.gz"), "rt", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows, [
+            {"payment_id": "P7", "amount": "7.00", "status": "Paid"},
+            {"payment_id": "P9", "amount": "9.00", "status": "Pending"},
+        ])
+
+    def test_json_lines_with_criteria_and_predicate(self):
+        count = BulkExport.export(
+            "payments", self.path("pending.jsonl"), status="Pending", where=lambda p: float(p["amount"]) > 5
+        )
+
+        self.assertEqual(count, 3)
+        with open(self.path("pending.jsonl")) as f:
+            exported = [json.loads(line) for line in f]
+        self.assertEqual([p["payment_id"] for p in exported], ["P6", "P9", "P12"])
+        self.assertEqual(exported[0]["date"], "2024-06-15")
+
+    def test_csv_without_fields_uses_every_field_and_encodes_nested_values(self):
+        BulkExport.export("classes", self.path("classes.csv"))
+
+        with open(self.path("classes.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(list(rows[0]), ["class_id", "class_name", "gym_id", "schedule"])
+        self.assertEqual(json.loads(rows[0]["schedule"]), {"Monday": ["09:00"]})
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            BulkExport.export("payments", self.path("payments.xml"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from core.bulk_import import BulkImport
+from database.data_loader import DataLoader
+
+
+class TestBulkImport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        initial = {
+            "gyms": [{"gym_id": "G1", "gym_name": "Main Gym", "city": "London"}],
+            "members": [
+                {"member_id": "M1", "name": "Existing", "user_type": "Gym User", "gym_id": "G1",
+                 "gym_name": "Main Gym", "loyalty_points": 5},
+                {"member_id": "T1", "name": "Trainer", "user_type": "Training Staff", "gym_id": "G1"},
+            ],
+            "classes": [{"class_id": "C1", "class_name": "Yoga", "gym_id": "G1"}],
+        }
+        sources = {}
+        for name, key in (("gyms", "gym_id"), ("members", "member_id"), ("classes", "class_id")):
+            sources[name] = {"file": self.path(f"{name}.json"), "type": "json", "key": key}
+            with open(sources[name]["file"], "w") as f:
+                json.dump(initial[name], f)
+        sources["payments"] = dict(DataLoader.data_sources["payments"], file=self.path("payments.json"))
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def test_members_from_csv_with_rejected_rows(self):
+        with open(self.path("members.csv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["name", "user_type", "gym_id", "payment_type", "schedule"])
+            writer.writeheader()
+            writer.writerow({"name": "Ann", "user_type": "Gym User", "gym_id": "G1", "payment_type": "Annual"})
+            writer.writerow({"name": "", "user_type": "Gym User", "gym_id": "G9"})
+            writer.writerow({"name": "Tom", "user_type": "Training Staff", "gym_id": "G1",
+                             "schedule": json.dumps({"Monday": [{"start_time": "09:00", "end_time": "12:00"}]})})
+
+        with patch.object(DataLoader, "save_data", wraps=DataLoader.save_data) as save_data:
+            report = BulkImport.import_members(self.path("members.csv"))
+
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(save_data.call_count, 1)
+        self.assertEqual(report["rejected"][0]["row"], 2)
+        self.assertEqual(len(report["rejected"][0]["errors"]), 2)
+
+        members = {m["member_id"]: m for m in DataLoader.get_data("members")}
+        self.assertEqual(len(members), 4)
+        self.assertEqual(members[report["ids"][0]]["payment_type"], "Annual")
+        self.assertEqual(members[report["ids"][1]]["cost"], 4000)
+
+        BulkImport.write_error_report(report, self.path("rejected.csv"))
+        with open(self.path("rejected.csv")) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(rows[0]["row"], "2")
+        self.assertIn("Invalid gym ID 'G9'.", rows[0]["errors"])
+
+    def test_payments_allocate_ids_in_a_block_and_add_loyalty_points(self):
+        rows = [
+            {"member_id": "M1", "amount": "100", "date": "2024-06-01", "status": "Paid",
+             "payment_type": "Annual", "payment_method": "Direct Debit", "discount_applied": "Yes"},
+            {"member_id": "M1", "amount": "50", "date": "2024-06-02", "status": "Paid",
+             "payment_type": "Monthly", "payment_method": "Credit Card"},
+            {"member_id": "M9", "amount": "-1", "date": "June", "status": "Paid",
+             "payment_type": "Monthly", "payment_method": "Cash"},
+        ]
+        report = BulkImport.import_payments(rows)
+
+        self.assertEqual(report["ids"], ["P1", "P2"])
+        self.assertEqual(len(report["rejected"][0]["errors"]), 4)
+        self.assertEqual(DataLoader.get_data("payments")[0]["amount"], "90.00")
+        self.assertEqual(DataLoader.get_collection("members").get("M1")["loyalty_points"], 15)
+
+    def test_classes_reject_duplicates_and_dry_run_saves_nothing(self):
+        rows = [
+            {"class_name": "Spin", "trainer_id": "T1", "gym_id": "G1", "capacity": "12",
+             "schedule": {"Monday": ["10:00-11:00"]}},
+            {"class_name": "spin", "trainer_id": "T1", "gym_id": "G1", "capacity": 5, "schedule": {}},
+            {"class_name": "yoga", "trainer_id": "M1", "gym_id": "G1", "capacity": 0, "schedule": {}},
+        ]
+        report = BulkImport.import_classes(rows, dry_run=True)
+
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual([r["row"] for r in report["rejected"]], [2, 3])
+        self.assertEqual(len(report["rejected"][1]["errors"]), 3)
+        self.assertEqual(len(DataLoader.get_data("classes")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1027 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from database.data_loader import DataLoader
+from database.keyed_collection import KeyedCollection
+from database.columnar import ColumnarSnapshot
+from database.concurrency import ConflictError, FileLock, lock_path
+from database.storage import JournalStorage, JsonStorage, atomic_replace, write_atomic
+from database.mmap_storage import MmapJsonLinesStorage
+from database.sqlite_storage import SqliteStorage, migrate_json_to_sqlite
+from database.partitioned_storage import PartitionedStorage, migrate_single_files
+from database.serialization import get_codec, msgpack
+from database.streaming import convert, iter_json_array, iter_records, write_json_array
+
+
+class TestDataLoaderCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.members_file = os.path.join(self.temp_dir, "members.json")
+        with open(self.members_file, "w") as f:
+            json.dump([{"member_id": "123", "name": "John Doe"}], f)
+
+        sources = {"members": {"file": self.members_file, "type": "json"}}
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.enable_cache()
+        DataLoader.clear_cache()
+        DataLoader.reset_cache_stats()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_repeated_reads_hit_cache(self):
+        DataLoader.get_data("members")
+        DataLoader.get_data("members")
+
+        stats = DataLoader.cache_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_cached_reads_return_independent_copies(self):
+        first = DataLoader.get_data("members")
+        first[0]["name"] = "Changed"
+        first.append({"member_id": "456"})
+
+        second = DataLoader.get_data("members")
+        self.assertEqual(second, [{"member_id": "123", "name": "John Doe"}])
+
+    def test_save_data_updates_cache(self):
+        DataLoader.save_data("members", [{"member_id": "456", "name": "Jane Smith"}])
+
+        result = DataLoader.get_data("members")
+        self.assertEqual(result[0]["member_id"], "456")
+        self.assertEqual(DataLoader.cache_stats()["hits"], 1)
+
+    def test_external_change_invalidates_cache(self):
+        DataLoader.get_data("members")
+        with open(self.members_file, "w") as f:
+            json.dump([{"member_id": "789", "name": "Someone Else"}, {"member_id": "790"}], f)
+
+        result = DataLoader.get_data("members")
+        self.assertEqual([m["member_id"] for m in result], ["789", "790"])
+        self.assertEqual(DataLoader.cache_stats()["misses"], 2)
+
+    def test_disabled_cache_always_reads_file(self):
+        DataLoader.disable_cache()
+        try:
+            DataLoader.get_data("members")
+            DataLoader.get_data("members")
+            stats = DataLoader.cache_stats()
+            self.assertEqual(stats["hits"], 0)
+            self.assertEqual(stats["cached_sources"], [])
+        finally:
+            DataLoader.enable_cache()
+
+
+class TestKeyedCollection(unittest.TestCase):
+    def setUp(self):
+        self.collection = KeyedCollection("members", "member_id", [
+            {"member_id": "123", "name": "John Doe", "gym_id": "G1"},
+            {"member_id": "456", "name": "Jane Smith", "gym_id": "G2"},
+        ], indexes=["gym_id"])
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        self.collection.insert({"member_id": "789", "name": "New Member"})
+        self.collection.update("123", {"name": "John Updated"})
+        self.assertTrue(self.collection.delete("456"))
+
+        self.assertEqual(self.collection.get("789")["name"], "New Member")
+        self.assertEqual(self.collection.get("123")["name"], "John Updated")
+        self.assertIsNone(self.collection.get("456"))
+        self.assertEqual([r["member_id"] for r in self.collection.records()], ["123", "789"])
+
+    def test_secondary_index_follows_changes(self):
+        self.collection.insert({"member_id": "789", "name": "New Member", "gym_id": "G1"})
+        self.collection.update("456", {"gym_id": "G1"})
+        self.collection.delete("123")
+
+        self.assertEqual([m["member_id"] for m in self.collection.find(gym_id="G1")], ["456", "789"])
+        self.assertEqual(self.collection.count(gym_id="G2"), 0)
+        self.assertEqual(self.collection.count(gym_id="G1", name="New Member"), 1)
+
+    def test_composite_index_counts_follow_changes(self):
+        collection = KeyedCollection("registrations", "registration_id", [
+            {"registration_id": "r1", "class_id": "C1", "day": "Monday", "member_id": "123"},
+            {"registration_id": "r2", "class_id": "C1", "day": "Monday", "member_id": "456"},
+        ], indexes=[("class_id", "day")])
+        slot = ("class_id", "day")
+        self.assertEqual(collection.count_indexed(slot, ("C1", "Monday")), 2)
+
+        collection.update("r2", {"day": "Friday"})
+        collection.delete("r1")
+        self.assertEqual(collection.count_indexed(slot, ("C1", "Monday")), 0)
+        self.assertEqual(collection.count_indexed(slot, ("C1", "Friday")), 1)
+
+    def test_find_on_unindexed_field_scans(self):
+        self.assertEqual(self.collection.find(name="Jane Smith")[0]["member_id"], "456")
+
+    def test_get_returns_copy(self):
+        self.collection.get("123")["name"] = "Changed"
+        self.assertEqual(self.collection.get("123")["name"], "John Doe")
+
+    def test_duplicate_insert_rejected(self):
+        with self.assertRaises(ValueError):
+            self.collection.insert({"member_id": "123", "name": "Duplicate"})
+
+    def test_get_collection_is_reused_until_data_changes(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            members_file = os.path.join(temp_dir, "members.json")
+            sources = {"members": {"file": members_file, "type": "json", "key": "member_id"}}
+            with patch.object(DataLoader, "data_sources", sources):
+                DataLoader.clear_cache()
+                DataLoader.save_data("members", [{"member_id": "123", "name": "John Doe"}])
+                first = DataLoader.get_collection("members")
+                self.assertIs(DataLoader.get_collection("members")._records, first._records)
+
+                first.insert({"member_id": "456", "name": "Jane Smith"})
+                self.assertNotIn("456", DataLoader.get_collection("members"))
+                DataLoader.save_collection(first)
+                self.assertIs(DataLoader.get_collection("members")._records, first._records)
+                self.assertEqual(len(DataLoader.get_data("members")), 2)
+
+                first.update("456", {"name": "Jane"})
+                self.assertEqual(DataLoader.get_collection("members").get("456")["name"], "Jane Smith")
+
+                DataLoader.save_data("members", [])
+                self.assertEqual(len(DataLoader.get_collection("members")), 0)
+                DataLoader.clear_cache()
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestJournalStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.attendance_file = os.path.join(self.temp_dir, "attendance.json")
+        with open(self.attendance_file, "w") as f:
+            json.dump([{"attendance_id": "A1", "class_id": "C001", "user_id": "U123"}], f)
+
+        sources = {"attendance": {"file": self.attendance_file, "type": "journal", "key": "attendance_id"}}
+        self.storage = JournalStorage(compaction_ratio=0.5, min_compaction_entries=3, background=False)
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.backends_patch = patch.dict(DataLoader.storage_backends, {"journal": self.storage})
+        self.sources_patch.start()
+        self.backends_patch.start()
+        DataLoader.disable_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        self.backends_patch.stop()
+        DataLoader.enable_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def read_journal(self):
+        with open(JournalStorage.journal_path(DataLoader.data_sources["attendance"])) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_save_appends_only_changed_records(self):
+        records = DataLoader.get_data("attendance")
+        records.append({"attendance_id": "A2", "class_id": "C002", "user_id": "U456"})
+        DataLoader.save_data("attendance", records)
+
+        entries = self.read_journal()
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["op"], "insert")
+        self.assertEqual(entries[0]["key"], "A2")
+
+        # The base snapshot is untouched by the append
+        with open(self.attendance_file) as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_replay_applies_updates_and_deletes(self):
+        records = DataLoader.get_data("attendance")
+        records.append({"attendance_id": "A2", "class_id": "C002", "user_id": "U456"})
+        DataLoader.save_data("attendance", records)
+
+        records = DataLoader.get_data("attendance")
+        records[1]["class_id"] = "C003"
+        del records[0]
+        DataLoader.save_data("attendance", records)
+
+        # A fresh backend has no in-memory state and must rebuild from disk
+        fresh = JournalStorage()
+        result = fresh.read("attendance", DataLoader.data_sources["attendance"])
+        self.assertEqual(result, [{"attendance_id": "A2", "class_id": "C003", "user_id": "U456"}])
+
+    def test_replay_keeps_inserts_where_they_were_made(self):
+        self.storage.min_compaction_entries = 100
+        records = DataLoader.get_data("attendance")
+        records.append({"attendance_id": "A3", "class_id": "C001", "user_id": "U123"})
+        DataLoader.save_data("attendance", records)
+
+        records = DataLoader.get_data("attendance")
+        records.insert(0, {"attendance_id": "A0", "class_id": "C002", "user_id": "U456"})
+        records.insert(2, {"attendance_id": "A2", "class_id": "C002", "user_id": "U456"})
+        records.append({"attendance_id": "A4", "class_id": "C002", "user_id": "U456"})
+        del records[1]
+        DataLoader.save_data("attendance", records)
+
+        self.assertEqual([entry["op"] for entry in self.read_journal()], ["insert", "delete", "insert", "insert", "insert"])
+        fresh = JournalStorage()
+        self.assertEqual(fresh.read("attendance", DataLoader.data_sources["attendance"]), records)
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        records = DataLoader.get_data("attendance")
+        for number in range(2, 5):
+            records.append({"attendance_id": f"A{number}", "class_id": "C001", "user_id": "U123"})
+            DataLoader.save_data("attendance", records)
+
+        self.assertEqual(self.read_journal(), [])
+        with open(self.attendance_file) as f:
+            self.assertEqual([r["attendance_id"] for r in json.load(f)], ["A1", "A2", "A3", "A4"])
+        self.assertEqual(len(DataLoader.get_data("attendance")), 4)
+
+    def test_crash_during_rewrite_never_replays_old_entries(self):
+        source = DataLoader.data_sources["attendance"]
+        journal = JournalStorage.journal_path(source)
+        records = DataLoader.get_data("attendance")
+        records.append({"attendance_id": "A2", "class_id": "C002", "user_id": "U456"})
+        DataLoader.save_data("attendance", records)
+
+        real_replace = atomic_replace
+        journal_replacements = []
+
+        def crash_before_emptying_journal(path, *args):
+            if path == journal:
+                journal_replacements.append(path)
+                if len(journal_replacements) == 2:
+                    raise OSError("simulated crash")
+            return real_replace(path, *args)
+
+        # Crash after the new base is written, before the journal is emptied.
+        with patch("database.storage.atomic_replace", crash_before_emptying_journal):
+            with self.assertRaises(OSError):
+                self.storage._rewrite("attendance", source, [records[1]])
+
+        self.assertEqual(JournalStorage().read("attendance", source), [records[1]])
+
+    def test_compaction_waits_for_the_source_lock(self):
+        source = DataLoader.data_sources["attendance"]
+        records = DataLoader.get_data("attendance")
+        records.append({"attendance_id": "A2", "class_id": "C002", "user_id": "U456"})
+        DataLoader.save_data("attendance", records)
+
+        compaction = threading.Thread(target=self.storage.compact, args=("attendance", source))
+        with FileLock.for_path(lock_path(source)).exclusive():
+            compaction.start()
+            compaction.join(0.2)
+            self.assertTrue(compaction.is_alive())  # blocked while another save holds the lock
+            records.append({"attendance_id": "A3", "class_id": "C003", "user_id": "U789"})
+            DataLoader.save_data("attendance", records)
+        compaction.join(5)
+
+        self.assertEqual([r["attendance_id"] for r in JournalStorage().read("attendance", source)], ["A1", "A2", "A3"])
+
+    def test_compaction_restarts_when_rewritten_meanwhile(self):
+        source = DataLoader.data_sources["attendance"]
+        records = DataLoader.get_data("attendance")
+        records.append({"attendance_id": "A2", "class_id": "C002", "user_id": "U456"})
+        DataLoader.save_data("attendance", records)
+        rewritten = [{"attendance_id": "A9", "class_id": "C009", "user_id": "U999"}]
+
+        real_codec = JournalStorage.codec
+        calls = []
+
+        def rewrite_during_first_snapshot(source):
+            if not calls:
+                calls.append(source)
+                self.storage._rewrite("attendance", source, rewritten)
+            return real_codec(source)
+
+        with patch.object(self.storage, "codec", side_effect=rewrite_during_first_snapshot):
+            self.assertTrue(self.storage.compact("attendance", source))
+
+        self.assertEqual(JournalStorage().read("attendance", source), rewritten)
+        self.assertEqual(self.read_journal(), [])
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.temp_dir, "gym.db"))
+        sources = {
+            "attendance": {
+                "file": os.path.join(self.temp_dir, "attendance.json"),
+                "type": "sqlite",
+                "key": "attendance_id",
+                "indexes": ["class_id", "user_id", "date"],
+            }
+        }
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.backends_patch = patch.dict(DataLoader.storage_backends, {"sqlite": self.storage})
+        self.sources_patch.start()
+        self.backends_patch.start()
+        DataLoader.disable_cache()
+
+        DataLoader.save_data("attendance", [
+            {"attendance_id": "A001", "class_id": "C001", "user_id": "U123", "date": "2024-06-01"},
+            {"attendance_id": "A002", "class_id": "C001", "user_id": "U456", "date": "2024-06-02"},
+            {"attendance_id": "A003", "class_id": "C002", "user_id": "U123", "date": "2024-06-01"},
+        ])
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        self.backends_patch.stop()
+        DataLoader.enable_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip_preserves_order_after_changes(self):
+        records = DataLoader.get_data("attendance")
+        del records[0]
+        records[0]["date"] = "2024-06-03"
+        records.append({"attendance_id": "A004", "class_id": "C003", "user_id": "U789", "date": "2024-06-04"})
+        DataLoader.save_data("attendance", records)
+
+        result = DataLoader.get_data("attendance")
+        self.assertEqual([r["attendance_id"] for r in result], ["A002", "A003", "A004"])
+        self.assertEqual(result[0]["date"], "2024-06-03")
+
+    def test_find_pushes_filters_to_indexed_query(self):
+        result = DataLoader.find("attendance", class_id="C001", date="2024-06-01")
+        self.assertEqual([r["attendance_id"] for r in result], ["A001"])
+
+        plan = self.storage.explain("attendance", DataLoader.data_sources["attendance"], {"class_id": "C001", "date": "2024-06-01"})
+        self.assertTrue(any("USING INDEX" in step for step in plan))
+
+    def test_migration_imports_json_files(self):
+        members_file = os.path.join(self.temp_dir, "members.json")
+        with open(members_file, "w") as f:
+            json.dump([{"member_id": "123", "name": "John Doe", "gym_id": "G1"}], f)
+        DataLoader.data_sources["members"] = {
+            "file": members_file, "type": "json", "key": "member_id", "indexes": ["gym_id"]
+        }
+
+        imported = migrate_json_to_sqlite(["members"], os.path.join(self.temp_dir, "gym.db"))
+        self.assertEqual(imported, {"members": 1})
+        self.assertEqual(
+            self.storage.query("members", DataLoader.data_sources["members"], {"gym_id": "G1"})[0]["name"],
+            "John Doe",
+        )
+
+    def test_migration_reads_each_source_through_its_storage(self):
+        DataLoader.data_sources["registrations"] = {
+            "file": os.path.join(self.temp_dir, "registrations.json"), "type": "journal", "key": "registration_id"
+        }
+        DataLoader.data_sources["payments"] = {
+            "file": os.path.join(self.temp_dir, "payments.json"), "type": "partitioned",
+            "partition_by": "date", "key": "payment_id",
+        }
+        DataLoader.data_sources["gyms"] = {"file": os.path.join(self.temp_dir, "gyms.json"), "type": "json",
+                                           "key": "gym_id"}
+        journal = JournalStorage(background=False)
+        with patch.dict(DataLoader.storage_backends, {"journal": journal}):
+            DataLoader.save_data("registrations", [{"registration_id": "R1"}])
+            DataLoader.save_data("registrations", [{"registration_id": "R1"}, {"registration_id": "R2"}])
+            DataLoader.save_data("payments", [{"payment_id": "P1", "date": "2024-06-01"}])
+
+            imported = migrate_json_to_sqlite(database=os.path.join(self.temp_dir, "gym.db"))
+            self.assertEqual(imported, {"registrations": 2, "payments": 1})
+            with self.assertRaises(ValueError):
+                migrate_json_to_sqlite(["gyms"], os.path.join(self.temp_dir, "gym.db"))
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.records = [
+            {"attendance_id": "A001", "class_id": "C001", "user_id": "U123", "date": "2024-06-01"},
+            {"attendance_id": "A002", "class_id": "C002", "user_id": "U456", "cost": 12.5},
+        ]
+        self.array_file = os.path.join(self.temp_dir, "attendance.json")
+        with open(self.array_file, "w") as f:
+            json.dump(self.records, f, indent=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_array_is_parsed_across_chunk_boundaries(self):
+        for chunk_size in (1, 3, 7, 1024):
+            self.assertEqual(list(iter_json_array(self.array_file, chunk_size=chunk_size)), self.records)
+
+    def test_array_writer_matches_existing_layout(self):
+        target = os.path.join(self.temp_dir, "copy.json")
+        write_json_array(target, iter(self.records))
+        with open(target) as f:
+            self.assertEqual(f.read(), json.dumps(self.records, indent=4))
+
+    def test_convert_round_trip(self):
+        lines_file = os.path.join(self.temp_dir, "attendance.jsonl")
+        back_file = os.path.join(self.temp_dir, "attendance_back.json")
+        self.assertEqual(convert(self.array_file, lines_file, to="jsonl"), 2)
+        with open(lines_file) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        convert(lines_file, back_file, to="json")
+        self.assertEqual(list(iter_records(back_file)), self.records)
+
+    def test_iter_data_streams_jsonl_source(self):
+        lines_file = os.path.join(self.temp_dir, "attendance.jsonl")
+        sources = {"attendance": {"file": lines_file, "type": "jsonl", "key": "attendance_id"}}
+        with patch.object(DataLoader, "data_sources", sources):
+            DataLoader.save_data("attendance", self.records)
+            self.assertEqual(list(DataLoader.iter_data("attendance")), self.records)
+            DataLoader.clear_cache()
+
+
+class TestCodecs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.members_file = os.path.join(self.temp_dir, "members.json")
+        self.records = [{"member_id": "123", "name": "John Doe", "schedule": {"Monday": ["10:00-11:00"]}}]
+        sources = {"members": {"file": self.members_file, "type": "json", "key": "member_id"}}
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.disable_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.enable_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_default_codec_keeps_pretty_layout(self):
+        DataLoader.save_data("members", self.records)
+        with open(self.members_file) as f:
+            self.assertEqual(f.read(), json.dumps(self.records, indent=4))
+
+    def test_set_codec_rewrites_compact_and_reads_back(self):
+        DataLoader.save_data("members", self.records)
+        for codec in ("compact", "fast"):
+            DataLoader.set_codec("members", codec)
+            with open(self.members_file) as f:
+                self.assertNotIn("\n", f.read())
+            self.assertEqual(DataLoader.get_data("members"), self.records)
+
+    def test_unknown_codec_rejected(self):
+        with self.assertRaises(ValueError):
+            DataLoader.set_codec("members", "yaml")
+
+    @unittest.skipIf(msgpack is not None, "msgpack is installed")
+    def test_msgpack_without_package_raises(self):
+        with self.assertRaises(ImportError):
+            get_codec("msgpack").dumps(self.records)
+
+    @unittest.skipIf(msgpack is not None, "msgpack is installed")
+    def test_msgpack_file_is_kept_when_package_is_missing(self):
+        msgpack_file = os.path.join(self.temp_dir, "members.msgpack")
+        with open(msgpack_file, "wb") as f:
+            f.write(b"\x91\x81\xa9member_id\xa3123")  # [{"member_id": "123"}]
+        source = {"file": msgpack_file, "type": "json", "key": "member_id", "codec": "msgpack"}
+        with patch.dict(DataLoader.data_sources, {"members": source}):
+            with self.assertRaises(ImportError):
+                DataLoader.get_data("members")
+        self.assertTrue(os.path.exists(msgpack_file))
+        self.assertFalse(os.path.exists(msgpack_file + ".corrupt"))
+
+
+class TestDurableWrites(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.payments_file = os.path.join(self.temp_dir, "payments.json")
+        with open(self.payments_file, "w") as f:
+            json.dump([{"payment_id": "P1", "amount": "10.00"}], f)
+        sources = {"payments": {"file": self.payments_file, "type": "json", "key": "payment_id"}}
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.disable_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.enable_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_failed_write_leaves_original_file(self):
+        with self.assertRaises(RuntimeError):
+            with atomic_replace(self.payments_file) as temp_path:
+                with open(temp_path, "w") as f:
+                    f.write('[{"payment_id": "P')
+                raise RuntimeError("crash mid-write")
+
+        self.assertEqual(DataLoader.get_data("payments"), [{"payment_id": "P1", "amount": "10.00"}])
+        self.assertEqual(os.listdir(self.temp_dir), ["payments.json"])
+
+    def test_malformed_file_is_kept_aside(self):
+        with open(self.payments_file, "w") as f:
+            f.write('[{"payment_id": "P1", "amo')
+
+        self.assertEqual(DataLoader.get_data("payments"), [])
+        self.assertTrue(os.path.exists(self.payments_file + ".corrupt"))
+
+    def test_group_commit_coalesces_saves(self):
+        with patch.object(JsonStorage, "write", autospec=True, side_effect=JsonStorage.write) as write:
+            with DataLoader.group_commit():
+                for number in range(2, 5):
+                    payments = DataLoader.get_data("payments")
+                    payments.append({"payment_id": f"P{number}", "amount": "10.00"})
+                    DataLoader.save_data("payments", payments)
+                self.assertEqual(len(DataLoader.get_data("payments")), 4)
+                write.assert_not_called()
+
+        self.assertEqual(write.call_count, 1)
+        with open(self.payments_file) as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+
+class TestTransactions(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        sources = {}
+        for name, key in (("members", "member_id"), ("payments", "payment_id")):
+            sources[name] = {"file": os.path.join(self.temp_dir, f"{name}.json"), "type": "json", "key": key}
+            with open(sources[name]["file"], "w") as f:
+                json.dump([], f)
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.disable_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.enable_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def add_member_and_payment(self):
+        members = DataLoader.get_data("members")
+        members.append({"member_id": "123", "loyalty_points": 10})
+        DataLoader.save_data("members", members)
+        payments = DataLoader.get_data("payments")
+        payments.append({"payment_id": "P1", "member_id": "123"})
+        DataLoader.save_data("payments", payments)
+
+    def test_commit_reads_and_writes_each_collection_once(self):
+        with patch.object(JsonStorage, "read", autospec=True, side_effect=JsonStorage.read) as read, \
+                patch.object(JsonStorage, "write", autospec=True, side_effect=JsonStorage.write) as write:
+            with DataLoader.transaction():
+                DataLoader.get_data("members")
+                DataLoader.get_data("payments")
+                self.add_member_and_payment()
+                DataLoader.get_data("members")
+
+        self.assertEqual(read.call_count, 2)
+        self.assertEqual(write.call_count, 2)
+        self.assertEqual(len(DataLoader.get_data("members")), 1)
+        self.assertEqual(len(DataLoader.get_data("payments")), 1)
+
+    def test_exception_discards_staged_changes(self):
+        with self.assertRaises(ValueError):
+            with DataLoader.transaction():
+                self.add_member_and_payment()
+                raise ValueError("payment rejected")
+
+        self.assertEqual(DataLoader.get_data("members"), [])
+        self.assertEqual(DataLoader.get_data("payments"), [])
+
+    def test_nested_transaction_rolls_back_to_savepoint(self):
+        with DataLoader.transaction():
+            DataLoader.save_data("members", [{"member_id": "123"}])
+            try:
+                with DataLoader.transaction():
+                    DataLoader.save_data("members", [])
+                    raise ValueError("inner failure")
+            except ValueError:
+                pass
+
+        self.assertEqual(DataLoader.get_data("members"), [{"member_id": "123"}])
+
+
+class TestChangeEvents(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.temp_dir, "members.json")
+        with open(self.file, "w") as f:
+            json.dump([{"member_id": "123", "name": "John Doe"}, {"member_id": "456", "name": "Jane Smith"}], f)
+        sources = {"members": {"file": self.file, "type": "json", "key": "member_id"}}
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+        self.received = []
+        self.unsubscribe = DataLoader.subscribe("members", self.received.append)
+
+    def tearDown(self):
+        self.unsubscribe()
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_publishes_one_change_per_record(self):
+        members = DataLoader.get_data("members")
+        members[0]["name"] = "John Updated"
+        del members[1]
+        members.append({"member_id": "789", "name": "New Member"})
+        DataLoader.save_data("members", members)
+
+        self.assertEqual(len(self.received), 1)
+        changes = {change.key: change for change in self.received[0]}
+        self.assertEqual({key: change.action for key, change in changes.items()},
+                         {"123": "update", "456": "delete", "789": "insert"})
+        self.assertEqual(changes["123"].previous["name"], "John Doe")
+        self.assertEqual(changes["123"].record["name"], "John Updated")
+        self.assertIsNone(changes["456"].record)
+
+    def test_transaction_publishes_on_commit(self):
+        with DataLoader.transaction():
+            DataLoader.save_data("members", [])
+            self.assertEqual(self.received, [])
+        self.assertEqual(sorted(change.key for change in self.received[0]), ["123", "456"])
+
+    def test_unsubscribed_listener_is_not_called(self):
+        self.unsubscribe()
+        DataLoader.save_data("members", [])
+        self.assertEqual(self.received, [])
+        self.assertFalse(DataLoader.changes.has_subscribers("members"))
+
+    def test_unknown_source_raises(self):
+        with self.assertRaises(ValueError):
+            DataLoader.subscribe("unknown", self.received.append)
+
+
+class TestSharedAccess(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.classes_file = os.path.join(self.temp_dir, "classes.json")
+        self.source = {"file": self.classes_file, "type": "json", "key": "class_id"}
+        with open(self.classes_file, "w") as f:
+            json.dump([{"class_id": "C1", "capacity": 10}, {"class_id": "C2", "capacity": 10}], f)
+        self.sources_patch = patch.object(DataLoader, "data_sources", {"classes": self.source})
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+        DataLoader.enable_shared_access()
+
+    def tearDown(self):
+        DataLoader.disable_shared_access()
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def other_desk_sets_capacity(self, class_id, capacity):
+        """Simulate another process saving the file behind this process's back."""
+        storage = JsonStorage()
+        records = storage.read("classes", self.source)
+        next(r for r in records if r["class_id"] == class_id)["capacity"] = capacity
+        storage.write("classes", self.source, records)
+
+    def test_changes_to_different_records_are_merged(self):
+        classes = DataLoader.get_data("classes")
+        self.other_desk_sets_capacity("C2", 20)
+        classes[0]["capacity"] = 15
+        classes.append({"class_id": "C3", "capacity": 5})
+        DataLoader.save_data("classes", classes)
+
+        self.assertEqual(
+            DataLoader.get_data("classes"),
+            [{"class_id": "C1", "capacity": 15}, {"class_id": "C2", "capacity": 20}, {"class_id": "C3", "capacity": 5}],
+        )
+        self.assertTrue(os.path.exists(self.classes_file + ".lock"))
+
+    def test_changes_to_same_record_conflict(self):
+        classes = DataLoader.get_data("classes")
+        self.other_desk_sets_capacity("C1", 20)
+        classes[0]["capacity"] = 15
+
+        with self.assertRaises(ConflictError):
+            DataLoader.save_data("classes", classes)
+        self.assertEqual(DataLoader.get_data("classes")[0]["capacity"], 20)
+
+    def test_retry_on_conflict_reruns_operation(self):
+        attempts = []
+
+        @DataLoader.retry_on_conflict()
+        def add_one():
+            classes = DataLoader.get_data("classes")
+            if not attempts:
+                self.other_desk_sets_capacity("C1", 20)
+            attempts.append(1)
+            classes[0]["capacity"] += 1
+            DataLoader.save_data("classes", classes)
+
+        add_one()
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(DataLoader.get_data("classes")[0]["capacity"], 21)
+
+
+class TestPartitionedStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = {
+            "file": os.path.join(self.temp_dir, "payments.json"), "type": "partitioned",
+            "partition_by": "date", "key": "payment_id",
+        }
+        with open(self.source["file"], "w") as f:
+            json.dump([
+                {"payment_id": "P1", "date": "2024-05-03", "amount": "10.00"},
+                {"payment_id": "P2", "date": "2024-06-18", "amount": "20.00"},
+                {"payment_id": "P3", "date": "", "amount": "30.00"},
+            ], f)
+        self.sources_patch = patch.object(DataLoader, "data_sources", {"payments": self.source})
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def partition(self, name):
+        return os.path.join(self.temp_dir, "payments", f"{name}.json")
+
+    def test_single_file_is_kept_until_migrated(self):
+        payments = DataLoader.get_data("payments")
+        payments.insert(0, {"payment_id": "P4", "date": "2024-06-20", "amount": "40.00"})
+        DataLoader.save_data("payments", payments)
+
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "payments")))
+        DataLoader.clear_cache()
+        self.assertEqual([p["payment_id"] for p in DataLoader.get_data("payments")], ["P4", "P1", "P2", "P3"])
+        self.assertEqual([p["payment_id"] for p in DataLoader.get_period("payments", "2024-06-01", "2024-06-30")],
+                         ["P4", "P2"])
+
+    def test_migration_splits_by_month(self):
+        DataLoader.get_data("payments")
+        self.assertEqual(migrate_single_files(), {"payments": 3})
+        for name in ("2024-05", "2024-06", "undated"):
+            self.assertTrue(os.path.exists(self.partition(name)))
+        self.assertFalse(os.path.exists(self.source["file"]))
+        self.assertTrue(os.path.exists(self.source["file"] + ".imported"))
+        self.assertEqual(DataLoader.get_period("payments", "2024-06-01", "2024-06-30")[0]["payment_id"], "P2")
+        self.assertEqual(migrate_single_files(), {})
+        with self.assertRaises(ValueError):
+            migrate_single_files(["members"])
+
+    def test_save_rewrites_only_changed_partitions(self):
+        migrate_single_files()
+        payments = DataLoader.get_data("payments")
+        before = {name: os.stat(self.partition(name)).st_mtime_ns for name in ("2024-05", "undated")}
+        payments.append({"payment_id": "P4", "date": "2024-06-20", "amount": "40.00"})
+        with patch("database.partitioned_storage.write_atomic", wraps=write_atomic) as write:
+            DataLoader.save_data("payments", payments)
+
+        written = sorted(os.path.basename(call.args[0]) for call in write.call_args_list)
+        self.assertEqual(written, ["2024-06.json", "manifest.json"])
+        self.assertEqual({name: os.stat(self.partition(name)).st_mtime_ns for name in before}, before)
+        self.assertEqual(len(DataLoader.find("payments", date="2024-06-20")), 1)
+
+    def test_save_digests_only_changed_partitions(self):
+        migrate_single_files()
+        payments = DataLoader.get_data("payments")
+        payments.append({"payment_id": "P4", "date": "2024-06-20", "amount": "40.00"})
+        with patch.object(PartitionedStorage, "_digest", wraps=PartitionedStorage._digest) as digest:
+            DataLoader.save_data("payments", payments)
+            payments[0]["amount"] = "11.00"
+            DataLoader.save_data("payments", payments)
+
+        self.assertEqual(digest.call_count, 2)  # 2024-06, then 2024-05
+        DataLoader.clear_cache()
+        self.assertEqual(DataLoader.get_record("payments", "P1")["amount"], "11.00")
+
+    def test_lost_manifest_is_rebuilt(self):
+        migrate_single_files()
+        os.remove(os.path.join(self.temp_dir, "payments", "manifest.json"))
+        DataLoader.clear_cache()
+        self.assertEqual(sorted(p["payment_id"] for p in DataLoader.get_data("payments")), ["P1", "P2", "P3"])
+
+    def test_emptied_partition_is_removed(self):
+        migrate_single_files()
+        payments = DataLoader.get_data("payments")
+        payments[0]["date"] = "2024-06-01"
+        DataLoader.save_data("payments", payments)
+
+        self.assertFalse(os.path.exists(self.partition("2024-05")))
+        DataLoader.clear_cache()
+        self.assertEqual([p["payment_id"] for p in DataLoader.get_period("payments", "2024-06-01", "2024-06-30")],
+                         ["P1", "P2"])
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        sources = {
+            "members": {"file": os.path.join(self.temp_dir, "members.json"), "type": "json",
+                        "key": "member_id", "indexes": ["gym_id"]},
+            "payments": {"file": os.path.join(self.temp_dir, "payments.json"), "type": "partitioned",
+                         "partition_by": "date", "key": "payment_id"},
+        }
+        with open(sources["members"]["file"], "w") as f:
+            json.dump([
+                {"member_id": "M1", "name": "Ann Lee", "gym_id": "G1"},
+                {"member_id": "M2", "name": "Bob Ray", "gym_id": "G2"},
+                {"member_id": "M3", "name": "Anna Bell", "gym_id": "G1"},
+            ], f)
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+        DataLoader.save_data("payments", [
+            {"payment_id": f"P{month}", "date": f"2024-{month:02d}-10", "amount": month * 10.0,
+             "status": "Paid" if month % 2 else "Pending"}
+            for month in range(1, 13)
+        ])
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_equality_uses_secondary_index(self):
+        plan = DataLoader.query("members", {"gym_id": "G1", "name": ("icontains", "ann")}, explain=True)
+        self.assertEqual((plan["access"], plan["index"]), ("index", "gym_id"))
+
+        result = DataLoader.query("members", {"gym_id": "G1", "name": ("icontains", "ann")}, project=["member_id"])
+        self.assertEqual(result, [{"member_id": "M1"}, {"member_id": "M3"}])
+
+    def test_unindexed_condition_scans(self):
+        plan = DataLoader.query("members", {"name": ("iequals", "BOB RAY")}, explain=True)
+        self.assertEqual((plan["access"], plan["index"]), ("scan", None))
+        self.assertEqual(DataLoader.query("members", {"name": ("iequals", "BOB RAY")})[0]["member_id"], "M2")
+
+    def test_date_range_reads_only_overlapping_partitions(self):
+        where = {"date": ("between", "2024-07-01", "2024-09-30"), "status": "Paid"}
+        self.assertEqual(DataLoader.query("payments", where, explain=True)["partitions"], ("2024-07-01", "2024-09-30"))
+
+        with patch.object(DataLoader, "get_data", side_effect=AssertionError("read every partition")):
+            result = DataLoader.query("payments", where, project=["payment_id", "amount"], order_by="-amount")
+        self.assertEqual(result, [{"payment_id": "P9", "amount": 90.0}, {"payment_id": "P7", "amount": 70.0}])
+
+    def test_order_by_and_limit(self):
+        result = DataLoader.query("payments", {"amount": (">", 25)}, order_by=["status", "-date"], limit=3)
+        self.assertEqual([p["payment_id"] for p in result], ["P11", "P9", "P7"])
+
+    def test_between_needs_both_bounds(self):
+        with self.assertRaises(ValueError):
+            DataLoader.query("payments", {"date": ("between", "2024-01-01")})
+
+
+class TestReadSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        sources = {}
+        for name, key in (("members", "member_id"), ("classes", "class_id")):
+            sources[name] = {"file": os.path.join(self.temp_dir, f"{name}.json"), "type": "json",
+                             "key": key, "indexes": ["gym_id"]}
+            with open(sources[name]["file"], "w") as f:
+                json.dump([{key: f"{name[0].upper()}1", "gym_id": "G1", "name": "original"}], f)
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def rename(self, source_name, name):
+        records = DataLoader.get_data(source_name)
+        records[0]["name"] = name
+        DataLoader.save_data(source_name, records)
+
+    def test_saves_after_the_snapshot_are_not_seen(self):
+        DataLoader.get_data("members")  # cached: pinned when the snapshot is taken
+        with DataLoader.read_snapshot() as snapshot:
+            self.rename("members", "changed")
+            self.rename("classes", "changed")  # not read yet: the save hands over the old version
+
+            self.assertEqual(snapshot.get_data("members")[0]["name"], "original")
+            self.assertEqual(snapshot.get_record("classes", "C1")["name"], "original")
+            self.assertEqual(snapshot.query("members", {"gym_id": "G1"}, project=["name"]), [{"name": "original"}])
+            self.assertEqual(DataLoader.get_data("members")[0]["name"], "changed")
+            self.assertEqual(DataLoader.read_snapshot().version, snapshot.version + 2)
+
+    def test_taking_a_snapshot_reads_nothing(self):
+        with patch.object(JsonStorage, "read", autospec=True, side_effect=JsonStorage.read) as read:
+            snapshot = DataLoader.read_snapshot()
+            self.assertEqual(read.call_count, 0)
+            snapshot.get_data("members")
+            snapshot.get_data("members")
+            self.assertEqual(read.call_count, 1)
+        snapshot.close()
+
+        with self.assertRaises(ValueError):
+            snapshot.get_data("members")
+        self.assertNotIn(snapshot, DataLoader._open_read_snapshots)
+
+    def test_snapshot_copies_are_independent(self):
+        with DataLoader.read_snapshot() as snapshot:
+            snapshot.get_data("members")[0]["name"] = "scribbled"
+            self.assertEqual(snapshot.get_data("members")[0]["name"], "original")
+
+
+class TestMmapStorage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = {
+            "file": os.path.join(self.temp_dir, "payments.jsonl"),
+            "type": "mmap",
+            "key": "payment_id",
+            "indexes": ["member_id", "date"],
+        }
+        self.storage = MmapJsonLinesStorage()
+        self.sources_patch = patch.object(DataLoader, "data_sources", {"payments": self.source})
+        self.backends_patch = patch.dict(DataLoader.storage_backends, {"mmap": self.storage})
+        self.sources_patch.start()
+        self.backends_patch.start()
+        DataLoader.disable_cache()
+        DataLoader.save_data("payments", [
+            {"payment_id": "P1", "member_id": "123", "date": "2024-06-01", "amount": "30.00"},
+            {"payment_id": "P2", "member_id": "456", "date": "2024-06-01", "amount": "80.00"},
+            {"payment_id": "P3", "member_id": "123", "date": "2024-07-01", "amount": "30.00"},
+        ])
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        self.backends_patch.stop()
+        DataLoader.enable_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_point_and_indexed_lookups(self):
+        self.assertEqual(DataLoader.get_record("payments", "P2")["amount"], "80.00")
+        self.assertIsNone(DataLoader.get_record("payments", "P9"))
+        self.assertEqual([p["payment_id"] for p in DataLoader.find("payments", member_id="123")], ["P1", "P3"])
+        self.assertEqual([p["payment_id"] for p in DataLoader.find("payments", amount="30.00")], ["P1", "P3"])
+
+    def test_sidecar_index_is_reused_by_other_processes(self):
+        fresh = MmapJsonLinesStorage()
+        with patch.object(MmapJsonLinesStorage, "_scan") as scan:
+            self.assertEqual(fresh.get("payments", self.source, "P3")["date"], "2024-07-01")
+            scan.assert_not_called()
+
+    def test_stale_index_is_rebuilt(self):
+        with open(self.source["file"], "a") as f:
+            f.write(json.dumps({"payment_id": "P4", "member_id": "456"}) + "\n")
+
+        self.assertEqual(MmapJsonLinesStorage().get("payments", self.source, "P4")["member_id"], "456")
+        self.assertEqual(len(self.storage.query("payments", self.source, {"member_id": "456"})), 2)
+
+
+class TestColumnarSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = {
+            "file": os.path.join(self.temp_dir, "payments.json"),
+            "type": "json",
+            "key": "payment_id",
+            "columns": {"numeric": ["amount"], "categorical": ["member_id", "status"], "dates": ["date"]},
+        }
+        self.payments = [
+            {"payment_id": "P1", "member_id": "123", "amount": "30.00", "date": "2024-06-01", "status": "Paid"},
+            {"payment_id": "P2", "member_id": "456", "amount": "80.50", "date": "2024-06-15", "status": "Pending"},
+            {"payment_id": "P3", "member_id": "123", "amount": "30.00", "date": "2024-07-01", "status": "Paid"},
+            {"payment_id": "P4", "member_id": "789", "amount": "", "date": "", "status": "Paid"},
+        ]
+        with open(self.source["file"], "w") as f:
+            json.dump(self.payments, f)
+        self.sources_patch = patch.object(DataLoader, "data_sources", {"payments": self.source})
+        self.sources_patch.start()
+        DataLoader.enable_cache()
+        DataLoader.clear_cache()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_filters_and_group_by(self):
+        snapshot = ColumnarSnapshot(self.payments, **self.source["columns"])
+        self.assertEqual(len(snapshot), 4)
+        self.assertEqual(snapshot.sum("amount", where={"status": "Paid"}), 60.0)
+        self.assertEqual(snapshot.sum("amount", where={"member_id": ["123", "456", "000"]}), 140.5)
+        self.assertEqual(snapshot.count(where={"date": ("2024-06-01", "2024-06-30")}), 2)
+
+        gyms = snapshot.translate("member_id", {"123": "G1", "456": "G1", "789": "G2"})
+        self.assertEqual(snapshot.group_sum(by=(gyms, "status"), value="amount"), {
+            ("G1", "Paid"): {"count": 2, "amount": 60.0},
+            ("G1", "Pending"): {"count": 1, "amount": 80.5},
+            ("G2", "Paid"): {"count": 1, "amount": 0.0},
+        })
+        self.assertEqual(snapshot.group_sum(by="status", where={"member_id": "123"}), {"Paid": {"count": 2}})
+
+    def test_malformed_amounts_are_reported_not_zeroed(self):
+        self.payments.append({"payment_id": "P5", "member_id": "456", "amount": "12,50", "status": "Paid"})
+        snapshot = ColumnarSnapshot(self.payments, **self.source["columns"])
+
+        self.assertEqual(snapshot.malformed, {"amount": 1})
+        self.assertEqual(snapshot.sum("amount", where={"member_id": "123"}), 60.0)
+        with self.assertRaises(ValueError):
+            snapshot.sum("amount", where={"status": "Paid"})
+        with self.assertRaises(ValueError):
+            snapshot.group_sum(by="member_id", value="amount")
+
+    def test_snapshot_is_rebuilt_only_when_data_changes(self):
+        first = DataLoader.get_snapshot("payments")
+        self.assertIs(DataLoader.get_snapshot("payments"), first)
+
+        DataLoader.save_data("payments", self.payments[:2])
+        second = DataLoader.get_snapshot("payments")
+        self.assertIsNot(second, first)
+        self.assertEqual(second.sum("amount"), 110.5)
+
+    def test_source_without_columns_is_rejected(self):
+        del self.source["columns"]
+        with self.assertRaises(ValueError):
+            DataLoader.get_snapshot("payments")
+
+
+if __name__ == "__main__":
+    unittest.main()
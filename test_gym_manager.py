@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 from database.data_loader import DataLoader
 from core.member_management import MemberManagement  # Or GymManager, depending on your setup
+from core.gym_management import GymManager
 
 class TestViewAllMembers(unittest.TestCase):
 
@@ -29,5 +30,45 @@ class TestViewAllMembers(unittest.TestCase):
         return valid_members
 
 
+class TestViewAllGyms(unittest.TestCase):
+    def setUp(self):
+        # Mocked get_data results must not be served from, or leak into, the snapshot cache
+        DataLoader.disable_cache()
+
+    def tearDown(self):
+        DataLoader.enable_cache()
+
+    @patch("database.data_loader.DataLoader.get_data")
+    def test_view_all_gyms_aggregates_members_revenue_and_staff(self, mock_get_data):
+        data = {
+            "gyms": [
+                {"gym_id": "G1", "gym_name": "Gym A", "manager_name": "M", "manager_contact": "1", "manager_email": "a@x"},
+                {"gym_id": "G2", "gym_name": "Gym B", "manager_name": "N", "manager_contact": "2", "manager_email": "b@x"},
+            ],
+            "locations": [{"location_id": "G1", "city": "London", "zones": ["Cardio"]}],
+            "members": [
+                {"member_id": "123", "gym_id": "G1", "user_type": "Gym User", "cost": 200},
+                {"member_id": "456", "gym_id": "G1", "user_type": "Training Staff", "cost": 4000},
+                {"member_id": "789", "gym_id": "G2", "user_type": "Gym User", "cost": 80},
+            ],
+            "payments": [
+                {"payment_id": "P1", "member_id": "123", "amount": "100.00", "status": "Paid"},
+                {"payment_id": "P2", "member_id": "123", "amount": "50.00", "status": "Pending"},
+                {"payment_id": "P3", "member_id": "789", "amount": "80.00", "status": "Paid"},
+            ],
+        }
+        mock_get_data.side_effect = lambda key: data.get(key, [])
+
+        gyms = {g["gym_id"]: g for g in GymManager.view_all_gyms()}
+
+        self.assertEqual(gyms["G1"]["total_members"], 2)
+        self.assertEqual(gyms["G1"]["revenue"], {"Total Paid": 100.0, "Total Pending": 50.0})
+        self.assertEqual(gyms["G1"]["activities"]["Training Staff"], {"count": 1, "cost": 4000.0})
+        self.assertEqual(gyms["G1"]["activities"]["Wellbeing Staff"], {"count": 0, "cost": 0.0})
+        self.assertEqual(gyms["G1"]["zones"], ["Cardio"])
+        self.assertEqual(gyms["G2"]["revenue"]["Total Paid"], 80.0)
+        self.assertEqual(gyms["G2"]["city"], "Unknown")
+
+
 if __name__ == "__main__":
     unittest.main()
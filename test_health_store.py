@@ -0,0 +1,122 @@
+import base64
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from database.health_store import HealthStore
+
+
+class ReversingCipher:
+    """Stands in for Fernet: reversible, and the plain text never appears in the file."""
+
+    def encrypt(self, data):
+        return base64.urlsafe_b64encode(data[::-1])
+
+    def decrypt(self, token):
+        return base64.urlsafe_b64decode(token)[::-1]
+
+
+class TestHealthStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "health_records.dat")
+        self.cipher = ReversingCipher()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def open_store(self, **options):
+        return HealthStore(self.path, self.cipher, b"index-key", fsync=False, **options)
+
+    def test_profiles_survive_reopening_and_hide_member_ids(self):
+        store = self.open_store()
+        store.put("M1", {"gender": "Female", "height_cm": 170})
+        store.put("M2", {"gender": "Male"})
+        store.put("M1", {"gender": "Female", "height_cm": 171})
+
+        reopened = self.open_store()
+        self.assertEqual(reopened.get("M1"), {"gender": "Female", "height_cm": 171})
+        self.assertEqual(reopened.get("M2"), {"gender": "Male"})
+        self.assertEqual(reopened.get("M3", {}), {})
+        self.assertEqual(dict(reopened.profiles()), {"M1": {"gender": "Female", "height_cm": 171},
+                                                    "M2": {"gender": "Male"}})
+        with open(self.path, "rb") as f:
+            contents = f.read()
+        self.assertNotIn(b"M1", contents)
+        self.assertNotIn(b"Female", contents)
+
+    def test_reads_decrypt_one_record_and_are_cached(self):
+        store = self.open_store(cache_size=1)
+        store.put_many({f"M{i}": {"n": i} for i in range(50)})
+        store.clear_cache()
+
+        with patch.object(self.cipher, "decrypt", wraps=self.cipher.decrypt) as decrypt:
+            self.assertEqual(store.get("M7"), {"n": 7})
+            self.assertEqual(store.get("M7"), {"n": 7})
+            self.assertEqual(decrypt.call_count, 1)
+            store.get("M8")  # evicts M7
+            store.get("M7")
+            self.assertEqual(decrypt.call_count, 3)
+
+        profile = store.get("M7")
+        profile["n"] = -1
+        self.assertEqual(store.get("M7"), {"n": 7})
+
+    def test_other_processes_changes_are_picked_up(self):
+        reader = self.open_store()
+        writer = self.open_store()
+        writer.put("M1", {"n": 1})
+        self.assertEqual(reader.get("M1"), {"n": 1})
+
+        writer.put("M1", {"n": 2})
+        self.assertEqual(reader.get("M1"), {"n": 2})
+        self.assertTrue(writer.delete("M1"))
+        self.assertIsNone(reader.get("M1"))
+
+    def test_delete_removes_every_version_from_the_file(self):
+        store = self.open_store()
+        store.put("M1", {"condition": "asthma"})
+        store.put("M1", {"condition": "asthma, treated"})
+        store.put("M2", {"condition": "none"})
+        with open(self.path, "rb") as f:
+            tokens = [line.split(b" ")[1] for line in f.read().splitlines()[:2]]
+
+        self.assertTrue(store.delete("M1"))
+        self.assertFalse(store.delete("M1"))
+        with open(self.path, "rb") as f:
+            contents = f.read()
+        for token in tokens:
+            self.assertNotIn(token, contents)
+        self.assertIsNone(self.open_store().get("M1"))
+        self.assertEqual(self.open_store().get("M2"), {"condition": "none"})
+
+    def test_compaction_keeps_live_profiles(self):
+        store = self.open_store(min_compaction_bytes=0)
+        reader = self.open_store()
+        for i in range(20):
+            store.put("M1", {"n": i})
+        store.put("M2", {"n": 0})
+        self.assertEqual(reader.get("M1"), {"n": 19})
+
+        store.compact()
+        with open(self.path, "rb") as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(reader.get("M1"), {"n": 19})
+        self.assertEqual(self.open_store().get("M2"), {"n": 0})
+
+    def test_incomplete_last_line_is_ignored_and_replaced(self):
+        store = self.open_store()
+        store.put("M1", {"n": 1})
+        with open(self.path, "ab") as f:
+            f.write(b"0123456789abcdef partial")
+
+        reopened = self.open_store()
+        self.assertEqual(len(reopened), 1)
+        reopened.put("M2", {"n": 2})
+        self.assertEqual(self.open_store().get("M2"), {"n": 2})
+        self.assertEqual(self.open_store().get("M1"), {"n": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
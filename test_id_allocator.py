@@ -0,0 +1,108 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from database.data_loader import DataLoader
+from database.id_allocator import IdAllocator, short_id
+from utils.helpers import generate_payment_id, generate_payment_ids, generate_unique_id
+
+
+def allocate_in_child(queue, sources, count):
+    with patch.object(DataLoader, "data_sources", sources):
+        queue.put(IdAllocator.next_ids("members", count))
+
+
+class TestIdAllocator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.sources = {
+            "members": {"file": os.path.join(self.temp_dir, "members.json"), "type": "json", "key": "member_id"},
+            "payments": dict(DataLoader.data_sources["payments"], file=os.path.join(self.temp_dir, "payments.json")),
+        }
+        self.sources_patch = patch.object(DataLoader, "data_sources", self.sources)
+        self.sources_patch.start()
+        DataLoader.clear_cache()
+        IdAllocator.reset()
+
+    def tearDown(self):
+        self.sources_patch.stop()
+        IdAllocator.reset()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_short_ids_continue_after_restart_without_reading_data(self):
+        with patch.object(DataLoader, "get_data") as get_data, patch.object(DataLoader, "iter_data") as iter_data:
+            first = generate_unique_id([{"member_id": "bb0e99ec"}], "member_id")
+            IdAllocator.reset()  # a new process starts with no reserved block
+            second = generate_unique_id([], "member_id")
+        get_data.assert_not_called()
+        iter_data.assert_not_called()
+
+        self.assertEqual(first, short_id(1))
+        self.assertEqual(second, short_id(IdAllocator.block_size + 1))
+        self.assertEqual(len(first), 8)
+        with open(os.path.join(self.temp_dir, "members.ids.json")) as f:
+            self.assertEqual(json.load(f), {"last": 2 * IdAllocator.block_size})
+
+    def test_short_id_sequence_restarts_after_highest_existing_id(self):
+        members = [{"member_id": "bb0e99ec"}, {"member_id": short_id(70)}, {"member_id": short_id(5)}]
+        # No sequence file, e.g. a fresh checkout or a restored backup
+        self.assertEqual(generate_unique_id(members, "member_id"), short_id(71))
+
+        os.remove(os.path.join(self.temp_dir, "members.ids.json"))
+        IdAllocator.reset()
+        with open(self.sources["members"]["file"], "w") as f:
+            json.dump(members + [{"member_id": short_id(71)}], f)
+        DataLoader.clear_cache()
+        self.assertEqual(IdAllocator.next_ids("members"), [short_id(72)])
+
+    def test_prefixed_short_ids_seed_a_lost_sequence(self):
+        self.sources["attendance"] = {
+            "file": os.path.join(self.temp_dir, "attendance.json"), "type": "json", "key": "attendance_id"
+        }
+        # Attendance IDs are stored as "A" + short ID, as AttendanceManager.add_attendance does
+        records = []
+        for _ in range(2):
+            records.append({"attendance_id": "A" + generate_unique_id(records, "attendance_id")})
+
+        os.remove(os.path.join(self.temp_dir, "attendance.ids.json"))  # fresh checkout or lost state file
+        IdAllocator.reset()
+        new_id = "A" + generate_unique_id(records, "attendance_id")
+
+        self.assertNotIn(new_id, [record["attendance_id"] for record in records])
+        self.assertEqual(new_id, "A" + short_id(3))
+
+    def test_payment_ids_start_after_highest_existing_number(self):
+        payments = [{"payment_id": "P7"}, {"payment_id": "P12"}, {"payment_id": "legacy"}]
+
+        self.assertEqual(generate_payment_id(payments), "P13")
+        # Later calls use the persisted sequence, whatever list they are given
+        self.assertEqual(generate_payment_ids([], 3), ["P14", "P15", "P16"])
+        self.assertEqual(generate_payment_id([], prefix="R"), "R1")
+
+    def test_large_blocks_are_reserved_at_once(self):
+        with patch.object(IdAllocator, "reserve", wraps=IdAllocator.reserve) as reserve:
+            ids = IdAllocator.next_ids("members", 1000)
+        self.assertEqual(reserve.call_count, 1)
+        self.assertEqual(len(set(ids)), 1000)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "needs fork")
+    def test_concurrent_processes_get_disjoint_ids(self):
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        workers = [context.Process(target=allocate_in_child, args=(queue, self.sources, 100)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        ids = [new_id for _ in workers for new_id in queue.get(timeout=30)]
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(ids), 400)
+        self.assertEqual(len(set(ids)), 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from core.registration_manager import RegistrationManager
+from core.class_activity_manager import ClassActivityManager
+from core.class_registrations import ClassRegistrations
+from core.enrichment import EnrichmentContext
+from database.data_loader import DataLoader
+from database.storage import JournalStorage
+
+
+class TestRegistrationManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        classes = [{
+            "class_id": "C1", "class_name": "Yoga", "gym_id": "G1", "capacity": 2,
+            "schedule": {"Monday": ["10:00-11:00", "12:00-13:00"]},
+            # Old layout: registrations nested in the class
+            "registered_users": [{"member_id": "U1", "day": "Monday", "time": "10:00-11:00"}],
+        }]
+        with open(os.path.join(self.temp_dir, "classes.json"), "w") as f:
+            json.dump(classes, f)
+
+        sources = {
+            "classes": {"file": os.path.join(self.temp_dir, "classes.json"), "type": "json", "key": "class_id"},
+            "registrations": dict(
+                DataLoader.data_sources["registrations"], file=os.path.join(self.temp_dir, "registrations.json")
+            ),
+        }
+        self.sources_patch = patch.object(DataLoader, "data_sources", sources)
+        self.backends_patch = patch.dict(DataLoader.storage_backends, {"journal": JournalStorage(background=False)})
+        self.member_patch = patch(
+            "core.registration_manager.MemberManagement.get_member_by_id",
+            side_effect=lambda member_id: {"member_id": member_id, "gym_id": "G1"},
+        )
+        self.sources_patch.start()
+        self.backends_patch.start()
+        self.member_patch.start()
+        DataLoader.clear_cache()
+
+    def tearDown(self):
+        self.member_patch.stop()
+        self.backends_patch.stop()
+        self.sources_patch.stop()
+        DataLoader.clear_cache()
+        shutil.rmtree(self.temp_dir)
+
+    def test_nested_registrations_are_read_without_writing(self):
+        classes_file = DataLoader.data_sources["classes"]["file"]
+        with open(classes_file, "rb") as f:
+            before = f.read()
+
+        classes = ClassActivityManager.view_all_classes()
+        self.assertEqual(classes[0]["registered_users"], [{"member_id": "U1", "day": "Monday", "time": "10:00-11:00"}])
+        self.assertEqual(ClassActivityManager.get_registered_user_count("C1"), 1)
+        with open(classes_file, "rb") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(DataLoader.get_data("registrations"), [])
+
+    def test_nested_registrations_are_moved_by_the_first_change(self):
+        RegistrationManager.register_user_to_class("C1", "U2", "Monday", "12:00-13:00")
+
+        self.assertEqual(DataLoader.get_data("classes")[0]["registered_users"], [])
+        self.assertEqual(DataLoader.get_record("registrations", "C1|Monday|10:00-11:00|U1")["member_id"], "U1")
+        self.assertEqual(ClassActivityManager.get_registered_user_count("C1"), 2)
+
+    def test_rejected_changes_leave_nested_registrations_in_place(self):
+        classes_file = DataLoader.data_sources["classes"]["file"]
+        with open(classes_file, "rb") as f:
+            before = f.read()
+
+        with self.assertRaises(ValueError):
+            RegistrationManager.register_user_to_class("C1", "U1", "Monday", "10:00-11:00")
+        with self.assertRaises(ValueError):
+            RegistrationManager.unregister_user_from_class("C1", "U2", "Monday", "10:00-11:00")
+        with self.assertRaises(ValueError):
+            ClassActivityManager.register_user_to_class("C9", "U2")
+        with open(classes_file, "rb") as f:
+            self.assertEqual(f.read(), before)
+
+        RegistrationManager.unregister_user_from_class("C1", "U1", "Monday", "10:00-11:00")
+        self.assertEqual(DataLoader.get_data("classes")[0]["registered_users"], [])
+        self.assertEqual(ClassActivityManager.get_registered_user_count("C1"), 0)
+
+    def test_capacity_and_duplicates_are_checked_per_slot(self):
+        with self.assertRaises(ValueError):
+            RegistrationManager.register_user_to_class("C1", "U1", "Monday", "10:00-11:00")
+
+        RegistrationManager.register_user_to_class("C1", "U2", "Monday", "10:00-11:00")
+        with self.assertRaises(ValueError):
+            RegistrationManager.register_user_to_class("C1", "U3", "Monday", "10:00-11:00")
+        RegistrationManager.register_user_to_class("C1", "U3", "Monday", "12:00-13:00")
+        self.assertEqual(ClassActivityManager.get_registered_user_count("C1"), 3)
+
+        RegistrationManager.unregister_user_from_class("C1", "U1", "Monday", "10:00-11:00")
+        RegistrationManager.register_user_to_class("C1", "U3", "Monday", "10:00-11:00")
+        with self.assertRaises(ValueError):
+            RegistrationManager.unregister_user_from_class("C1", "U1", "Monday", "10:00-11:00")
+
+        DataLoader.clear_cache()
+        self.assertEqual(
+            sorted(r["registration_id"] for r in DataLoader.get_data("registrations")),
+            ["C1|Monday|10:00-11:00|U2", "C1|Monday|10:00-11:00|U3", "C1|Monday|12:00-13:00|U3"],
+        )
+
+    def test_listing_builds_one_enrichment_context(self):
+        RegistrationManager.register_user_to_class("C1", "U2", "Monday", "12:00-13:00")
+        context = EnrichmentContext(members=[{"member_id": "U1", "name": "Ann"}, {"member_id": "U2", "name": "Bob"}],
+                                    gyms=[{"gym_id": "G1", "gym_name": "Central"}])
+        with patch("core.registration_manager.EnrichmentContext", return_value=context) as make_context:
+            registrations = RegistrationManager.get_all_registrations()
+
+        self.assertEqual(make_context.call_count, 1)
+        self.assertEqual(sorted((r["member_name"], r["gym_name"]) for r in registrations),
+                         [("Ann", "Central"), ("Bob", "Central")])
+        orphan = ClassRegistrations.new_registration("C9", "U1", "Monday", "10:00-11:00")
+        self.assertIsNone(RegistrationManager.describe_registration(context, orphan))
+
+    def test_deleting_a_class_removes_its_registrations(self):
+        ClassActivityManager.delete_class("C1")
+        self.assertEqual(DataLoader.get_data("registrations"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
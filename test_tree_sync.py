@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+from core.tree_sync import TreeviewSync
+from database.data_loader import DataLoader
+from database.events import Change
+
+
+class FakeTree:
+    """The parts of ttk.Treeview used by TreeviewSync."""
+
+    def __init__(self):
+        self.rows = {}
+        self.next_id = 0
+
+    def get_children(self):
+        return tuple(self.rows)
+
+    def exists(self, item):
+        return item in self.rows
+
+    def insert(self, parent, index, iid=None, values=()):
+        if iid is None:
+            self.next_id += 1
+            iid = f"I{self.next_id:03d}"
+        self.rows[iid] = values
+        return iid
+
+    def item(self, item, values):
+        self.rows[item] = values
+
+    def delete(self, *items):
+        for item in items:
+            del self.rows[item]
+
+    def bind(self, sequence, func, add=None):
+        pass
+
+
+class TestTreeviewSync(unittest.TestCase):
+    def setUp(self):
+        self.tree = FakeTree()
+        self.sync = TreeviewSync(self.tree, "members", self.row)
+        self.sync.load([
+            {"member_id": "123", "name": "John Doe", "status": "Active"},
+            {"member_id": "456", "name": "Jane Smith", "status": "Inactive"},
+        ])
+
+    def tearDown(self):
+        self.sync.close()
+
+    @staticmethod
+    def row(member):
+        return (member["member_id"], member["name"]) if member["status"] == "Active" else None
+
+    def test_load_uses_keys_as_item_ids(self):
+        self.assertEqual(self.tree.rows, {"123": ("123", "John Doe")})
+
+    def test_load_can_use_its_own_row_function(self):
+        self.sync.load([{"member_id": "456", "name": "Jane Smith", "status": "Inactive"}],
+                       lambda member: (member["member_id"], member["status"]))
+        self.assertEqual(self.tree.rows, {"456": ("456", "Inactive")})
+
+    def test_changes_patch_only_their_rows(self):
+        self.sync.apply([
+            Change("members", "update", "123", {"member_id": "123", "name": "John", "status": "Active"}, None),
+            Change("members", "update", "456", {"member_id": "456", "name": "Jane", "status": "Active"}, None),
+            Change("members", "insert", "789", {"member_id": "789", "name": "New", "status": "Inactive"}, None),
+        ])
+        self.assertEqual(self.tree.rows, {"123": ("123", "John"), "456": ("456", "Jane")})
+
+        self.sync.apply([Change("members", "delete", "123", None, {"member_id": "123"})])
+        self.assertEqual(self.tree.rows, {"456": ("456", "Jane")})
+
+    def test_reload_change_loads_the_source(self):
+        members = [{"member_id": "999", "name": "Reloaded", "status": "Active"}]
+        with patch.object(DataLoader, "get_data", return_value=members):
+            self.sync.apply([Change("members", "reload", None, None, None)])
+        self.assertEqual(self.tree.rows, {"999": ("999", "Reloaded")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,14 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from core.member_management import MemberManagement
+from database.data_loader import DataLoader
 
 
 class TestMemberManagement(unittest.TestCase):
 
     @patch("database.data_loader.DataLoader.get_data")
     @patch("database.data_loader.DataLoader.save_data")
-    @patch("utils.helpers.generate_unique_id")
+    @patch("core.member_management.generate_unique_id")
     def test_add_member(self, mock_generate_unique_id, mock_save_data, mock_get_data):
         """
         Test that a new member is successfully added.
@@ -36,6 +37,7 @@ class TestMemberManagement(unittest.TestCase):
         saved_data = mock_save_data.call_args[0][1][0]
 
         # Verify the essential fields match
+        self.assertEqual(saved_data["member_id"], "123")
         self.assertEqual(saved_data["name"], "John Doe")
         self.assertEqual(saved_data["user_type"], "Gym User")
         self.assertEqual(saved_data["gym_id"], "G1")
@@ -1,20 +1,43 @@
 import uuid
+from database.id_allocator import IdAllocator
 
 
 
 def generate_unique_id(data, key):
     """
-    Generate a unique ID based on existing data.
+    Generate a unique ID for a new record.
+
+    IDs of a data source's primary key come from its persisted sequence (see
+    IdAllocator), without scanning data; other keys get a random 8-character
+    ID that is checked against data.
 
     :param data: List of dictionaries containing existing data.
     :param key: The key to check for uniqueness.
     :return: A unique string ID.
     """
-    existing_ids = {item[key] for item in data if key in item}
-    while True:
-        new_id = str(uuid.uuid4())[:8]  # Generate a short unique ID
-        if new_id not in existing_ids:
-            return new_id
+    return generate_unique_ids(data, key, 1)[0]
+
+
+def generate_unique_ids(data, key, count):
+    """
+    Generate a block of unique IDs, allocated together.
+
+    :param data: List of dictionaries containing existing data.
+    :param key: The key to check for uniqueness.
+    :param count: Number of IDs to generate.
+    :return: List of unique string IDs, distinct from each other and from existing ones.
+    """
+    source_name = IdAllocator.source_for_key(key)
+    if source_name is not None:
+        return IdAllocator.next_ids(source_name, count, existing=data)
+    taken = {item[key] for item in data if key in item}
+    new_ids = []
+    while len(new_ids) < count:
+        new_id = str(uuid.uuid4())[:8]
+        if new_id not in taken:
+            taken.add(new_id)
+            new_ids.append(new_id)
+    return new_ids
 
 
 def validate_date(date_str):
@@ -36,12 +59,26 @@ def generate_payment_id(payments, prefix="P"):
     :param prefix: Prefix for the payment ID
     :return: A new unique payment ID
     """
-    if not payments:  # If the list is empty
-        return f"{prefix}1"
+    return generate_payment_ids(payments, 1, prefix)[0]
+
+def generate_payment_ids(payments, count, prefix="P"):
+    """
+    Generates a block of new payment IDs from the persisted payments sequence.
+    The payments are only read the first time the sequence is used, to start
+    it after the highest existing number.
+    :param payments: List of existing payments
+    :param count: Number of IDs to generate
+    :param prefix: Prefix for the payment IDs
+    :return: A list of new unique payment IDs
+    """
+    if prefix == IdAllocator.prefix_of("payments"):
+        return IdAllocator.next_ids("payments", count, existing=payments)
     existing_ids = [
         int(payment["payment_id"].replace(prefix, "")) for payment in payments if "payment_id" in payment
     ]
-    return f"{prefix}{max(existing_ids, default=0) + 1}"
+    first = max(existing_ids, default=0) + 1
+    return [f"{prefix}{number}" for number in range(first, first + count)]
+
 
 def validate_payment_type(payment_type):
     """
@@ -76,4 +113,4 @@ def determine_payment_type(user_type, payment_type):
         return "N/A"
     else:
         # Default to 'N/A' for any other user type
-        return "N/A"
\ No newline at end of file
+        return "N/A"